@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк файловых хранилищ: задержка и пропускная способность
+сохранения, получения и удаления файлов
+
+S3 по умолчанию проверяется на moto, который скрипт запускает сам
+(пакет из dev-зависимостей), реальный AWS не нужен. Другой S3-совместимый
+сервис (например, LocalStack) задается через --endpoint-url:
+
+    python benchmarks/storage_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/storage_benchmark.py --baseline benchmarks/baseline.json
+    python benchmarks/storage_benchmark.py --endpoint-url http://localhost:4566
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("LOGFIRE_IGNORE_NO_CONFIG", "1")
+
+from events_bot.storage import (  # noqa: E402
+    DiskCachedFileStorage,
+    FileStorageInterface,
+    LocalFileStorage,
+    S3FileStorage,
+)
+
+OPERATIONS = ["save", "resolve", "delete"]
+
+
+class LatencyInjectingStorage:
+    """Обертка, добавляющая задержку перед каждым обращением к хранилищу"""
+
+    def __init__(self, storage: FileStorageInterface, latency: float):
+        self.storage = storage
+        self.latency = latency
+        self.media_cache = storage.media_cache
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def save_file(self, file_data: bytes, file_extension: str) -> str:
+        await self._delay()
+        return await self.storage.save_file(file_data, file_extension)
+
+    async def get_media_photo(self, file_id: str):
+        await self._delay()
+        return await self.storage.get_media_photo(file_id)
+
+    async def delete_file(self, file_id: str) -> bool:
+        await self._delay()
+        return await self.storage.delete_file(file_id)
+
+
+def parse_size(value: str) -> int:
+    """Разобрать размер вида 512B, 64KB, 2MB"""
+    value = value.strip().upper()
+    for suffix, multiplier in (("MB", 1024 * 1024), ("KB", 1024), ("B", 1)):
+        if value.endswith(suffix):
+            return int(float(value[: -len(suffix)]) * multiplier)
+    return int(value)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Перцентиль по отсортированной выборке"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_timed(calls, concurrency: int) -> Dict[str, float]:
+    """Выполнить вызовы с заданной параллельностью и посчитать статистику"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def run_one(call) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_one(call) for call in calls))
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+async def bench_backend(storage, size: int, concurrency: int, operations: int) -> Dict[str, Dict[str, float]]:
+    """Замерить сохранение, получение и удаление для одного хранилища"""
+    # Разные данные для каждого файла, чтобы хранение по содержимому не схлопнуло их
+    payloads = [os.urandom(size) for _ in range(operations)]
+    file_ids: List[str] = []
+
+    async def save(file_data: bytes) -> None:
+        file_ids.append(await storage.save_file(file_data, "jpg"))
+
+    results = {}
+    results["save"] = await run_timed([lambda d=d: save(d) for d in payloads], concurrency)
+    # Замеряем холодное получение: без кэша file_id Telegram и URL
+    # и без файлов, попавших в дисковый кэш при сохранении
+    drop_caches(storage, file_ids)
+    results["resolve"] = await run_timed(
+        [lambda f=f: storage.get_media_photo(f) for f in file_ids], concurrency
+    )
+    results["delete"] = await run_timed(
+        [lambda f=f: storage.delete_file(f) for f in file_ids], concurrency
+    )
+    return results
+
+
+def drop_caches(storage, file_ids: List[str]) -> None:
+    """Сбросить кэши хранилища для файлов перед замером холодного получения"""
+    if isinstance(storage, LatencyInjectingStorage):
+        storage = storage.storage
+    for file_id in file_ids:
+        storage.media_cache.forget(file_id)
+        if isinstance(storage, DiskCachedFileStorage):
+            storage._drop(file_id)
+
+
+def start_moto_server():
+    """Запустить локальный S3 на moto, вернуть сервер и его URL"""
+    from moto.server import ThreadedMotoServer
+
+    # Журнал запросов werkzeug перемешался бы с таблицей результатов
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+async def ensure_bucket(storage: S3FileStorage) -> None:
+    """Создать bucket на локальном S3, если его нет"""
+    async with storage._client() as s3_client:
+        try:
+            await s3_client.head_bucket(Bucket=storage.bucket_name)
+        except Exception:
+            await s3_client.create_bucket(Bucket=storage.bucket_name)
+
+
+async def create_backends(names: List[str], args, workdir: Path):
+    """Создать хранилища для замеров"""
+    backends = {}
+    for name in names:
+        if name == "local":
+            backends[name] = LocalFileStorage(str(workdir / "local"))
+            continue
+        s3_storage = S3FileStorage(
+            bucket_name=args.bucket,
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "test"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "test"),
+            region_name=os.getenv("AWS_REGION", "us-east-1"),
+            endpoint_url=args.endpoint_url,
+        )
+        await ensure_bucket(s3_storage)
+        if name == "s3":
+            backends[name] = s3_storage
+        elif name == "s3-cached":
+            backends[name] = DiskCachedFileStorage(s3_storage, str(workdir / "cache"))
+        else:
+            raise ValueError(f"Неизвестное хранилище: {name}")
+    return backends
+
+
+def print_table(rows: List[Dict], baseline: Dict[str, Dict[str, float]]) -> None:
+    """Вывести таблицу перцентилей, при наличии - с отклонением от базовой линии"""
+    header = f"{'backend':<10} {'op':<8} {'size':>9} {'conc':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'ops/s':>9}"
+    if baseline:
+        header += f" {'Δp50':>8} {'Δp99':>8} {'Δops/s':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        stats = row["stats"]
+        line = (
+            f"{row['backend']:<10} {row['operation']:<8} {row['size']:>9} {row['concurrency']:>5} "
+            f"{stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+            f"{stats['max_ms']:>9.2f} {stats['ops_per_sec']:>9.1f}"
+        )
+        base = baseline.get(row["key"])
+        if base:
+            line += (
+                f" {delta(stats['p50_ms'], base['p50_ms']):>8}"
+                f" {delta(stats['p99_ms'], base['p99_ms']):>8}"
+                f" {delta(stats['ops_per_sec'], base['ops_per_sec']):>8}"
+            )
+        print(line)
+
+
+def delta(current: float, base: float) -> str:
+    """Отклонение от базовой линии в процентах"""
+    if not base:
+        return "n/a"
+    return f"{(current - base) / base * 100:+.1f}%"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="local,s3", help="local, s3, s3-cached через запятую")
+    parser.add_argument("--sizes", default="16KB,256KB,1MB", help="Размеры файлов через запятую")
+    parser.add_argument("--concurrency", default="1,8,32", help="Уровни параллельности через запятую")
+    parser.add_argument("--operations", type=int, default=200, help="Количество файлов на замер")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Искусственная задержка на каждый вызов")
+    parser.add_argument(
+        "--endpoint-url",
+        default=os.getenv("S3_ENDPOINT_URL"),
+        help="URL S3-совместимого сервиса (по умолчанию запускается moto)",
+    )
+    parser.add_argument("--bucket", default=os.getenv("S3_BUCKET_NAME", "events-bot-benchmark"))
+    parser.add_argument("--baseline", help="JSON с базовой линией для сравнения")
+    parser.add_argument("--save-baseline", help="Сохранить результаты как базовую линию")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else {}
+
+    backend_names = args.backends.split(",")
+    moto_server = None
+    if not args.endpoint_url and any(name.startswith("s3") for name in backend_names):
+        moto_server, args.endpoint_url = start_moto_server()
+
+    workdir = Path(tempfile.mkdtemp(prefix="storage-bench-"))
+    rows = []
+    try:
+        backends = await create_backends(backend_names, args, workdir)
+        for backend_name, storage in backends.items():
+            if args.latency_ms:
+                storage = LatencyInjectingStorage(storage, args.latency_ms / 1000)
+            for size in sizes:
+                for concurrency in concurrency_levels:
+                    results = await bench_backend(storage, size, concurrency, args.operations)
+                    for operation in OPERATIONS:
+                        rows.append({
+                            "key": f"{backend_name}/{operation}/{size}/{concurrency}",
+                            "backend": backend_name,
+                            "operation": operation,
+                            "size": size,
+                            "concurrency": concurrency,
+                            "stats": results[operation],
+                        })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if moto_server:
+            moto_server.stop()
+
+    print(
+        f"operations={args.operations} latency={args.latency_ms}ms "
+        f"endpoint={args.endpoint_url}\n"
+    )
+    print_table(rows, baseline)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(
+            json.dumps({row["key"]: row["stats"] for row in rows}, indent=2)
+        )
+        print(f"\nБазовая линия сохранена в {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
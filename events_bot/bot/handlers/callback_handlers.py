@@ -4,6 +4,7 @@ from aiogram.fsm.context import FSMContext
 from events_bot.database.services import UserService, CategoryService
 from events_bot.bot.states import UserStates
 from events_bot.bot.keyboards import get_category_selection_keyboard, get_main_keyboard
+from events_bot.bot.utils import edit_text, edit_reply_markup
 
 router = Router()
 
@@ -34,7 +35,8 @@ async def process_category_selection(callback: CallbackQuery, state: FSMContext,
     await state.update_data(selected_categories=selected_ids)
 
     # Обновляем клавиатуру
-    await callback.message.edit_reply_markup(
+    await edit_reply_markup(
+        callback.message,
         reply_markup=get_category_selection_keyboard(categories, selected_ids)
     )
     await callback.answer()
@@ -58,12 +60,14 @@ async def confirm_categories_selection(callback: CallbackQuery, state: FSMContex
     selected_categories = [cat for cat in categories if cat.id in selected_ids]
     category_names = ", ".join([cat.name for cat in selected_categories])
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ Выбраны категории: {category_names}\n\n"
         "Теперь вы можете создавать посты в этих категориях."
     )
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите действие:", reply_markup=get_main_keyboard()
     )
     await state.clear()
@@ -1,15 +1,48 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, FSInputFile, InputMediaPhoto, Message
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardMarkup, InputMediaPhoto, Message
 from aiogram.fsm.context import FSMContext
-from events_bot.database.services import PostService, LikeService
+from typing import List, Optional, Tuple
+from events_bot.database.services import PostService, LikeService, UserService
+from events_bot.database.read_models import FeedPostView
 from events_bot.bot.keyboards.main_keyboard import get_main_keyboard
-from events_bot.bot.keyboards.feed_keyboard import get_feed_keyboard
+from events_bot.bot.keyboards.feed_keyboard import get_feed_keyboard, get_feed_batch_keyboard
+from events_bot.bot.utils import (
+    discard_prefetched_post,
+    edit_media,
+    edit_reply_markup,
+    edit_text,
+    forget_message,
+    reset_feed_prefetch,
+    schedule_feed_prefetch,
+    take_prefetched_post,
+)
 from events_bot.storage import file_storage
 import logfire
+import os
 
 router = Router()
 
-POSTS_PER_PAGE = 1  # Показываем по одному посту на странице
+# Сколько постов показывать за одно нажатие: 1 - пост целиком с картинкой,
+# больше 1 - страница из нескольких постов с сердечком для каждого
+# (не больше 10 - столько картинок помещается в альбом)
+POSTS_PER_PAGE = min(10, max(1, int(os.getenv("FEED_POSTS_PER_PAGE", "1"))))
+# Вид страницы из нескольких постов: "list" - одно сообщение со списком,
+# "media" - картинки постов альбомом и сообщение со списком под ним
+FEED_PAGE_STYLE = os.getenv("FEED_PAGE_STYLE", "list")
+# Сколько символов заголовка и текста поста показывать в списке (текст
+# сокращается сильнее, если страница не помещается в одно сообщение)
+FEED_LIST_CONTENT_LENGTH = 300
+FEED_LIST_TITLE_LENGTH = 100
+MESSAGE_MAX_LENGTH = 4096
+
+EMPTY_FEED_TEXT = (
+    "📭 В ленте пока нет постов по вашим категориям.\n\n"
+    "Попробуйте:\n"
+    "• Выбрать другие категории\n"
+    "• Создать пост самому"
+)
 
 def register_feed_handlers(dp: Router):
     """Регистрация обработчиков ленты"""
@@ -17,21 +50,31 @@ def register_feed_handlers(dp: Router):
 
 
 @router.message(F.text == "/feed")
-async def cmd_feed(message: Message, db):
+async def cmd_feed(message: Message, db, state: FSMContext):
     """Обработчик команды /feed"""
     logfire.info(f"Пользователь {message.from_user.id} открывает ленту через команду")
-    await show_feed_page_cmd(message, 0, db)
+    await PostService.open_feed_snapshot(db, message.from_user.id)
+    reset_feed_prefetch(message.from_user.id)
+    if POSTS_PER_PAGE > 1:
+        await show_feed_batch_cmd(message, 0, db, state)
+    else:
+        await show_feed_page_cmd(message, 0, db)
 
 
 @router.callback_query(F.data == "feed")
-async def show_feed_callback(callback: CallbackQuery, db):
+async def show_feed_callback(callback: CallbackQuery, db, state: FSMContext):
     """Показать ленту постов"""
     logfire.info(f"Пользователь {callback.from_user.id} открывает ленту")
-    await show_feed_page(callback, 0, db)
+    await PostService.open_feed_snapshot(db, callback.from_user.id)
+    reset_feed_prefetch(callback.from_user.id)
+    if POSTS_PER_PAGE > 1:
+        await show_feed_batch(callback, 0, db, state)
+    else:
+        await show_feed_page(callback, 0, db)
 
 
 @router.callback_query(F.data.startswith("feed_"))
-async def handle_feed_navigation(callback: CallbackQuery, db):
+async def handle_feed_navigation(callback: CallbackQuery, db, state: FSMContext):
     """Обработка навигации по ленте"""
     data = callback.data.split("_")
     action = data[1]
@@ -44,12 +87,18 @@ async def handle_feed_navigation(callback: CallbackQuery, db):
                 new_page = max(0, current_page - 1)
             else:
                 new_page = current_page + 1
-            await show_feed_page(callback, new_page, db)
+            if POSTS_PER_PAGE > 1:
+                await show_feed_batch(callback, new_page, db, state)
+            else:
+                await show_feed_page(callback, new_page, db)
         elif action == "heart":
             post_id = int(data[2])
             current_page = int(data[3])
             total_pages = int(data[4])
             await handle_post_heart(callback, post_id, db, data)
+            if POSTS_PER_PAGE > 1:
+                # Список показывает число сердечек у каждого поста - перерисовываем страницу
+                await show_feed_batch(callback, current_page, db, state, refresh=True)
     except Exception as e:
         logfire.exception("Ошибка навигации по ленте {e}", e=e)
     await callback.answer()
@@ -58,7 +107,8 @@ async def handle_feed_navigation(callback: CallbackQuery, db):
 @router.callback_query(F.data == "main_menu")
 async def return_to_main_menu(callback: CallbackQuery):
     """Возврат в главное меню"""
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите действие:", reply_markup=get_main_keyboard()
     )
     await callback.answer()
@@ -67,45 +117,41 @@ async def return_to_main_menu(callback: CallbackQuery):
 async def show_feed_page_cmd(message: Message, page: int, db):
     """Показать страницу ленты через сообщение"""
     logfire.info(f"Пользователь {message.from_user.id} загружает страницу {page} ленты")
-    # Получаем посты для ленты
-    posts = await PostService.get_feed_posts(
-        db, message.from_user.id, POSTS_PER_PAGE, page * POSTS_PER_PAGE
-    )
-    if not posts:
+    # Пост берем по позиции в снимке ленты (см. PostService.open_feed_snapshot),
+    # если он не был загружен заранее
+    category_ids = (await UserService.get_feed_context(db, message.from_user.id)).category_ids
+    prefetched = take_prefetched_post(message.from_user.id, category_ids, page)
+    if prefetched:
+        post, total_posts = prefetched.post, prefetched.total_posts
+    else:
+        post, total_posts = await PostService.get_feed_post(db, message.from_user.id, page)
+    if post is None:
         logfire.info(f"Пользователь {message.from_user.id} — в ленте нет постов")
         await message.answer(
-            "📭 В ленте пока нет постов по вашим категориям.\n\n"
-            "Попробуйте:\n"
-            "• Выбрать другие категории\n"
-            "• Создать пост самому",
+            EMPTY_FEED_TEXT,
             reply_markup=get_main_keyboard()
         )
         return
-    # Получаем общее количество постов для пагинации
-    total_posts = await PostService.get_feed_posts_count(db, message.from_user.id)
     total_pages = (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
-    # Форматируем пост для отображения
-    post = posts[0]  # Берем первый пост (так как POSTS_PER_PAGE = 1)
-    await db.refresh(post, attribute_names=["author", "categories"])
-    
-    # Проверяем, поставил ли пользователь лайк на этот пост
-    is_liked = await LikeService.is_post_liked_by_user(db, message.from_user.id, post.id)
-    
-    # Получаем количество лайков на пост
-    likes_count = await LikeService.get_post_likes_count(db, post.id)
-    
-    feed_text = format_post_for_feed(post, page + 1, total_posts, likes_count)
+    # Пост уже содержит автора, категории и состояние сердечек
+    is_liked = post.is_liked
+    likes_count = post.likes_count
+
+    feed_text = format_post_for_feed(post, page + 1, total_posts)
     logfire.info(f"Показываем пост {post.id} пользователю {message.from_user.id}")
+    # Следующие посты загружаем в фоне, пока пользователь читает этот
+    schedule_feed_prefetch(message.from_user.id, category_ids, page + 1, total_posts)
     # Если у поста есть изображение, отправляем с фото
     if post.image_id:
         media_photo = await file_storage.get_media_photo(post.image_id)
         if media_photo:
             logfire.info(f"Пост {post.id} содержит изображение")
-            await message.answer_photo(
+            sent = await message.answer_photo(
                 photo=media_photo.media,
                 caption=feed_text,
                 reply_markup=get_feed_keyboard(page, total_pages, post.id, is_liked, likes_count)
             )
+            file_storage.media_cache.remember_sent_photo(post.image_id, sent)
             return
         else:
             logfire.warning(f"Изображение для поста {post.id} не найдено")
@@ -119,85 +165,205 @@ async def show_feed_page_cmd(message: Message, page: int, db):
 async def show_feed_page(callback: CallbackQuery, page: int, db):
     """Показать страницу ленты"""
     logfire.info(f"Пользователь {callback.from_user.id} загружает страницу {page} ленты")
-    # Получаем посты для ленты
-    posts = await PostService.get_feed_posts(
-        db, callback.from_user.id, POSTS_PER_PAGE, page * POSTS_PER_PAGE
-    )
-    if not posts:
+    # Пост берем по позиции в снимке ленты (см. PostService.open_feed_snapshot),
+    # если он не был загружен заранее
+    category_ids = (await UserService.get_feed_context(db, callback.from_user.id)).category_ids
+    prefetched = take_prefetched_post(callback.from_user.id, category_ids, page)
+    if prefetched:
+        post, total_posts = prefetched.post, prefetched.total_posts
+    else:
+        post, total_posts = await PostService.get_feed_post(db, callback.from_user.id, page)
+    if post is None:
         logfire.info(f"Пользователь {callback.from_user.id} — в ленте нет постов")
-        await callback.message.edit_text(
-            "📭 В ленте пока нет постов по вашим категориям.\n\n"
-            "Попробуйте:\n"
-            "• Выбрать другие категории\n"
-            "• Создать пост самому",
+        await edit_text(
+            callback.message,
+            EMPTY_FEED_TEXT,
             reply_markup=get_main_keyboard()
         )
         return
-    # Получаем общее количество постов для пагинации
-    total_posts = await PostService.get_feed_posts_count(db, callback.from_user.id)
     total_pages = (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
-    # Форматируем пост для отображения
-    post = posts[0]  # Берем первый пост (так как POSTS_PER_PAGE = 1)
-    await db.refresh(post, attribute_names=["author", "categories"])
-    
-    # Проверяем, поставил ли пользователь лайк на этот пост
-    is_liked = await LikeService.is_post_liked_by_user(db, callback.from_user.id, post.id)
-    
-    # Получаем количество лайков на пост
-    likes_count = await LikeService.get_post_likes_count(db, post.id)
-    
-    feed_text = format_post_for_feed(post, page + 1, total_posts, likes_count)
+    # Пост уже содержит автора, категории и состояние сердечек
+    is_liked = post.is_liked
+    likes_count = post.likes_count
+
+    feed_text = format_post_for_feed(post, page + 1, total_posts)
     logfire.info(f"Показываем пост {post.id} пользователю {callback.from_user.id}")
+    # Следующие посты загружаем в фоне, пока пользователь читает этот
+    schedule_feed_prefetch(callback.from_user.id, category_ids, page + 1, total_posts)
     # Если у поста есть изображение, отправляем с фото
     if post.image_id:
         media_photo = await file_storage.get_media_photo(post.image_id)
         if media_photo:
             logfire.info(f"Пост {post.id} содержит изображение")
-            await callback.message.edit_media(
+            edited = await edit_media(
+                callback.message,
                 media=InputMediaPhoto(
                     media=media_photo.media,
                     caption=feed_text
                 ),
+                media_key=post.image_id,
                 reply_markup=get_feed_keyboard(page, total_pages, post.id, is_liked, likes_count)
             )
+            file_storage.media_cache.remember_sent_photo(post.image_id, edited)
             return
         else:
             logfire.warning(f"Изображение для поста {post.id} не найдено")
     # Если нет изображения, отправляем только текст
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         feed_text,
         reply_markup=get_feed_keyboard(page, total_pages, post.id, is_liked, likes_count)
     )
 
 
-def format_post_for_feed(post, current_position: int, total_posts: int, likes_count: int = 0) -> str:
+async def render_feed_batch(
+    db, user_id: int, page: int
+) -> Optional[Tuple[str, InlineKeyboardMarkup, List[Tuple[int, FeedPostView]]]]:
+    """Текст, клавиатура и посты страницы ленты из нескольких постов
+
+    Все посты страницы берутся из снимка ленты одним запросом.
+    """
+    window, total_posts = await PostService.get_feed_window(
+        db, user_id, page * POSTS_PER_PAGE, POSTS_PER_PAGE, rebuild=True
+    )
+    if not window:
+        return None
+    total_pages = (total_posts + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
+    text = format_feed_batch(window, page, total_pages)
+    return text, get_feed_batch_keyboard(page, total_pages, window), window
+
+
+async def send_feed_album(bot: Bot, chat_id: int, window: List[Tuple[int, FeedPostView]]) -> List[int]:
+    """Отправить картинки постов страницы одним альбомом, вернуть id сообщений"""
+    with_images = [(index, post) for index, post in window if post.image_id]
+    if not with_images:
+        return []
+    media = await file_storage.resolve_many([post.image_id for _, post in with_images])
+    album = [
+        (post, InputMediaPhoto(media=media[post.image_id].media, caption=f"{index + 1}. {post.title}"))
+        for index, post in with_images
+        if media.get(post.image_id)
+    ]
+    if not album:
+        return []
+    if len(album) == 1:
+        # Альбом должен содержать хотя бы две картинки
+        post, photo = album[0]
+        sent = [await bot.send_photo(chat_id=chat_id, photo=photo.media, caption=photo.caption)]
+    else:
+        sent = await bot.send_media_group(chat_id=chat_id, media=[photo for _, photo in album])
+    for (post, _), message in zip(album, sent, strict=True):
+        file_storage.media_cache.remember_sent_photo(post.image_id, message)
+    return [message.message_id for message in sent]
+
+
+async def delete_feed_album(bot: Bot, chat_id: int, state: FSMContext) -> None:
+    """Удалить альбом предыдущей страницы ленты"""
+    data = await state.get_data()
+    album_ids = data.get("feed_album_ids")
+    if not album_ids:
+        return
+    await state.update_data(feed_album_ids=[])
+    try:
+        await bot.delete_messages(chat_id=chat_id, message_ids=album_ids)
+    except TelegramBadRequest as e:
+        # Старые сообщения Telegram удалять не дает - альбом остается в истории
+        logfire.warning(f"Не удалось удалить альбом ленты: {e}")
+
+
+async def show_feed_batch_cmd(message: Message, page: int, db, state: FSMContext):
+    """Показать страницу ленты из нескольких постов через сообщение"""
+    logfire.info(f"Пользователь {message.from_user.id} загружает страницу {page} ленты")
+    rendered = await render_feed_batch(db, message.from_user.id, page)
+    if rendered is None:
+        logfire.info(f"Пользователь {message.from_user.id} — в ленте нет постов")
+        await message.answer(EMPTY_FEED_TEXT, reply_markup=get_main_keyboard())
+        return
+    text, keyboard, window = rendered
+    if FEED_PAGE_STYLE == "media":
+        await delete_feed_album(message.bot, message.chat.id, state)
+        album_ids = await send_feed_album(message.bot, message.chat.id, window)
+        await state.update_data(feed_album_ids=album_ids)
+    await message.answer(text, reply_markup=keyboard)
+
+
+async def show_feed_batch(
+    callback: CallbackQuery, page: int, db, state: FSMContext, refresh: bool = False
+):
+    """Показать страницу ленты из нескольких постов
+
+    Args:
+        refresh: Перерисовать текущую страницу (после сердечка) - альбом
+            при этом не переотправляется
+    """
+    logfire.info(f"Пользователь {callback.from_user.id} загружает страницу {page} ленты")
+    rendered = await render_feed_batch(db, callback.from_user.id, page)
+    if rendered is None:
+        logfire.info(f"Пользователь {callback.from_user.id} — в ленте нет постов")
+        await edit_text(callback.message, EMPTY_FEED_TEXT, reply_markup=get_main_keyboard())
+        return
+    text, keyboard, window = rendered
+    if FEED_PAGE_STYLE == "media" and not refresh:
+        # Альбом нельзя отредактировать в другой набор картинок: старую
+        # страницу удаляем и отправляем новую под ней
+        chat_id = callback.message.chat.id
+        await delete_feed_album(callback.bot, chat_id, state)
+        try:
+            await callback.message.delete()
+            forget_message(callback.message)
+        except TelegramBadRequest as e:
+            logfire.warning(f"Не удалось удалить страницу ленты: {e}")
+        album_ids = await send_feed_album(callback.bot, chat_id, window)
+        await state.update_data(feed_album_ids=album_ids)
+        await callback.bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard)
+        return
+    await edit_text(callback.message, text, reply_markup=keyboard)
+
+
+def format_feed_batch(
+    window: List[Tuple[int, FeedPostView]],
+    page: int,
+    total_pages: int,
+    content_length: int = FEED_LIST_CONTENT_LENGTH,
+) -> str:
+    """Форматировать страницу ленты из нескольких постов
+
+    Если страница не помещается в одно сообщение, текст постов сокращается.
+    """
+    lines = [f"📰 Лента постов — страница {page + 1} из {total_pages}"]
+    for index, post in window:
+        category_str = ', '.join(post.category_names) if post.category_names else 'Неизвестно'
+        published_str = post.published_at.strftime('%d.%m.%Y %H:%M') if post.published_at else ''
+        content = post.content
+        if len(content) > content_length:
+            content = content[:content_length].rstrip() + "…"
+        lines.append(
+            f"{index + 1}. 📝 {post.title[:FEED_LIST_TITLE_LENGTH]}\n"
+            + (f"{content}\n" if content_length else "")
+            + f"👤 {post.author_name} · 🏙️ {post.city or 'Не указан'} · 📂 {category_str}\n"
+            f"💖 {post.likes_count} · 📅 {published_str}"
+        )
+    text = "\n\n".join(lines)
+    # Telegram считает длину в символах UTF-16 (эмодзи - по два)
+    if len(text.encode("utf-16-le")) // 2 > MESSAGE_MAX_LENGTH and content_length:
+        return format_feed_batch(window, page, total_pages, content_length // 2 if content_length > 20 else 0)
+    return text
+
+
+def format_post_for_feed(post: FeedPostView, current_position: int, total_posts: int) -> str:
     """Форматировать пост для ленты"""
-    # Безопасно получаем данные, избегая ленивой загрузки
-    author_name = 'Аноним'
-    if hasattr(post, 'author') and post.author is not None:
-        author_name = (getattr(post.author, 'first_name', None) or 
-                      getattr(post.author, 'username', None) or 'Аноним')
-    
-    # Получаем названия всех категорий поста
-    category_names = []
-    if hasattr(post, 'categories') and post.categories is not None:
-        category_names = [getattr(cat, 'name', 'Неизвестно') for cat in post.categories]
-    
-    category_str = ', '.join(category_names) if category_names else 'Неизвестно'
-    
-    post_city = getattr(post, 'city', 'Не указан')
-    
-    published_at = getattr(post, 'published_at', None)
-    published_str = published_at.strftime('%d.%m.%Y %H:%M') if published_at else ''
+    category_str = ', '.join(post.category_names) if post.category_names else 'Неизвестно'
+    post_city = post.city or 'Не указан'
+    published_str = post.published_at.strftime('%d.%m.%Y %H:%M') if post.published_at else ''
     
     return (
         f"📰 Лента постов\n\n"
         f"📝 {post.title}\n\n"
         f"{post.content}\n\n"
-        f"👤 Автор: {author_name}\n"
+        f"👤 Автор: {post.author_name}\n"
         f"🏙️ Город: {post_city}\n"
         f"📂 Категории: {category_str}\n"
-        f"💖 Сердечек: {likes_count}\n"
+        f"💖 Сердечек: {post.likes_count}\n"
         f"📅 {published_str}\n\n"
         f"📊 {current_position} из {total_posts} постов"
     )
@@ -220,12 +386,15 @@ async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
         
         await callback.answer(response_text, show_alert=True)
         
+        # Заранее загруженная копия поста хранит прежнее состояние сердечка
+        discard_prefetched_post(callback.from_user.id, post_id)
+
         # Обновляем клавиатуру с новым количеством лайков
-        is_liked = await LikeService.is_post_liked_by_user(db, callback.from_user.id, post_id)
+        is_liked = result["action"] == "added"
         
         # Получаем текущую клавиатуру и обновляем её
         current_markup = callback.message.reply_markup
-        if current_markup:
+        if current_markup and POSTS_PER_PAGE == 1:
             # Извлекаем информацию о страницах из callback_data
             current_page = int(data[3])
             total_pages = int(data[4])
@@ -238,7 +407,7 @@ async def handle_post_heart(callback: CallbackQuery, post_id: int, db, data):
                 is_liked=is_liked,
                 likes_count=likes_count
             )
-            await callback.message.edit_reply_markup(reply_markup=new_keyboard)
+            await edit_reply_markup(callback.message, reply_markup=new_keyboard)
         
         logfire.info(f"Сердечко посту {post_id} успешно {action_text}")
         
@@ -7,14 +7,20 @@ from events_bot.database.services import (
     ModerationService,
     PostService,
     NotificationService,
+    FeedService,
+)
+from events_bot.bot.utils import (
+    send_post_notification,
+    send_bulk_post_notifications,
+    run_in_background,
+    edit_text,
 )
-from events_bot.bot.utils import send_post_notification
 from events_bot.storage import file_storage
 from events_bot.database.models import ModerationAction
+from events_bot.database.unit_of_work import after_commit
 from events_bot.bot.keyboards import (
     get_moderation_keyboard,
     get_moderation_queue_keyboard,
-    get_main_keyboard,
 )
 
 router = Router()
@@ -25,103 +31,179 @@ def register_moderation_handlers(dp: Router):
     dp.include_router(router)
 
 
+async def render_moderation_queue(db, state: FSMContext, after_id: int = None, before_id: int = None):
+    """Текст и клавиатура страницы очереди модерации для всех ее представлений"""
+    data = await state.get_data()
+    selected = set(data.get("moderation_selected", []))
+    page = await ModerationService.get_moderation_queue_page(
+        db, after_id=after_id, before_id=before_id
+    )
+    # Запоминаем позицию, чтобы выбор постов перерисовывал ту же страницу
+    await state.update_data(
+        moderation_page={"after_id": after_id, "before_id": before_id},
+        moderation_page_ids=[item.id for item in page.items],
+    )
+    if not page.items:
+        logfire.info("Очередь модерации пуста")
+        return "Нет постов на модерации.", get_moderation_queue_keyboard(selected=selected)
+    logfire.info(f"Показываем {len(page.items)} из {page.total} постов на модерации")
+    response = ModerationService.format_moderation_queue(page)
+    if selected:
+        response += f"Выбрано постов: {len(selected)}"
+    return response, get_moderation_queue_keyboard(
+        page.prev_cursor, page.next_cursor, [item.id for item in page.items], selected
+    )
+
+
+async def rerender_moderation_queue(callback: CallbackQuery, db, state: FSMContext):
+    """Перерисовать текущую страницу очереди после изменения выбора"""
+    data = await state.get_data()
+    response, keyboard = await render_moderation_queue(db, state, **data.get("moderation_page", {}))
+    await edit_text(callback.message, response, reply_markup=keyboard)
+
+
 @router.message(F.text == "/moderation")
-async def cmd_moderation(message: Message, db):
+async def cmd_moderation(message: Message, db, state: FSMContext):
     """Обработчик команды /moderation"""
     logfire.info(f"Пользователь {message.from_user.id} запросил модерацию через команду")
-    pending_posts = await ModerationService.get_moderation_queue(db)
-
-    if not pending_posts:
-        logfire.info("Очередь модерации пуста")
-        await message.answer(
-            "Нет постов на модерации.",
-            reply_markup=get_main_keyboard(),
-        )
-        return
-
-    logfire.info(f"Найдено {len(pending_posts)} постов на модерации")
-    response = "Посты на модерации:\n\n"
-    for post in pending_posts:
-        await db.refresh(post, attribute_names=["author", "categories"])
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
-        response += f"{post.title}\n"
-        response += f"Город: {post_city}\n"
-        response += f"{post.author.first_name or post.author.username}\n"
-        response += f"{category_str}\n"
-        response += f"ID: {post.id}\n\n"
-
-    await message.answer(
-        response, reply_markup=get_main_keyboard()
-    )
+    response, keyboard = await render_moderation_queue(db, state)
+    await message.answer(response, reply_markup=keyboard)
 
 
 @router.callback_query(F.data == "moderation")
-async def show_moderation_queue_callback(callback: CallbackQuery, db):
+async def show_moderation_queue_callback(callback: CallbackQuery, db, state: FSMContext):
     """Показать очередь модерации через инлайн-кнопку"""
     logfire.info(f"Пользователь {callback.from_user.id} запросил очередь модерации")
-    pending_posts = await ModerationService.get_moderation_queue(db)
+    response, keyboard = await render_moderation_queue(db, state)
+    await edit_text(callback.message, response, reply_markup=keyboard)
+    await callback.answer()
 
-    if not pending_posts:
-        logfire.info("Очередь модерации пуста")
-        await callback.message.edit_text(
-            "Нет постов на модерации.",
-            reply_markup=get_moderation_queue_keyboard(),
-        )
-        return
 
-    logfire.info(f"Найдено {len(pending_posts)} постов на модерации")
-    response = "Посты на модерации:\n\n"
-    for post in pending_posts:
-        await db.refresh(post, attribute_names=["author", "categories"])
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
-        response += f"{post.title}\n"
-        response += f"Город: {post_city}\n"
-        response += f"{post.author.first_name or post.author.username}\n"
-        response += f"{category_str}\n"
-        response += f"ID: {post.id}\n\n"
-
-    await callback.message.edit_text(
-        response, reply_markup=get_moderation_queue_keyboard()
-    )
+@router.callback_query(F.data.startswith("moderation_after_") | F.data.startswith("moderation_before_"))
+async def navigate_moderation_queue(callback: CallbackQuery, db, state: FSMContext):
+    """Листание очереди модерации по курсору"""
+    _, direction, cursor = callback.data.split("_")
+    cursor = int(cursor)
+    logfire.info(f"Пользователь {callback.from_user.id} листает очередь модерации: {direction} {cursor}")
+    if direction == "after":
+        response, keyboard = await render_moderation_queue(db, state, after_id=cursor)
+    else:
+        response, keyboard = await render_moderation_queue(db, state, before_id=cursor)
+    await edit_text(callback.message, response, reply_markup=keyboard)
     await callback.answer()
 
 
 @router.callback_query(F.data == "refresh_moderation")
-async def refresh_moderation_queue(callback: CallbackQuery, db):
+async def refresh_moderation_queue(callback: CallbackQuery, db, state: FSMContext):
     """Обновить очередь модерации"""
     logfire.info(f"Пользователь {callback.from_user.id} обновил очередь модерации")
-    pending_posts = await ModerationService.get_moderation_queue(db)
-
-    if not pending_posts:
-        logfire.info("Очередь модерации пуста при обновлении")
-        await callback.message.edit_text(
-            "Нет постов на модерации.",
-            reply_markup=get_moderation_queue_keyboard(),
-        )
-        await callback.answer("Очередь обновлена")
-        return
+    # Счетчик мог устареть, если посты менялись в другом процессе
+    ModerationService.invalidate_pending_count()
+    response, keyboard = await render_moderation_queue(db, state)
+    # Если очередь не изменилась, edit_text не обращается к Telegram
+    await edit_text(callback.message, response, reply_markup=keyboard)
+    await callback.answer("Очередь обновлена")
+
+
+@router.callback_query(F.data.startswith("moderation_toggle_"))
+async def toggle_moderation_selection(callback: CallbackQuery, db, state: FSMContext):
+    """Выбрать пост для пакетной модерации или снять выбор"""
+    post_id = int(callback.data.split("_")[2])
+    data = await state.get_data()
+    selected = set(data.get("moderation_selected", []))
+    selected ^= {post_id}
+    await state.update_data(moderation_selected=sorted(selected))
+    await rerender_moderation_queue(callback, db, state)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "moderation_select_page")
+async def select_moderation_page(callback: CallbackQuery, db, state: FSMContext):
+    """Выбрать все посты текущей страницы"""
+    data = await state.get_data()
+    selected = set(data.get("moderation_selected", []))
+    selected.update(data.get("moderation_page_ids", []))
+    await state.update_data(moderation_selected=sorted(selected))
+    await rerender_moderation_queue(callback, db, state)
+    await callback.answer()
+
 
-    logfire.info(f"Обновлено: найдено {len(pending_posts)} постов на модерации")
-    response = "Посты на модерации:\n\n"
-    for post in pending_posts:
-        await db.refresh(post, attribute_names=["author", "categories"])
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
-        response += f"{post.title}\n"
-        response += f"Город: {post_city}\n"
-        response += f"{post.author.first_name or post.author.username}\n"
-        response += f"{category_str}\n"
-        response += f"ID: {post.id}\n\n"
-
-    await callback.message.edit_text(
-        response, reply_markup=get_moderation_queue_keyboard()
+@router.callback_query(F.data == "moderation_clear")
+async def clear_moderation_selection(callback: CallbackQuery, db, state: FSMContext):
+    """Сбросить выбор постов"""
+    await state.update_data(moderation_selected=[])
+    await rerender_moderation_queue(callback, db, state)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "moderation_claim")
+async def claim_moderation_posts(callback: CallbackQuery, db, state: FSMContext):
+    """Взять в работу следующие свободные посты и выбрать их"""
+    moderator = callback.from_user
+    claimed_ids = await ModerationService.claim_posts(
+        db, moderator.id, moderator.full_name or moderator.username or str(moderator.id)
     )
-    await callback.answer("Очередь обновлена")
+    logfire.info(f"Модератор {moderator.id} взял в работу посты {claimed_ids}")
+    if not claimed_ids:
+        await callback.answer("Свободных постов нет")
+        return
+    data = await state.get_data()
+    selected = set(data.get("moderation_selected", []))
+    await state.update_data(moderation_selected=sorted(selected | set(claimed_ids)))
+    await rerender_moderation_queue(callback, db, state)
+    await callback.answer(f"🙋 Взято в работу: {len(claimed_ids)}")
+
+
+@router.callback_query(F.data == "moderation_release")
+async def release_moderation_posts(callback: CallbackQuery, db, state: FSMContext):
+    """Вернуть в очередь все посты модератора"""
+    released = await ModerationService.release_claims(db, callback.from_user.id)
+    logfire.info(f"Модератор {callback.from_user.id} вернул в очередь {released} постов")
+    await state.update_data(moderation_selected=[])
+    await rerender_moderation_queue(callback, db, state)
+    await callback.answer(f"↩️ Возвращено в очередь: {released}")
+
+
+def schedule_feed_fan_out(db, post_ids) -> None:
+    """Разложить одобренные посты по материализованным лентам после коммита"""
+    if FeedService.is_materialized():
+        after_commit(db, lambda: run_in_background(
+            FeedService.fan_out_posts(post_ids),
+            name=f"feed_fan_out_{post_ids[0]}",
+        ))
+
+
+@router.callback_query(F.data.in_({"moderation_bulk_approve", "moderation_bulk_reject"}))
+async def process_bulk_moderation(callback: CallbackQuery, db, state: FSMContext):
+    """Одобрить или отклонить выбранные посты одной транзакцией"""
+    data = await state.get_data()
+    selected = data.get("moderation_selected", [])
+    if not selected:
+        await callback.answer("Посты не выбраны")
+        return
+
+    approve = callback.data == "moderation_bulk_approve"
+    action = ModerationAction.APPROVE if approve else ModerationAction.REJECT
+    logfire.info(f"Модератор {callback.from_user.id} выполняет {action.name} для {len(selected)} постов")
+    moderated_ids = await PostService.bulk_moderate(db, selected, callback.from_user.id, action)
+    await state.update_data(moderation_selected=[])
+
+    if approve and moderated_ids:
+        schedule_feed_fan_out(db, moderated_ids)
+        # Рассылка уведомлений идет одной фоновой задачей, модератор ее не ждет
+        # Задача читает посты своей сессией, поэтому запускается после коммита
+        after_commit(db, lambda: run_in_background(
+            send_bulk_post_notifications(callback.bot, moderated_ids),
+            name=f"bulk_notifications_{callback.from_user.id}",
+        ))
+
+    response, keyboard = await render_moderation_queue(db, state)
+    await edit_text(callback.message, response, reply_markup=keyboard)
+    skipped = len(selected) - len(moderated_ids)
+    result = f"✅ Одобрено: {len(moderated_ids)}" if approve else f"❌ Отклонено: {len(moderated_ids)}"
+    if skipped:
+        result += f", пропущено (обработаны или в работе у других): {skipped}"
+    await callback.answer(result)
 
 
 @router.callback_query(F.data.startswith("moderate_"))
@@ -133,45 +215,55 @@ async def process_moderation_action(callback: CallbackQuery, db):
     
     logfire.info(f"Модератор {callback.from_user.id} выполняет действие {action} для поста {post_id}")
 
+    # Пост в работе у другого модератора не трогаем, пока его аренда не истекла
+    holder = await ModerationService.get_claim_holder(db, post_id, callback.from_user.id)
+    if holder:
+        logfire.info(f"Пост {post_id} в работе у модератора {holder}")
+        await callback.answer(f"🔒 Пост в работе у {holder}")
+        return
+
     if action == "approve":
+        # Одобрение сразу публикует пост; None означает, что пост уже обработан
         post = await PostService.approve_post(db, post_id, callback.from_user.id)
         if post:
-            # Публикуем пост
-            post = await PostService.publish_post(db, post_id)
-            await db.refresh(post, attribute_names=["author", "categories"])
             logfire.info(f"Пост {post_id} одобрен и опубликован модератором {callback.from_user.id}")
+            schedule_feed_fan_out(db, [post_id])
             
-            # Отправляем уведомления пользователям
-            users_to_notify = await NotificationService.get_users_to_notify(
-                db, post
+            # Уведомления рассылает только модератор, чей переход выполнился
+            post_view = (await PostService.get_post_views(db, [post_id]))[0]
+            users_to_notify = await NotificationService.get_user_ids_to_notify(
+                db, post_view
             )
             logfire.info(f"Отправляем уведомления {len(users_to_notify)} пользователям")
-            await send_post_notification(callback.bot, post, users_to_notify, db)
+            # Рассылка начинается только после коммита перехода и идет фоновой
+            # задачей: ответ модератору не ждет отправки всем подписчикам
+            after_commit(db, lambda: run_in_background(
+                send_post_notification(callback.bot, post_view, users_to_notify),
+                name=f"post_notifications_{post_id}",
+            ))
 
             await callback.answer("✅ Пост одобрен и опубликован!")
             await callback.message.delete()
         else:
-            logfire.error(f"Ошибка при одобрении поста {post_id}")
-            await callback.answer("❌ Ошибка при одобрении поста")
+            logfire.warning(f"Пост {post_id} уже обработан, одобрение пропущено")
+            await callback.answer("⚠️ Пост уже обработан другим модератором")
 
     elif action == "reject":
         post = await PostService.reject_post(db, post_id, callback.from_user.id)
         if post:
-            await db.refresh(post, attribute_names=["author", "categories"])
             logfire.info(f"Пост {post_id} отклонен модератором {callback.from_user.id}")
             await callback.answer("❌ Пост отклонен!")
             await callback.message.delete()
         else:
-            logfire.error(f"Ошибка при отклонении поста {post_id}")
-            await callback.answer("❌ Ошибка при отклонении поста")
+            logfire.warning(f"Пост {post_id} уже обработан, отклонение пропущено")
+            await callback.answer("⚠️ Пост уже обработан другим модератором")
 
     elif action == "changes":
         post = await PostService.request_changes(db, post_id, callback.from_user.id)
         if post:
-            await db.refresh(post, attribute_names=["author", "categories"])
             logfire.info(f"Для поста {post_id} запрошены изменения модератором {callback.from_user.id}")
             await callback.answer("📝 Запрошены изменения в посте!")
             await callback.message.delete()
         else:
-            logfire.error(f"Ошибка при запросе изменений для поста {post_id}")
-            await callback.answer("❌ Ошибка при запросе изменений")
+            logfire.warning(f"Пост {post_id} уже обработан, запрос изменений пропущен")
+            await callback.answer("⚠️ Пост уже обработан другим модератором")
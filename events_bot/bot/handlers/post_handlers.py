@@ -10,6 +10,7 @@ from events_bot.bot.keyboards import (
     get_category_selection_keyboard,
     get_city_keyboard,
 )
+from events_bot.bot.utils import edit_text
 from events_bot.storage import file_storage
 from loguru import logger
 
@@ -53,7 +54,8 @@ async def start_create_post(callback: CallbackQuery, state: FSMContext, db):
     await state.set_state(PostStates.creating_post)
     
     # Сначала предлагаем выбрать город
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🏙️ Выберите город для поста:",
         reply_markup=get_city_keyboard(for_post=True)
     )
@@ -65,7 +67,8 @@ async def start_create_post(callback: CallbackQuery, state: FSMContext, db):
 async def cancel_post_creation(callback: CallbackQuery, state: FSMContext, db):
     """Отмена создания поста"""
     await state.clear()
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "❌ Создание поста отменено.",
         reply_markup=get_main_keyboard()
     )
@@ -83,7 +86,8 @@ async def process_post_city_selection(callback: CallbackQuery, state: FSMContext
     # Получаем все категории для выбора
     all_categories = await CategoryService.get_all_categories(db)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🏙️ Город {city} выбран!\n\n📂 Теперь выберите категории для поста:",
         reply_markup=get_category_selection_keyboard(all_categories, for_post=True)
     )
@@ -106,7 +110,8 @@ async def process_post_category_selection(callback: CallbackQuery, state: FSMCon
 
     # Получаем все категории для выбора
     all_categories = await CategoryService.get_all_categories(db)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "📂 Выберите одну или несколько категорий для поста (можно выбрать несколько):",
         reply_markup=get_category_selection_keyboard(all_categories, category_ids, for_post=True)
     )
@@ -123,7 +128,8 @@ async def confirm_post_categories(callback: CallbackQuery, state: FSMContext, db
         return
     await state.update_data(category_ids=category_ids)
     logfire.info(f"Категории подтверждены для пользователя {callback.from_user.id}: {category_ids}")
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📝 Создание поста в категориях: {len(category_ids)} выбрано\n\nВведите заголовок поста:"
     )
     await state.set_state(PostStates.waiting_for_title)
@@ -207,6 +213,8 @@ async def process_post_image(message: Message, state: FSMContext, db):
     
     # Сохраняем файл
     file_id = await file_storage.save_file(file_data.read(), 'jpg')
+    # Фото уже загружено в Telegram, повторно его отправлять не нужно
+    file_storage.media_cache.remember_telegram_file_id(file_id, photo.file_id)
     
     await state.update_data(image_id=file_id)
     await continue_post_creation(message, state, db)
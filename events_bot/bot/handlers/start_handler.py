@@ -16,14 +16,16 @@ def register_start_handlers(dp: Router):
 @router.message(F.text == "/start")
 async def cmd_start(message: Message, state: FSMContext, db):
     """Обработчик команды /start"""
-    # Регистрируем пользователя
-    user = await UserService.register_user(
-        db=db,
-        telegram_id=message.from_user.id,
-        username=message.from_user.username,
-        first_name=message.from_user.first_name,
-        last_name=message.from_user.last_name,
-    )
+    # Повторный /start обходится чтением строки; регистрируем только новых
+    user = await UserService.get_user_row(db, message.from_user.id)
+    if user is None:
+        user = await UserService.register_user(
+            db=db,
+            telegram_id=message.from_user.id,
+            username=message.from_user.username,
+            first_name=message.from_user.first_name,
+            last_name=message.from_user.last_name,
+        )
 
     # Проверяем, есть ли у пользователя город
     if not user.city:
@@ -7,7 +7,9 @@ from events_bot.bot.keyboards import (
     get_main_keyboard,
     get_category_selection_keyboard,
     get_city_keyboard,
+    get_my_posts_keyboard,
 )
+from events_bot.bot.utils import edit_text
 
 router = Router()
 
@@ -17,32 +19,23 @@ def register_user_handlers(dp: Router):
     dp.include_router(router)
 
 
+async def render_my_posts(db, user_id: int, after_id: int = None, before_id: int = None):
+    """Текст и клавиатура страницы постов автора"""
+    page = await PostService.get_user_posts_page(
+        db, user_id, after_id=after_id, before_id=before_id
+    )
+    if not page.items:
+        return "📭 У вас пока нет постов.", get_main_keyboard()
+    return PostService.format_user_posts_page(page), get_my_posts_keyboard(
+        page.prev_cursor, page.next_cursor
+    )
+
+
 @router.message(F.text == "/my_posts")
 async def cmd_my_posts(message: Message, db):
     """Обработчик команды /my_posts"""
-    posts = await PostService.get_user_posts(db, message.from_user.id)
-
-    if not posts:
-        await message.answer(
-            "📭 У вас пока нет постов.", reply_markup=get_main_keyboard()
-        )
-        return
-
-    response = "📊 Ваши посты:\n\n"
-    for post in posts:
-        # Загружаем связанные объекты
-        await db.refresh(post, attribute_names=["categories"])
-        status = "✅ Одобрен" if post.is_approved else "⏳ На модерации"
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
-        response += f"📝 {post.title}\n"
-        response += f"🎓 {post_city}\n"
-        response += f"🌟 {category_str}\n"
-        response += f"📅 {post.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-        response += f"📊 {status}\n\n"
-
-    await message.answer(response, reply_markup=get_main_keyboard())
+    response, keyboard = await render_my_posts(db, message.from_user.id)
+    await message.answer(response, reply_markup=keyboard)
 
 
 @router.message(F.text == "/change_city")
@@ -125,10 +118,10 @@ async def process_city_selection_callback(callback: CallbackQuery, state: FSMCon
         first_name=callback.from_user.first_name,
         last_name=callback.from_user.last_name,
     )
-    user.city = city
-    await db.commit()
+    UserService.set_city(db, user, city)
     categories = await CategoryService.get_all_categories(db)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🏙️ Город {city} выбран!\n\nТеперь выберите категории для публикации постов:",
         reply_markup=get_category_selection_keyboard(categories),
     )
@@ -139,7 +132,8 @@ async def process_city_selection_callback(callback: CallbackQuery, state: FSMCon
 @router.callback_query(F.data == "change_city")
 async def change_city_callback(callback: CallbackQuery, state: FSMContext):
     """Изменение города через инлайн-кнопку"""
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите новый город:", reply_markup=get_city_keyboard()
     )
     await state.set_state(UserStates.waiting_for_city)
@@ -155,7 +149,8 @@ async def change_category_callback(callback: CallbackQuery, state: FSMContext, d
     )
     selected_ids = [cat.id for cat in user_categories]
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "Выберите категории для публикации постов:",
         reply_markup=get_category_selection_keyboard(categories, selected_ids),
     )
@@ -166,29 +161,23 @@ async def change_category_callback(callback: CallbackQuery, state: FSMContext, d
 @router.callback_query(F.data == "my_posts")
 async def show_my_posts_callback(callback: CallbackQuery, db):
     """Показать посты пользователя через инлайн-кнопку"""
-    posts = await PostService.get_user_posts(db, callback.from_user.id)
-
-    if not posts:
-        await callback.message.edit_text(
-            "📭 У вас пока нет постов.", reply_markup=get_main_keyboard()
-        )
-        return
-
-    response = "📊 Ваши посты:\n\n"
-    for post in posts:
-        # Загружаем связанные объекты
-        await db.refresh(post, attribute_names=["categories"])
-        status = "✅ Одобрен" if post.is_approved else "⏳ На модерации"
-        category_names = [cat.name for cat in post.categories] if post.categories else ['Неизвестно']
-        category_str = ', '.join(category_names)
-        post_city = getattr(post, 'city', 'Не указан')
-        response += f"📝 {post.title}\n"
-        response += f"🎓 {post_city}\n"
-        response += f"🌟 {category_str}\n"
-        response += f"📅 {post.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-        response += f"📊 {status}\n\n"
-
-    await callback.message.edit_text(response, reply_markup=get_main_keyboard())
+    response, keyboard = await render_my_posts(db, callback.from_user.id)
+    await edit_text(callback.message, response, reply_markup=keyboard)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("my_posts_"))
+async def navigate_my_posts(callback: CallbackQuery, db):
+    """Листание постов автора по курсору"""
+    _, _, direction, cursor = callback.data.split("_")
+    cursor = int(cursor)
+    response, keyboard = await render_my_posts(
+        db,
+        callback.from_user.id,
+        after_id=cursor if direction == "after" else None,
+        before_id=cursor if direction == "before" else None,
+    )
+    await edit_text(callback.message, response, reply_markup=keyboard)
     await callback.answer()
 
 
@@ -218,7 +207,8 @@ async def show_help_callback(callback: CallbackQuery):
 ❓ **Поддержка:** Обратитесь к администратору бота
 """
 
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         help_text, reply_markup=get_main_keyboard(), parse_mode="Markdown"
     )
     await callback.answer()
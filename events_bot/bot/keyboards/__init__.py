@@ -3,7 +3,8 @@ from .city_keyboard import get_city_keyboard
 from .category_keyboard import get_category_keyboard, get_category_selection_keyboard
 from .moderation_keyboard import get_moderation_keyboard, get_moderation_queue_keyboard
 from .post_keyboard import get_skip_image_keyboard
-from .feed_keyboard import get_feed_keyboard
+from .feed_keyboard import get_feed_keyboard, get_feed_batch_keyboard
+from .my_posts_keyboard import get_my_posts_keyboard
 
 __all__ = [
     "get_main_keyboard",
@@ -14,4 +15,6 @@ __all__ = [
     "get_moderation_queue_keyboard",
     "get_skip_image_keyboard",
     "get_feed_keyboard",
+    "get_feed_batch_keyboard",
+    "get_my_posts_keyboard",
 ]
@@ -1,5 +1,10 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup
+from typing import List, Tuple
+from events_bot.database.read_models import FeedPostView
+
+# Сколько кнопок сердечек помещается в один ряд на странице из нескольких постов
+HEARTS_PER_ROW = 5
 
 def get_feed_keyboard(current_page: int, total_pages: int, post_id: int, is_liked: bool = False, likes_count: int = 0) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура для ленты постов"""
@@ -22,4 +27,44 @@ def get_feed_keyboard(current_page: int, total_pages: int, post_id: int, is_like
     # Настраиваем расположение кнопок
     builder.adjust(2)
     
-    return builder.as_markup() 
+    return builder.as_markup()
+
+
+def get_feed_batch_keyboard(
+    current_page: int, total_pages: int, posts: List[Tuple[int, FeedPostView]]
+) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура для страницы ленты из нескольких постов
+
+    Args:
+        posts: Пары (позиция в ленте, пост); кнопка сердечка подписана
+            номером поста на странице
+    """
+    builder = InlineKeyboardBuilder()
+
+    # Кнопки сердечек, по одной на пост
+    for index, post in posts:
+        heart_emoji = "❤️" if post.is_liked else "🤍"
+        heart_text = f"{index + 1}. {heart_emoji}"
+        if post.likes_count > 0:
+            heart_text += f" {post.likes_count}"
+        builder.button(text=heart_text, callback_data=f"feed_heart_{post.id}_{current_page}_{total_pages}")
+    sizes = [HEARTS_PER_ROW] * (len(posts) // HEARTS_PER_ROW)
+    if len(posts) % HEARTS_PER_ROW:
+        sizes.append(len(posts) % HEARTS_PER_ROW)
+
+    # Кнопки навигации
+    navigation = 0
+    if current_page > 0:
+        builder.button(text="⬅️ Назад", callback_data=f"feed_prev_{current_page}_{total_pages}")
+        navigation += 1
+    if current_page < total_pages - 1:
+        builder.button(text="Вперед ➡️", callback_data=f"feed_next_{current_page}_{total_pages}")
+        navigation += 1
+    if navigation:
+        sizes.append(navigation)
+
+    builder.button(text="💡 Главное меню", callback_data="main_menu")
+    sizes.append(1)
+
+    builder.adjust(*sizes)
+    return builder.as_markup()
@@ -1,5 +1,6 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup
+from typing import Collection, Optional, Sequence
 
 
 def get_moderation_keyboard(post_id: int) -> InlineKeyboardMarkup:
@@ -13,8 +14,47 @@ def get_moderation_keyboard(post_id: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def get_moderation_queue_keyboard() -> InlineKeyboardMarkup:
-    """Инлайн-клавиатура для очереди модерации"""
+def get_moderation_queue_keyboard(
+    prev_cursor: Optional[int] = None,
+    next_cursor: Optional[int] = None,
+    post_ids: Sequence[int] = (),
+    selected: Collection[int] = (),
+) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура для очереди модерации с навигацией и выбором постов"""
     builder = InlineKeyboardBuilder()
+    sizes = []
+
+    # Кнопки выбора постов текущей страницы, по 5 в ряд
+    for post_id in post_ids:
+        mark = "☑️" if post_id in selected else "▫️"
+        builder.button(text=f"{mark} {post_id}", callback_data=f"moderation_toggle_{post_id}")
+    sizes += [5] * (len(post_ids) // 5) + ([len(post_ids) % 5] if len(post_ids) % 5 else [])
+
+    navigation = 0
+    if prev_cursor is not None:
+        builder.button(text="⬅️ Назад", callback_data=f"moderation_before_{prev_cursor}")
+        navigation += 1
+    if next_cursor is not None:
+        builder.button(text="Вперед ➡️", callback_data=f"moderation_after_{next_cursor}")
+        navigation += 1
+    if navigation:
+        sizes.append(navigation)
+
+    if post_ids:
+        builder.button(text="Выбрать страницу", callback_data="moderation_select_page")
+        if selected:
+            builder.button(text="Сбросить выбор", callback_data="moderation_clear")
+        sizes.append(2 if selected else 1)
+    if selected:
+        builder.button(text=f"✅ Одобрить ({len(selected)})", callback_data="moderation_bulk_approve")
+        builder.button(text=f"❌ Отклонить ({len(selected)})", callback_data="moderation_bulk_reject")
+        sizes.append(2)
+
+    builder.button(text="🙋 Взять в работу", callback_data="moderation_claim")
+    builder.button(text="↩️ Вернуть мои", callback_data="moderation_release")
+    sizes.append(2)
+
     builder.button(text="🔄 Обновить", callback_data="refresh_moderation")
+    sizes.append(1)
+    builder.adjust(*sizes)
     return builder.as_markup()
@@ -0,0 +1,26 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import InlineKeyboardMarkup
+from typing import Optional
+
+
+def get_my_posts_keyboard(
+    prev_cursor: Optional[int] = None, next_cursor: Optional[int] = None
+) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура для списка постов автора с навигацией по курсору"""
+    builder = InlineKeyboardBuilder()
+    sizes = []
+
+    navigation = 0
+    if prev_cursor is not None:
+        builder.button(text="⬅️ Новее", callback_data=f"my_posts_before_{prev_cursor}")
+        navigation += 1
+    if next_cursor is not None:
+        builder.button(text="Старее ➡️", callback_data=f"my_posts_after_{next_cursor}")
+        navigation += 1
+    if navigation:
+        sizes.append(navigation)
+
+    builder.button(text="💡 Главное меню", callback_data="main_menu")
+    sizes.append(1)
+    builder.adjust(*sizes)
+    return builder.as_markup()
@@ -1,11 +1,39 @@
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from typing import Callable, Dict, Any, Awaitable
-from events_bot.bot.utils import get_db_session
+import logfire
+from events_bot.bot.utils import LazySession
+from events_bot.database.unit_of_work import unit_of_work
+
+
+# Метрики использования базы данных обработчиками
+updates_counter = logfire.metric_counter(
+    "db_middleware_updates", description="Обновления, прошедшие через DatabaseMiddleware"
+)
+updates_without_db_counter = logfire.metric_counter(
+    "db_middleware_updates_without_db", description="Обновления, обработанные без обращения к базе"
+)
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    """Middleware для автоматического получения сессии базы данных"""
+    """Middleware для автоматического получения сессии базы данных
+
+    Каждое обновление - одна единица работы: коммит выполняется один раз
+    после успешного обработчика, при ошибке транзакция откатывается.
+    Сессия создается лениво, при первом обращении обработчика к db.
+    """
+
+    def __init__(self):
+        self.updates = 0
+        self.updates_without_db = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Доля обновлений, которым база не понадобилась"""
+        return {
+            "updates": self.updates,
+            "updates_without_db": self.updates_without_db,
+            "without_db_ratio": self.updates_without_db / self.updates if self.updates else 0.0,
+        }
     
     async def __call__(
         self,
@@ -13,7 +41,15 @@ class DatabaseMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        async with get_db_session() as db:
-            data['db'] = db
-            return await handler(event, data)
-
+        db = LazySession()
+        try:
+            async with unit_of_work(db):
+                data['db'] = db
+                return await handler(event, data)
+        finally:
+            await db.close()
+            self.updates += 1
+            updates_counter.add(1)
+            if not db.started:
+                self.updates_without_db += 1
+                updates_without_db_counter.add(1)
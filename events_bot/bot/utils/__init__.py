@@ -1,4 +1,27 @@
-from .database import get_db_session
-from .notifications import send_post_notification
+from .database import get_db_session, LazySession
+from .notifications import send_post_notification, send_bulk_post_notifications
+from .background import run_in_background
+from .feed_prefetch import (
+    take_prefetched_post,
+    discard_prefetched_post,
+    reset_feed_prefetch,
+    schedule_feed_prefetch,
+)
+from .rendering import edit_text, edit_media, edit_reply_markup, forget_message, render_stats
 
-__all__ = ["get_db_session", "send_post_notification"]
+__all__ = [
+    "get_db_session",
+    "LazySession",
+    "send_post_notification",
+    "send_bulk_post_notifications",
+    "run_in_background",
+    "take_prefetched_post",
+    "discard_prefetched_post",
+    "reset_feed_prefetch",
+    "schedule_feed_prefetch",
+    "edit_text",
+    "edit_media",
+    "edit_reply_markup",
+    "forget_message",
+    "render_stats",
+]
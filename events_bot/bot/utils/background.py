@@ -0,0 +1,24 @@
+import asyncio
+from typing import Awaitable, Set
+import logfire
+
+
+# Ссылки на запущенные задачи, чтобы их не собрал сборщик мусора до завершения
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def run_in_background(coro: Awaitable, name: str = None) -> asyncio.Task:
+    """Запустить корутину в фоне, не задерживая ответ пользователю"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_task_done)
+    return task
+
+
+def _on_task_done(task: asyncio.Task) -> None:
+    """Убрать завершенную задачу и залогировать ошибку, если она была"""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logfire.error(
+            f"Ошибка фоновой задачи {task.get_name()}: {task.exception()}"
+        )
@@ -1,8 +1,51 @@
+from typing import Any, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from events_bot.database import create_async_engine_and_session
+from events_bot.database import get_session_maker
 
 
 def get_db_session():
     """Получить сессию базы данных"""
-    engine, session_maker = create_async_engine_and_session()
-    return session_maker()
+    return get_session_maker()()
+
+
+class LazySession:
+    """Сессия, которая создается только при первом обращении к ней
+
+    Обработчики вроде /help и главного меню базу не используют, поэтому
+    для них не создается ни сессия, ни транзакция. Пока сессии нет,
+    commit и rollback ничего не делают.
+    """
+
+    def __init__(self, session_factory=get_db_session):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+        # Свой словарь info, чтобы after_commit не создавал сессию
+        self.info: Dict[str, Any] = {}
+
+    @property
+    def started(self) -> bool:
+        """Была ли сессия создана"""
+        return self._session is not None
+
+    def _get_session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+            # Дальше proxy и сессия работают с одним словарем info
+            self._session.info.update(self.info)
+            self.info = self._session.info
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_session(), name)
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,119 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import logfire
+from events_bot.database.cache import TTLCache
+from events_bot.database.read_models import FeedPostView
+from events_bot.database.services import PostService, UserService
+from events_bot.storage import file_storage
+from .background import run_in_background
+from .database import get_db_session
+
+
+# Предзагрузка ленты: после показа поста следующие посты снимка ленты
+# загружаются в фоне, и нажатие «Вперед» обслуживается из памяти. Картинки
+# в памяти не хранятся: хранилище заранее готовит их (временная ссылка S3,
+# файл в дисковом кэше), а при показе картинка получается по id.
+FEED_PREFETCH_AHEAD = int(os.getenv("FEED_PREFETCH_AHEAD", "3"))
+# Пользователь -> (категории, по которым построен снимок; посты по позициям).
+# Позиции относятся к снимку для этих категорий: после смены категорий
+# предзагруженные посты не подходят
+_prefetched = TTLCache(
+    ttl=float(os.getenv("FEED_PREFETCH_TTL", "60")),
+    max_entries=int(os.getenv("FEED_PREFETCH_MAX_USERS", "10000")),
+)
+# Метка текущей фоновой загрузки пользователя: не больше одной задачи на
+# пользователя, а результат задачи, отмененной сбросом, отбрасывается
+_in_flight: Dict[int, object] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class PrefetchedFeedPost:
+    """Пост ленты, загруженный заранее"""
+
+    post: FeedPostView
+    total_posts: int
+
+
+def _entries(user_id: int, category_ids: Tuple[int, ...]) -> Dict[int, PrefetchedFeedPost]:
+    """Предзагруженные посты снимка ленты для этих категорий"""
+    cached = _prefetched.get(user_id)
+    if cached is None or cached[0] != category_ids:
+        return {}
+    return cached[1]
+
+
+def take_prefetched_post(
+    user_id: int, category_ids: Tuple[int, ...], index: int
+) -> Optional[PrefetchedFeedPost]:
+    """Забрать заранее загруженный пост ленты по позиции в снимке
+
+    Args:
+        category_ids: Текущие категории пользователя (FeedContext.category_ids)
+    """
+    return _entries(user_id, category_ids).pop(index, None)
+
+
+def discard_prefetched_post(user_id: int, post_id: int) -> None:
+    """Забыть заранее загруженный пост (например, после нажатия на сердечко)"""
+    cached = _prefetched.get(user_id)
+    if cached is None:
+        return
+    entries = cached[1]
+    for index in [index for index, entry in entries.items() if entry.post.id == post_id]:
+        del entries[index]
+
+
+def reset_feed_prefetch(user_id: int) -> None:
+    """Сбросить предзагрузку пользователя (при открытии ленты заново, смене категорий)"""
+    _prefetched.invalidate(user_id)
+    _in_flight.pop(user_id, None)
+
+
+def schedule_feed_prefetch(
+    user_id: int, category_ids: Tuple[int, ...], index: int, total_posts: int
+) -> None:
+    """Запустить фоновую загрузку постов ленты с позиции index"""
+    if FEED_PREFETCH_AHEAD <= 0 or user_id in _in_flight:
+        return
+    entries = _entries(user_id, category_ids)
+    end = min(index + FEED_PREFETCH_AHEAD, total_posts)
+    missing = [position for position in range(index, end) if position not in entries]
+    if not missing:
+        return
+    token = object()
+    _in_flight[user_id] = token
+    run_in_background(
+        _prefetch(user_id, missing[0], end - missing[0], token),
+        name=f"feed_prefetch_{user_id}",
+    )
+
+
+async def _prefetch(user_id: int, start: int, count: int, token: object) -> None:
+    """Загрузить посты, подготовить их картинки и сложить посты в кэш пользователя"""
+    try:
+        async with get_db_session() as db:
+            # Категории читаются до окна: если они сменятся между запросами,
+            # посты запишутся под старыми категориями и просто не будут взяты
+            category_ids = (await UserService.get_feed_context(db, user_id)).category_ids
+            window, total_posts = await PostService.get_feed_window(db, user_id, start, count)
+        image_ids: List[str] = [post.image_id for _, post in window if post.image_id]
+        if image_ids:
+            # Результат не сохраняем: при показе картинка берется из хранилища
+            # уже без сетевых запросов, а данные файлов не держатся в памяти
+            await file_storage.resolve_many(image_ids)
+        if _in_flight.get(user_id) is not token:
+            return
+        # Посты позади текущей позиции больше не понадобятся
+        entries = {
+            position: entry
+            for position, entry in _entries(user_id, category_ids).items()
+            if position >= start
+        }
+        for position, post in window:
+            entries[position] = PrefetchedFeedPost(post=post, total_posts=total_posts)
+        _prefetched.set(user_id, (category_ids, entries))
+        logfire.debug(f"Предзагружено {len(window)} постов ленты пользователя {user_id} с позиции {start}")
+    finally:
+        if _in_flight.get(user_id) is token:
+            del _in_flight[user_id]
@@ -1,51 +1,66 @@
 from aiogram import Bot
 from typing import List
-from events_bot.database.models import User, Post
-from events_bot.database.services import NotificationService
+from events_bot.database.read_models import FeedPostView
+from events_bot.database.services import NotificationService, PostService
 from events_bot.storage import file_storage
 from aiogram.types import FSInputFile, InputMediaPhoto
 import logfire
+from .database import get_db_session
 
 
-async def send_post_notification(bot: Bot, post: Post, users: List[User], db) -> None:
+async def send_post_notification(bot: Bot, post: FeedPostView, user_ids: List[int]) -> None:
     """Отправить уведомления о новом посте"""
-    logfire.info(f"Отправляем уведомления о посте {post.id} {len(users)} пользователям")
+    logfire.info(f"Отправляем уведомления о посте {post.id} {len(user_ids)} пользователям")
     
-    # Загружаем связанные объекты
-    await db.refresh(post, attribute_names=["author", "categories"])
     notification_text = NotificationService.format_post_notification(post)
 
     success_count = 0
     error_count = 0
     
-    for user in users:
+    for user_id in user_ids:
         try:
-            logfire.debug(f"Отправляем уведомление пользователю {user.id}")
+            logfire.debug(f"Отправляем уведомление пользователю {user_id}")
             
             # Если у поста есть изображение, отправляем с фото
             if post.image_id:
                 media_photo = await file_storage.get_media_photo(post.image_id)
                 if media_photo:
-                    logfire.debug(f"Отправляем уведомление с изображением пользователю {user.id}")
-                    await bot.send_photo(
-                        chat_id=user.id,
+                    logfire.debug(f"Отправляем уведомление с изображением пользователю {user_id}")
+                    sent = await bot.send_photo(
+                        chat_id=user_id,
                         photo=media_photo.media,
                         caption=notification_text
                     )
+                    # Остальным пользователям отправляем уже загруженный в Telegram файл
+                    file_storage.media_cache.remember_sent_photo(post.image_id, sent)
                 else:
                     # Если файл не найден, отправляем только текст
                     logfire.warning(f"Изображение для поста {post.id} не найдено, отправляем только текст")
-                    await bot.send_message(chat_id=user.id, text=notification_text)
+                    await bot.send_message(chat_id=user_id, text=notification_text)
             else:
                 # Если нет изображения, отправляем только текст
-                logfire.debug(f"Отправляем уведомление без изображения пользователю {user.id}")
-                await bot.send_message(chat_id=user.id, text=notification_text)
+                logfire.debug(f"Отправляем уведомление без изображения пользователю {user_id}")
+                await bot.send_message(chat_id=user_id, text=notification_text)
             
             success_count += 1
-            logfire.debug(f"Уведомление успешно отправлено пользователю {user.id}")
+            logfire.debug(f"Уведомление успешно отправлено пользователю {user_id}")
             
         except Exception as e:
             error_count += 1
-            logfire.warning(f"Ошибка отправки уведомления пользователю {user.id}: {e}")
+            logfire.warning(f"Ошибка отправки уведомления пользователю {user_id}: {e}")
     
     logfire.info(f"Уведомления отправлены: успешно={success_count}, ошибок={error_count}")
+
+
+async def send_bulk_post_notifications(bot: Bot, post_ids: List[int]) -> None:
+    """Разослать уведомления о нескольких одобренных постах одной задачей"""
+    # Посты и получатели читаются заранее: сессия не держит соединение
+    # из пула, пока идет долгая отправка в Telegram
+    async with get_db_session() as db:
+        posts = await PostService.get_post_views(db, post_ids)
+        audiences = [
+            (post, await NotificationService.get_user_ids_to_notify(db, post)) for post in posts
+        ]
+    logfire.info(f"Рассылка уведомлений о {len(posts)} одобренных постах")
+    for post, user_ids in audiences:
+        await send_post_notification(bot, post, user_ids)
@@ -0,0 +1,201 @@
+import os
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, InputMediaPhoto, Message
+import logfire
+from events_bot.database.cache import TTLCache
+
+
+# Редактирование сообщений без лишних запросов к Telegram.
+#
+# Перед правкой новое содержимое (текст, клавиатура, картинка) сравнивается
+# с тем, что показано в сообщении сейчас. Если оно совпадает, запрос не
+# отправляется - Telegram все равно ответил бы ошибкой "message is not
+# modified" после полного обращения к API. Текущее содержимое берется из
+# самого сообщения (например, из callback.message - это актуальные данные
+# Telegram). Кэш последних правок процесса дополняет то, что по сообщению не
+# восстановить: текст с разметкой и id картинки в хранилище, - и только пока
+# сообщение совпадает с результатом этой правки.
+
+edits_counter = logfire.metric_counter(
+    "telegram_edits", description="Запросы на редактирование сообщений, отправленные в Telegram"
+)
+edits_skipped_counter = logfire.metric_counter(
+    "telegram_edits_skipped", description="Редактирования, пропущенные как не меняющие сообщение"
+)
+
+# Отпечаток: (текст, клавиатура, картинка); None - часть неизвестна
+Fingerprint = Tuple[Optional[int], Optional[int], Optional[str]]
+
+_rendered = TTLCache(
+    ttl=float(os.getenv("RENDER_FINGERPRINT_TTL", "86400")),
+    max_entries=int(os.getenv("RENDER_FINGERPRINT_CACHE_SIZE", "10000")),
+)
+_stats = {"edits": 0, "edits_skipped": 0, "not_modified": 0}
+
+# Картинки в сообщении нет
+NO_MEDIA = ""
+
+
+class _RenderedMessage(NamedTuple):
+    """Последняя правка сообщения в этом процессе"""
+
+    fingerprint: Fingerprint
+    # Что Telegram вернул после правки: время, текст без разметки, картинка
+    edit_date: Optional[int]
+    plain_text_hash: Optional[int]
+    photo_unique_id: Optional[str]
+
+
+def _markup_hash(reply_markup: Optional[InlineKeyboardMarkup]) -> int:
+    if reply_markup is None:
+        return hash(None)
+    return hash(reply_markup.model_dump_json(exclude_none=True))
+
+
+def _text_hash(text: Optional[str], parse_mode: Optional[str] = None) -> int:
+    return hash((text, parse_mode))
+
+
+def _message_key(message: Message) -> Tuple[int, int]:
+    return message.chat.id, message.message_id
+
+
+def _message_text(message: Message) -> Tuple[Optional[str], Optional[list]]:
+    """Текст (или подпись) сообщения и его разметка"""
+    if getattr(message, "photo", None):
+        return getattr(message, "caption", None), getattr(message, "caption_entities", None)
+    return getattr(message, "text", None), getattr(message, "entities", None)
+
+
+def _photo_unique_id(message: Message) -> Optional[str]:
+    photo = getattr(message, "photo", None)
+    return photo[-1].file_unique_id if photo else None
+
+
+def _current_fingerprint(message: Message) -> Fingerprint:
+    """Что сейчас показано в сообщении
+
+    Текст без разметки и клавиатура берутся из сообщения. Из кэша берутся
+    только текст с разметкой и id картинки в хранилище, если сообщение не
+    менялось после правки этого процесса. Исключение - правка, сделанная уже
+    после получения объекта сообщения (несколько правок в одном
+    обработчике): тогда объект устарел и верен кэш.
+    """
+    cached: Optional[_RenderedMessage] = _rendered.get(_message_key(message))
+    message_edit_date = getattr(message, "edit_date", None)
+    if cached is not None and cached.edit_date is not None and (
+        message_edit_date is None or cached.edit_date > message_edit_date
+    ):
+        return cached.fingerprint
+
+    text, entities = _message_text(message)
+    photo_unique_id = _photo_unique_id(message)
+    text_hash = _text_hash(text) if text is not None and not entities else None
+    media = None if photo_unique_id else NO_MEDIA
+    if cached is not None:
+        # Кэш верен, только если сообщение выглядит так же, как после правки
+        if text_hash is None and cached.plain_text_hash is not None and cached.plain_text_hash == _text_hash(text):
+            text_hash = cached.fingerprint[0]
+        if media is None and cached.photo_unique_id is not None and cached.photo_unique_id == photo_unique_id:
+            media = cached.fingerprint[2]
+    return text_hash, _markup_hash(getattr(message, "reply_markup", None)), media
+
+
+def _skip(message: Message, method: str) -> None:
+    _stats["edits_skipped"] += 1
+    edits_skipped_counter.add(1)
+    logfire.debug(f"{method} сообщения {message.message_id} пропущен: содержимое не изменилось")
+
+
+async def _edit(message: Message, fingerprint: Fingerprint, call) -> Optional[Union[Message, bool]]:
+    """Выполнить редактирование и запомнить новое содержимое сообщения"""
+    _stats["edits"] += 1
+    edits_counter.add(1)
+    try:
+        result = await call
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        # Содержимое совпало, хотя отпечатки различались (например, Telegram
+        # обрезал пробелы) - запоминаем, чтобы не повторять запрос
+        _stats["not_modified"] += 1
+        result = None
+    if isinstance(result, Message):
+        text, _ = _message_text(result)
+        _rendered.set(_message_key(message), _RenderedMessage(
+            fingerprint=fingerprint,
+            edit_date=result.edit_date,
+            plain_text_hash=_text_hash(text) if text is not None else None,
+            photo_unique_id=_photo_unique_id(result),
+        ))
+    else:
+        # Без ответного сообщения сверить кэш с Telegram будет не с чем
+        _rendered.invalidate(_message_key(message))
+    return result
+
+
+async def edit_text(
+    message: Message,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    parse_mode: Optional[str] = None,
+) -> Optional[Union[Message, bool]]:
+    """Отредактировать текст и клавиатуру сообщения, если они меняются
+
+    Returns:
+        Результат Telegram или None, если редактирование не понадобилось
+    """
+    fingerprint = (_text_hash(text, parse_mode), _markup_hash(reply_markup), NO_MEDIA)
+    if _current_fingerprint(message) == fingerprint:
+        _skip(message, "edit_text")
+        return None
+    # parse_mode передаем, только если он задан: иначе действует значение бота по умолчанию
+    options = {"parse_mode": parse_mode} if parse_mode else {}
+    return await _edit(message, fingerprint, message.edit_text(text, reply_markup=reply_markup, **options))
+
+
+async def edit_media(
+    message: Message,
+    media: InputMediaPhoto,
+    media_key: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+) -> Optional[Union[Message, bool]]:
+    """Заменить картинку, подпись и клавиатуру сообщения, если они меняются
+
+    Args:
+        media_key: Id файла в хранилище - по нему сравнивается картинка
+    """
+    fingerprint = (_text_hash(media.caption), _markup_hash(reply_markup), media_key)
+    if _current_fingerprint(message) == fingerprint:
+        _skip(message, "edit_media")
+        return None
+    return await _edit(message, fingerprint, message.edit_media(media=media, reply_markup=reply_markup))
+
+
+async def edit_reply_markup(
+    message: Message, reply_markup: Optional[InlineKeyboardMarkup]
+) -> Optional[Union[Message, bool]]:
+    """Заменить клавиатуру сообщения, если она меняется"""
+    text_hash, markup_hash, media = _current_fingerprint(message)
+    new_markup_hash = _markup_hash(reply_markup)
+    if markup_hash == new_markup_hash:
+        _skip(message, "edit_reply_markup")
+        return None
+    return await _edit(
+        message, (text_hash, new_markup_hash, media), message.edit_reply_markup(reply_markup=reply_markup)
+    )
+
+
+def forget_message(message: Message) -> None:
+    """Забыть содержимое сообщения (после удаления)"""
+    _rendered.invalidate(_message_key(message))
+
+
+def render_stats() -> Dict[str, float]:
+    """Сколько запросов на редактирование отправлено и сколько сэкономлено"""
+    total = _stats["edits"] + _stats["edits_skipped"]
+    return {
+        **_stats,
+        "skipped_ratio": _stats["edits_skipped"] / total if total else 0.0,
+    }
@@ -1,5 +1,13 @@
-from .models import Base, User, Category, Post, ModerationRecord
-from .connection import create_async_engine_and_session, create_tables, get_db
+from .models import Base, User, Category, Post, ModerationRecord, PostStatus
+from .connection import (
+    create_async_engine_and_session,
+    create_tables,
+    get_db,
+    get_session_maker,
+    get_replica_set,
+)
+from .routing import use_primary
+from .hot_queries import HotQueries
 from .repositories import (
     UserRepository,
     CategoryRepository,
@@ -15,10 +23,15 @@ __all__ = [
     "Category",
     "Post",
     "ModerationRecord",
+    "PostStatus",
     # Database connection
     "create_async_engine_and_session",
     "create_tables",
     "get_db",
+    "get_session_maker",
+    "get_replica_set",
+    "use_primary",
+    "HotQueries",
     # Repositories
     "UserRepository",
     "CategoryRepository",
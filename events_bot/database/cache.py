@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Небольшой кэш в памяти процесса с временем жизни записей
+
+    Используется для дорогих агрегатов (COUNT и т.п.), которые допустимо
+    показывать с небольшой задержкой. Записи сбрасываются явно при
+    изменении данных или сами по истечении ttl.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        """
+        Args:
+            ttl: Время жизни записи в секундах
+            max_entries: Максимальное количество записей
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение, если оно есть и еще не истекло"""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        value, expires_at = cached
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Запомнить значение"""
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Сбросить одну запись или, без ключа, весь кэш"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
@@ -1,10 +1,23 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import inspect, text
+from typing import List, Optional
 import os
 from .models import Base
+from .routing import ReplicaSet, RoutingSession
 from logfire import instrument_sqlalchemy
 
 
+def to_async_url(database_url: str) -> str:
+    """Преобразует синхронный URL базы данных в асинхронный"""
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    elif database_url.startswith("mysql://"):
+        return database_url.replace("mysql://", "mysql+aiomysql://", 1)
+    else:
+        return database_url
+
+
 def get_database_url():
     """Получает URL базы данных из переменных окружения или использует SQLite по умолчанию"""
     database_url = os.getenv("DATABASE_URL")
@@ -12,23 +25,57 @@ def get_database_url():
     # Если указан TEST_MODE, используем временную базу в памяти
 
     if database_url:
-        # Преобразуем синхронный URL в асинхронный
-        if database_url.startswith("postgresql://"):
-            return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-        elif database_url.startswith("mysql://"):
-            return database_url.replace("mysql://", "mysql+aiomysql://", 1)
-        else:
-            return database_url
+        return to_async_url(database_url)
+
+
+def get_replica_urls() -> List[str]:
+    """URL реплик для чтения из DATABASE_REPLICA_URLS (через запятую)"""
+    urls = os.getenv("DATABASE_REPLICA_URLS", "")
+    return [to_async_url(url.strip()) for url in urls.split(",") if url.strip()]
+
+
+
+def get_engine_options(database_url: str) -> dict:
+    """Параметры движка: размеры кэшей скомпилированных запросов
+
+    DATABASE_QUERY_CACHE_SIZE - кэш SQL, скомпилированного SQLAlchemy.
+    Для asyncpg дополнительно задается кэш подготовленных выражений на
+    каждом соединении (DATABASE_PREPARED_STATEMENT_CACHE_SIZE, 0 - выключен,
+    например за pgbouncer в режиме транзакций).
+    """
+    options = {
+        "echo": True,
+        "query_cache_size": int(os.getenv("DATABASE_QUERY_CACHE_SIZE", "500")),
+    }
+    if database_url.startswith("postgresql+asyncpg://"):
+        options["connect_args"] = {
+            "prepared_statement_cache_size": int(
+                os.getenv("DATABASE_PREPARED_STATEMENT_CACHE_SIZE", "500")
+            )
+        }
+    return options
 
         
 already_instrumented = False
 
 def create_async_engine_and_session():
-    """Создает асинхронный движок базы данных и сессию"""
+    """Создает асинхронный движок базы данных и сессию
+
+    Если заданы реплики (DATABASE_REPLICA_URLS), сессии отправляют
+    чтение на них, а запись - в основную базу.
+    """
     database_url = get_database_url()
-    engine = create_async_engine(database_url, echo=True)
+    engine = create_async_engine(database_url, **get_engine_options(database_url))
+    replica_urls = get_replica_urls()
+    replica_set = ReplicaSet(
+        [create_async_engine(url, **get_engine_options(url)) for url in replica_urls]
+    ) if replica_urls else None
     session_maker = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        replica_set=replica_set,
     )
     global already_instrumented
     if not already_instrumented:
@@ -37,16 +84,73 @@ def create_async_engine_and_session():
     return engine, session_maker
 
 
-async def create_tables(engine):
-    """Создает все таблицы в базе данных асинхронно"""
+async def create_tables(engine) -> List[str]:
+    """Создает все таблицы в базе данных асинхронно
+
+    Возвращает список колонок ("таблица.колонка"), добавленных в уже
+    существующие таблицы.
+    """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        return await conn.run_sync(_add_missing_columns)
+
+
+def _add_missing_columns(connection) -> List[str]:
+    """Добавить в существующие таблицы колонки и индексы, появившиеся в моделях
+
+    create_all создает только отсутствующие таблицы, поэтому новые поля
+    моделей добавляются в старые базы здесь.
+    """
+    inspector = inspect(connection)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = (
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                f"{column.type.compile(dialect=connection.dialect)}"
+            )
+            if column.server_default is not None:
+                default = column.server_default.arg
+                default = default.text if hasattr(default, "text") else f"'{default}'"
+                ddl += f" DEFAULT {default}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            connection.execute(text(ddl))
+            added.append(f"{table.name}.{column.name}")
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+    return added
+
+
+_shared_session_maker = None
+
+
+def get_session_maker():
+    """Общая фабрика сессий приложения
+
+    Движок и пул соединений создаются один раз на процесс, а не на
+    каждое обновление Telegram.
+    """
+    global _shared_session_maker
+    if _shared_session_maker is None:
+        _, _shared_session_maker = create_async_engine_and_session()
+    return _shared_session_maker
+
+
+def get_replica_set() -> Optional[ReplicaSet]:
+    """Реплики общей фабрики сессий (None, если реплики не заданы)"""
+    return get_session_maker().kw.get("replica_set")
 
 
 async def get_db():
     """Асинхронный генератор для получения сессии базы данных"""
-    engine, session_maker = create_async_engine_and_session()
-    async with session_maker() as session:
+    async with get_session_maker()() as session:
         try:
             yield session
         finally:
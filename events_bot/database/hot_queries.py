@@ -0,0 +1,252 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, String, bindparam, cast, delete, exists, func, insert, select
+from typing import List, Optional, Tuple
+from .models import (
+    Category, FeedEntry, Like, Post, PostStatus, User, post_categories, user_categories
+)
+from .read_models import AGGREGATE_SEPARATOR
+
+
+# Самые частые запросы бота (лента, сердечки, поиск пользователя).
+#
+# Выражения собираются один раз при импорте модуля со связанными параметрами
+# (bindparam), поэтому на каждый вызов не строится новое дерево выражения:
+# ключ кэша вычисляется один раз и SQL берется из кэша скомпилированных
+# запросов движка, а на PostgreSQL (asyncpg) - еще и из кэша подготовленных
+# выражений соединения. Запросы идут по таблицам, а не по ORM-сущностям,
+# и возвращают строки-кортежи без наполнения объектов ORM.
+
+posts = Post.__table__
+users = User.__table__
+likes = Like.__table__
+categories = Category.__table__
+feed_entries = FeedEntry.__table__
+
+_in_user_categories = exists().where(
+    post_categories.c.post_id == posts.c.id,
+    post_categories.c.category_id.in_(bindparam("category_ids", expanding=True)),
+)
+_is_published = posts.c.status == PostStatus.PUBLISHED
+
+_category_names = (
+    select(func.aggregate_strings(categories.c.name, AGGREGATE_SEPARATOR))
+    .select_from(post_categories.join(categories, categories.c.id == post_categories.c.category_id))
+    .where(post_categories.c.post_id == posts.c.id)
+    .scalar_subquery()
+)
+_category_ids = (
+    select(func.aggregate_strings(cast(post_categories.c.category_id, String), AGGREGATE_SEPARATOR))
+    .where(post_categories.c.post_id == posts.c.id)
+    .scalar_subquery()
+)
+_likes_count = (
+    select(func.count()).select_from(likes).where(likes.c.post_id == posts.c.id).scalar_subquery()
+)
+_is_liked = exists().where(likes.c.post_id == posts.c.id, likes.c.user_id == bindparam("user_id"))
+
+USER_ROW = select(
+    users.c.id, users.c.username, users.c.first_name, users.c.last_name, users.c.city
+).where(users.c.id == bindparam("user_id"))
+
+USER_CATEGORY_IDS = select(user_categories.c.category_id).where(
+    user_categories.c.user_id == bindparam("user_id")
+)
+
+# Контекст ленты кэшируется после чтения, поэтому читается из основной базы:
+# отстающая реплика вернула бы категории до только что сделанной смены
+FEED_CONTEXT = select(
+    users.c.city,
+    select(func.aggregate_strings(cast(user_categories.c.category_id, String), AGGREGATE_SEPARATOR))
+    .where(user_categories.c.user_id == users.c.id)
+    .scalar_subquery()
+    .label("category_ids"),
+).where(users.c.id == bindparam("user_id")).execution_options(use_primary=True)
+
+# Колонки строки поста для FeedPostView
+_post_columns = (
+    posts.c.id,
+    posts.c.title,
+    posts.c.content,
+    posts.c.city,
+    posts.c.image_id,
+    posts.c.published_at,
+    posts.c.author_id,
+    users.c.first_name.label("author_first_name"),
+    users.c.username.label("author_username"),
+    _category_ids.label("category_ids"),
+    _category_names.label("category_names"),
+    _likes_count.label("likes_count"),
+)
+_posts_with_author = posts.join(users, users.c.id == posts.c.author_id)
+
+FEED_PAGE = (
+    select(*_post_columns, _is_liked.label("is_liked"))
+    .select_from(_posts_with_author)
+    .where(_is_published, _in_user_categories)
+    .order_by(posts.c.published_at.desc(), posts.c.id.desc())
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+FEED_POST = (
+    select(*_post_columns, _is_liked.label("is_liked"))
+    .select_from(_posts_with_author)
+    .where(posts.c.id == bindparam("post_id"), _is_published)
+)
+
+FEED_POSTS = (
+    select(*_post_columns, _is_liked.label("is_liked"))
+    .select_from(_posts_with_author)
+    .where(posts.c.id.in_(bindparam("post_ids", expanding=True)), _is_published)
+)
+
+FEED_POST_IDS = (
+    select(posts.c.id)
+    .where(_is_published, _in_user_categories)
+    .order_by(posts.c.published_at.desc(), posts.c.id.desc())
+    .limit(bindparam("limit"))
+)
+
+# Материализованная лента (FEED_MODE=materialized): просмотр диапазона индекса
+# (user_id, published_at, post_id) вместо соединения с категориями
+_feed_entries_order = (feed_entries.c.published_at.desc(), feed_entries.c.post_id.desc())
+
+MATERIALIZED_FEED_PAGE = (
+    select(*_post_columns, _is_liked.label("is_liked"))
+    .select_from(feed_entries.join(posts, posts.c.id == feed_entries.c.post_id).join(
+        users, users.c.id == posts.c.author_id
+    ))
+    .where(feed_entries.c.user_id == bindparam("user_id"), _is_published)
+    .order_by(*_feed_entries_order)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+MATERIALIZED_FEED_POST_IDS = (
+    select(feed_entries.c.post_id)
+    .where(feed_entries.c.user_id == bindparam("user_id"))
+    .order_by(*_feed_entries_order)
+    .limit(bindparam("limit"))
+)
+
+POST_ROWS = (
+    select(*_post_columns)
+    .select_from(_posts_with_author)
+    .where(posts.c.id.in_(bindparam("post_ids", expanding=True)))
+    .order_by(posts.c.id)
+)
+
+FEED_COUNT = select(func.count()).select_from(posts).where(_is_published, _in_user_categories)
+
+LIKES_COUNT = select(func.count()).select_from(likes).where(likes.c.post_id == bindparam("post_id"))
+
+DELETE_LIKE = delete(likes).where(
+    likes.c.user_id == bindparam("user_id"), likes.c.post_id == bindparam("post_id")
+)
+
+INSERT_LIKE = insert(likes)
+
+
+class HotQueries:
+    """Горячие запросы на заранее собранных выражениях"""
+
+    @staticmethod
+    async def get_user_row(db: AsyncSession, user_id: int) -> Optional[Row]:
+        """Пользователь строкой (id, username, first_name, last_name, city)"""
+        result = await db.execute(USER_ROW, {"user_id": user_id})
+        return result.first()
+
+    @staticmethod
+    async def get_user_category_ids(db: AsyncSession, user_id: int) -> List[int]:
+        """ID категорий пользователя"""
+        result = await db.execute(USER_CATEGORY_IDS, {"user_id": user_id})
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_feed_context_row(db: AsyncSession, user_id: int) -> Optional[Row]:
+        """Город и склеенные id категорий пользователя одним запросом"""
+        result = await db.execute(FEED_CONTEXT, {"user_id": user_id})
+        return result.first()
+
+    @staticmethod
+    async def get_feed_page(
+        db: AsyncSession, user_id: int, category_ids: List[int], limit: int, offset: int
+    ) -> List[Row]:
+        """Страница ленты по категориям одним запросом
+
+        Строка содержит поля поста, имя автора, склеенные id и названия
+        категорий, количество сердечек и признак сердечка от пользователя.
+        """
+        result = await db.execute(
+            FEED_PAGE,
+            {"user_id": user_id, "category_ids": category_ids, "limit": limit, "offset": offset},
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_feed_post_ids(db: AsyncSession, category_ids: List[int], limit: int) -> List[int]:
+        """Упорядоченные id постов ленты (для снимка ленты)"""
+        result = await db.execute(FEED_POST_IDS, {"category_ids": category_ids, "limit": limit})
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_materialized_feed_page(
+        db: AsyncSession, user_id: int, limit: int, offset: int
+    ) -> List[Row]:
+        """Страница материализованной ленты (строки как у get_feed_page)"""
+        result = await db.execute(
+            MATERIALIZED_FEED_PAGE, {"user_id": user_id, "limit": limit, "offset": offset}
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_materialized_feed_post_ids(db: AsyncSession, user_id: int, limit: int) -> List[int]:
+        """Упорядоченные id постов материализованной ленты"""
+        result = await db.execute(MATERIALIZED_FEED_POST_IDS, {"user_id": user_id, "limit": limit})
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_feed_post_row(db: AsyncSession, user_id: int, post_id: int) -> Optional[Row]:
+        """Опубликованный пост ленты по первичному ключу (строка как у get_feed_page)"""
+        result = await db.execute(FEED_POST, {"user_id": user_id, "post_id": post_id})
+        return result.first()
+
+    @staticmethod
+    async def get_feed_post_rows(db: AsyncSession, user_id: int, post_ids: List[int]) -> List[Row]:
+        """Опубликованные посты ленты по списку id (порядок не гарантируется)"""
+        if not post_ids:
+            return []
+        result = await db.execute(FEED_POSTS, {"user_id": user_id, "post_ids": post_ids})
+        return result.all()
+
+    @staticmethod
+    async def get_post_rows(db: AsyncSession, post_ids: List[int]) -> List[Row]:
+        """Посты по списку id в виде строк ленты (без признака сердечка)"""
+        if not post_ids:
+            return []
+        result = await db.execute(POST_ROWS, {"post_ids": post_ids})
+        return result.all()
+
+    @staticmethod
+    async def count_feed_posts(db: AsyncSession, category_ids: List[int]) -> int:
+        """Количество опубликованных постов в категориях"""
+        result = await db.execute(FEED_COUNT, {"category_ids": category_ids})
+        return result.scalar_one()
+
+    @staticmethod
+    async def get_likes_count(db: AsyncSession, post_id: int) -> int:
+        """Количество сердечек на посте"""
+        result = await db.execute(LIKES_COUNT, {"post_id": post_id})
+        return result.scalar_one()
+
+    @staticmethod
+    async def toggle_like(db: AsyncSession, user_id: int, post_id: int) -> Tuple[str, int]:
+        """Переключить сердечко: ("added" | "removed", новое количество)"""
+        params = {"user_id": user_id, "post_id": post_id}
+        result = await db.execute(DELETE_LIKE, params)
+        if result.rowcount > 0:
+            action = "removed"
+        else:
+            await db.execute(INSERT_LIKE, params)
+            action = "added"
+        return action, await HotQueries.get_likes_count(db, post_id)
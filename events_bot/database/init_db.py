@@ -1,5 +1,5 @@
 from .connection import create_async_engine_and_session, create_tables
-from .repositories import CategoryRepository
+from .repositories import CategoryRepository, PostRepository
 import logfire
 
 
@@ -8,7 +8,22 @@ async def init_database():
     engine, session_maker = create_async_engine_and_session()
 
     # Создаем таблицы
-    await create_tables(engine)
+    added_columns = await create_tables(engine)
+    if added_columns:
+        logfire.info(f"Added columns to existing tables: {added_columns}")
+    if "posts.status" in added_columns:
+        # Состояние постов старой базы восстанавливаем по флагам и истории модерации
+        async with session_maker() as db:
+            await PostRepository.backfill_statuses(db)
+            await db.commit()
+
+    # Счетчики опубликованных постов по категориям заполняем один раз,
+    # дальше они обновляются при публикации
+    async with session_maker() as db:
+        if not await CategoryRepository.has_published_counts(db):
+            await CategoryRepository.rebuild_published_counts(db)
+            await db.commit()
+            logfire.info("Category post counters rebuilt")
 
     # Создаем сессию для добавления данных
     async with session_maker() as db:
@@ -56,6 +71,8 @@ async def init_database():
                         name=category_data["name"],
                         description=category_data["description"],
                     )
+                # Репозитории только делают flush, коммитим явно
+                await db.commit()
 
                 logfire.info("Database initialized with example categories!")
             else:
@@ -10,6 +10,7 @@ from sqlalchemy import (
     Integer,
     Enum as SQLAlchemyEnum,
     BigInteger,
+    Index,
 )
 from sqlalchemy.orm import DeclarativeBase, mapped_column, relationship
 from sqlalchemy.orm import Mapped
@@ -24,6 +25,29 @@ class ModerationAction(enum.Enum):
     REQUEST_CHANGES = 3
 
 
+# Enum для состояния поста
+class PostStatus(enum.Enum):
+    PENDING = "pending"
+    PUBLISHED = "published"
+    REJECTED = "rejected"
+    CHANGES_REQUESTED = "changes_requested"
+
+
+# Допустимые переходы состояний поста при модерации:
+# действие -> (из каких состояний, в какое состояние)
+MODERATION_TRANSITIONS = {
+    ModerationAction.APPROVE: (
+        (PostStatus.PENDING, PostStatus.CHANGES_REQUESTED), PostStatus.PUBLISHED
+    ),
+    ModerationAction.REJECT: (
+        (PostStatus.PENDING, PostStatus.CHANGES_REQUESTED), PostStatus.REJECTED
+    ),
+    ModerationAction.REQUEST_CHANGES: (
+        (PostStatus.PENDING,), PostStatus.CHANGES_REQUESTED
+    ),
+}
+
+
 # Базовый класс для моделей в стиле SQLAlchemy 2.0
 class Base(DeclarativeBase):
     pass
@@ -148,7 +172,19 @@ class Post(Base, TimestampMixin):
     image_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     is_approved: Mapped[bool] = mapped_column(Boolean, default=False)
     is_published: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Состояние модерации; is_approved и is_published поддерживаются в соответствии с ним
+    status: Mapped[PostStatus] = mapped_column(
+        SQLAlchemyEnum(PostStatus, native_enum=False, length=32),
+        default=PostStatus.PENDING,
+        server_default=PostStatus.PENDING.name,
+        nullable=False,
+        index=True,
+    )
     published_at: Mapped[Optional[DateTime]] = mapped_column(DateTime, nullable=True)
+    # Аренда поста модератором: пока она не истекла, другие модераторы пост не трогают
+    claimed_by: Mapped[Optional[int]] = mapped_column(BigInteger(), nullable=True)
+    claimed_by_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    claim_expires_at: Mapped[Optional[DateTime]] = mapped_column(DateTime, nullable=True)
 
     # Связи
     author: Mapped[User] = relationship(back_populates="posts")
@@ -159,11 +195,68 @@ class Post(Base, TimestampMixin):
         back_populates="post"
     )
 
+    # Индексы для постраничной выборки по (created_at, id): очередь модерации
+    # и посты автора
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_author_created_at_id", "author_id", "created_at", "id"),
+    )
+
     def get_category_text_names(self) -> List[str]:
         """Возвращает список текстовых названий категорий поста"""
         return [category.text_name for category in self.categories]
 
 
+class CategoryPostCount(Base):
+    """Количество опубликованных постов в категории
+
+    Увеличивается при публикации постов, чтобы итог ленты по одной
+    категории не требовал COUNT по постам.
+    """
+
+    __tablename__ = "category_post_counts"
+
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), primary_key=True)
+    published_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+
+
+class FeedEntry(Base):
+    """Пост в материализованной ленте пользователя (FEED_MODE=materialized)
+
+    Записи добавляются при публикации поста для подписчиков его категорий,
+    поэтому чтение ленты - просмотр диапазона одного индекса вместо
+    соединения постов с категориями.
+    """
+
+    __tablename__ = "feed_entries"
+
+    user_id: Mapped[int] = mapped_column(BigInteger(), ForeignKey("users.id"), primary_key=True)
+    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), primary_key=True)
+    published_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
+
+    # Лента пользователя от новых постов к старым
+    __table_args__ = (
+        Index("ix_feed_entries_user_published_post", "user_id", "published_at", "post_id"),
+    )
+
+
+class FeedSyncState(Base):
+    """Отметка синхронизации материализованной ленты (одна строка)
+
+    Все опубликованные посты до поста (published_at, post_id) включительно
+    уже разложены по лентам, поэтому при запуске бота досоздаются записи
+    только для постов после отметки.
+    """
+
+    __tablename__ = "feed_sync_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    published_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
+    post_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
 class ModerationRecord(Base, TimestampMixin):
     """Модель записи модерации"""
 
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+from .models import PostStatus
+
+
+# Легкие модели для чтения: строятся прямо из строк результата запроса,
+# не держат сессию и не могут вызвать ленивую загрузку
+
+# Разделитель для названий, склеенных в запросе через aggregate_strings
+AGGREGATE_SEPARATOR = "\x1f"
+
+
+def split_aggregated(value: Optional[str]) -> Tuple[str, ...]:
+    """Разобрать строку, склеенную в запросе через aggregate_strings"""
+    return tuple(value.split(AGGREGATE_SEPARATOR)) if value else ()
+
+
+@dataclass(frozen=True, slots=True)
+class ModerationQueueItem:
+    """Строка очереди модерации"""
+
+    id: int
+    title: str
+    city: Optional[str]
+    author_name: str
+    category_names: Tuple[str, ...]
+    created_at: datetime
+    # Модератор, у которого пост в действующей аренде
+    claimed_by_name: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row) -> "ModerationQueueItem":
+        """Создать из строки запроса PostRepository.get_moderation_queue_items"""
+        return cls(
+            id=row.id,
+            title=row.title,
+            city=row.city,
+            author_name=row.first_name or row.username or "Аноним",
+            category_names=split_aggregated(row.category_names),
+            created_at=row.created_at,
+            claimed_by_name=row.claimed_by_name,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ModerationQueuePage:
+    """Страница очереди модерации с курсорами соседних страниц"""
+
+    items: Tuple[ModerationQueueItem, ...]
+    total: int
+    prev_cursor: Optional[int] = None
+    next_cursor: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class FeedPostView:
+    """Опубликованный пост для ленты и уведомлений"""
+
+    id: int
+    title: str
+    content: str
+    city: Optional[str]
+    image_id: Optional[str]
+    published_at: Optional[datetime]
+    author_id: int
+    author_name: str
+    category_ids: Tuple[int, ...]
+    category_names: Tuple[str, ...]
+    likes_count: int = 0
+    # Поставил ли сердечко пользователь, для которого строилась лента
+    is_liked: bool = False
+
+    @classmethod
+    def from_row(cls, row) -> "FeedPostView":
+        """Создать из строки запроса HotQueries (get_feed_page, get_post_rows)"""
+        mapping = row._mapping
+        return cls(
+            id=row.id,
+            title=row.title,
+            content=row.content,
+            city=row.city,
+            image_id=row.image_id,
+            published_at=row.published_at,
+            author_id=row.author_id,
+            author_name=row.author_first_name or row.author_username or "Аноним",
+            category_ids=tuple(int(value) for value in split_aggregated(row.category_ids)),
+            category_names=split_aggregated(row.category_names),
+            likes_count=row.likes_count,
+            is_liked=bool(mapping.get("is_liked", False)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ModerationPostView:
+    """Пост, отправляемый в группу модерации"""
+
+    id: int
+    title: str
+    content: str
+    city: Optional[str]
+    image_id: Optional[str]
+    created_at: Optional[datetime]
+    author_name: str
+    category_names: Tuple[str, ...]
+
+    @classmethod
+    def from_row(cls, row) -> "ModerationPostView":
+        """Создать из строки PostRepository.create_post (INSERT ... RETURNING)"""
+        return cls(
+            id=row.id,
+            title=row.title,
+            content=row.content,
+            city=row.city,
+            image_id=row.image_id,
+            created_at=row.created_at,
+            author_name=row.author_first_name or row.author_username or "Аноним",
+            category_names=split_aggregated(row.category_names),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class UserPostItem:
+    """Строка списка постов автора"""
+
+    id: int
+    title: str
+    city: Optional[str]
+    status: PostStatus
+    category_names: Tuple[str, ...]
+    likes_count: int
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, row) -> "UserPostItem":
+        """Создать из строки запроса PostRepository.get_user_post_items"""
+        return cls(
+            id=row.id,
+            title=row.title,
+            city=row.city,
+            status=row.status,
+            category_names=split_aggregated(row.category_names),
+            likes_count=row.likes_count,
+            created_at=row.created_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class UserPostsPage:
+    """Страница постов автора с курсорами соседних страниц"""
+
+    items: Tuple[UserPostItem, ...]
+    prev_cursor: Optional[int] = None
+    next_cursor: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class FeedContext:
+    """Данные пользователя, нужные для построения ленты"""
+
+    city: Optional[str]
+    category_ids: Tuple[int, ...]
+
+    @classmethod
+    def from_row(cls, row) -> "FeedContext":
+        """Создать из строки HotQueries.get_feed_context_row (None - пользователя нет)"""
+        if row is None:
+            return cls(city=None, category_ids=())
+        return cls(
+            city=row.city,
+            category_ids=tuple(int(value) for value in split_aggregated(row.category_ids)),
+        )
@@ -3,6 +3,7 @@ from .category_repository import CategoryRepository
 from .post_repository import PostRepository
 from .moderation_repository import ModerationRepository
 from .like_repository import LikeRepository
+from .feed_repository import FeedRepository
 
 __all__ = [
     "UserRepository",
@@ -10,4 +11,5 @@ __all__ = [
     "PostRepository",
     "ModerationRepository",
     "LikeRepository",
+    "FeedRepository",
 ]
@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, func, insert, update, and_
 from typing import List, Optional
-from ..models import Category
+from ..models import Category, CategoryPostCount, Post, PostStatus, post_categories
 
 
 class CategoryRepository:
@@ -23,6 +23,67 @@ class CategoryRepository:
     ) -> Category:
         category = Category(name=name, description=description)
         db.add(category)
-        await db.commit()
+        await db.flush()
+        db.add(CategoryPostCount(category_id=category.id, published_count=0))
+        await db.flush()
         await db.refresh(category)
         return category
+
+    @staticmethod
+    async def get_published_count(db: AsyncSession, category_id: int) -> int:
+        """Количество опубликованных постов в категории по счетчику"""
+        result = await db.execute(
+            select(CategoryPostCount.published_count).where(
+                CategoryPostCount.category_id == category_id
+            )
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    async def increment_published_counts(db: AsyncSession, post_ids: List[int]) -> None:
+        """Учесть в счетчиках категорий только что опубликованные посты"""
+        if not post_ids:
+            return
+        added = (
+            select(func.count())
+            .select_from(post_categories)
+            .where(
+                post_categories.c.category_id == CategoryPostCount.category_id,
+                post_categories.c.post_id.in_(post_ids),
+            )
+            .scalar_subquery()
+        )
+        await db.execute(
+            update(CategoryPostCount)
+            .where(
+                CategoryPostCount.category_id.in_(
+                    select(post_categories.c.category_id).where(post_categories.c.post_id.in_(post_ids))
+                )
+            )
+            .values(published_count=CategoryPostCount.published_count + added)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def has_published_counts(db: AsyncSession) -> bool:
+        """Заполнены ли счетчики категорий"""
+        result = await db.execute(select(CategoryPostCount.category_id).limit(1))
+        return result.first() is not None
+
+    @staticmethod
+    async def rebuild_published_counts(db: AsyncSession) -> None:
+        """Пересчитать счетчики всех категорий по опубликованным постам"""
+        await db.execute(delete(CategoryPostCount))
+        await db.execute(
+            insert(CategoryPostCount).from_select(
+                ["category_id", "published_count"],
+                select(Category.id, func.count(Post.id))
+                .select_from(Category)
+                .outerjoin(post_categories, post_categories.c.category_id == Category.id)
+                .outerjoin(
+                    Post,
+                    and_(Post.id == post_categories.c.post_id, Post.status == PostStatus.PUBLISHED),
+                )
+                .group_by(Category.id),
+            )
+        )
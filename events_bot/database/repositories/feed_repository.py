@@ -0,0 +1,113 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, exists, insert, tuple_
+from typing import List, Optional
+from ..models import FeedEntry, FeedSyncState, Post, PostStatus, post_categories, user_categories
+
+# Id единственной строки feed_sync_state
+SYNC_STATE_ID = 1
+
+
+class FeedRepository:
+    """Асинхронный репозиторий материализованной ленты (таблица feed_entries)"""
+
+    @staticmethod
+    def _subscriber_entries():
+        """Пары (подписчик, опубликованный пост) из категорий, которых еще нет в ленте"""
+        return (
+            select(user_categories.c.user_id, Post.id, Post.published_at)
+            .distinct()
+            .select_from(Post)
+            .join(post_categories, post_categories.c.post_id == Post.id)
+            .join(user_categories, user_categories.c.category_id == post_categories.c.category_id)
+            .where(
+                Post.status == PostStatus.PUBLISHED,
+                ~exists().where(
+                    FeedEntry.user_id == user_categories.c.user_id,
+                    FeedEntry.post_id == Post.id,
+                ),
+            )
+        )
+
+    @staticmethod
+    async def _insert_entries(db: AsyncSession, entries) -> int:
+        result = await db.execute(
+            insert(FeedEntry).from_select(["user_id", "post_id", "published_at"], entries)
+        )
+        return result.rowcount
+
+    @staticmethod
+    async def fan_out_posts(db: AsyncSession, post_ids: Optional[List[int]] = None) -> int:
+        """Добавить опубликованные посты в ленты подписчиков их категорий
+
+        Без post_ids досоздаются все недостающие записи (например, после
+        перезапуска, прервавшего фоновую раскладку). Уже существующие
+        записи не дублируются. Возвращает количество добавленных записей.
+        """
+        entries = FeedRepository._subscriber_entries()
+        if post_ids is not None:
+            if not post_ids:
+                return 0
+            entries = entries.where(Post.id.in_(post_ids))
+        return await FeedRepository._insert_entries(db, entries)
+
+    @staticmethod
+    async def fan_out_since_sync(db: AsyncSession) -> int:
+        """Разложить посты, опубликованные после прошлой синхронизации
+
+        Просматриваются только посты после отметки feed_sync_state, затем
+        отметка сдвигается на последний опубликованный пост. Без отметки
+        ленты строятся заново: записи, оставшиеся от снятых категорий, тоже
+        удаляются. Возвращает количество добавленных записей.
+        """
+        state = await db.get(FeedSyncState, SYNC_STATE_ID)
+        if state is None:
+            await db.execute(delete(FeedEntry).execution_options(synchronize_session=False))
+        last = (await db.execute(
+            select(Post.published_at, Post.id)
+            .where(Post.status == PostStatus.PUBLISHED, Post.published_at.is_not(None))
+            .order_by(Post.published_at.desc(), Post.id.desc())
+            .limit(1)
+        )).first()
+        if last is None:
+            return 0
+        sort_key = tuple_(Post.published_at, Post.id)
+        entries = FeedRepository._subscriber_entries().where(sort_key <= tuple_(last.published_at, last.id))
+        if state is not None:
+            entries = entries.where(sort_key > tuple_(state.published_at, state.post_id))
+        added = await FeedRepository._insert_entries(db, entries)
+        if state is None:
+            db.add(FeedSyncState(id=SYNC_STATE_ID, published_at=last.published_at, post_id=last.id))
+        else:
+            state.published_at, state.post_id = last.published_at, last.id
+        await db.flush()
+        return added
+
+    @staticmethod
+    async def reset_sync(db: AsyncSession) -> None:
+        """Забыть отметку синхронизации: следующая синхронизация будет полной"""
+        await db.execute(delete(FeedSyncState))
+
+    @staticmethod
+    async def backfill_user(db: AsyncSession, user_id: int, category_ids: List[int]) -> int:
+        """Добавить в ленту пользователя опубликованные посты новых категорий"""
+        if not category_ids:
+            return 0
+        entries = FeedRepository._subscriber_entries().where(
+            user_categories.c.user_id == user_id,
+            user_categories.c.category_id.in_(category_ids),
+        )
+        return await FeedRepository._insert_entries(db, entries)
+
+    @staticmethod
+    async def prune_user(db: AsyncSession, user_id: int, category_ids: List[int]) -> int:
+        """Убрать из ленты пользователя посты, не попадающие в его категории"""
+        in_categories = exists().where(
+            post_categories.c.post_id == FeedEntry.post_id,
+            post_categories.c.category_id.in_(category_ids),
+        )
+        result = await db.execute(
+            delete(FeedEntry)
+            .where(FeedEntry.user_id == user_id, ~in_categories)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
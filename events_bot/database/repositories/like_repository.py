@@ -20,7 +20,7 @@ class LikeRepository:
             # Если лайка нет, создаём новый
             like = Like(user_id=user_id, post_id=post_id)
             db.add(like)
-            await db.commit()
+            await db.flush()
             await db.refresh(like)
             return like
 
@@ -31,7 +31,6 @@ class LikeRepository:
             and_(Like.user_id == user_id, Like.post_id == post_id)
         )
         result = await db.execute(stmt)
-        await db.commit()
         return result.rowcount > 0
 
     @staticmethod
@@ -1,54 +1,183 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, insert
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy import select, and_, or_, case, func, insert, literal, tuple_, update
+from sqlalchemy.orm import aliased, load_only, selectinload
+from sqlalchemy.sql import ClauseElement
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
 from ..models import Post, ModerationRecord, ModerationAction, Category, post_categories
-from ..models import User
+from ..models import PostStatus, MODERATION_TRANSITIONS
+from ..models import User, Like
+from ..read_models import AGGREGATE_SEPARATOR, ModerationPostView, ModerationQueueItem, UserPostItem
+
+
+def _utcnow() -> datetime:
+    """Текущее время UTC без часового пояса, как в колонках DateTime"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Колонки поста для списков (мои посты, очередь модерации): текст поста
+# в списках не показывается и не загружается
+LIST_VIEW_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.city,
+    Post.status,
+    Post.author_id,
+    Post.image_id,
+    Post.created_at,
+    Post.published_at,
+)
+
+
+def _list_view():
+    """Проекция поста для списков; обращение к другим колонкам - ошибка, а не скрытый запрос"""
+    return load_only(*LIST_VIEW_COLUMNS, raiseload=True)
+
+
+def _author_names():
+    """Автор поста только с полями для отображения имени"""
+    return selectinload(Post.author).load_only(User.id, User.first_name, User.username)
+
+
+def _category_names():
+    """Категории поста только с id и названием"""
+    return selectinload(Post.categories).load_only(Category.id, Category.name)
 
 
 class PostRepository:
     """Асинхронный репозиторий для работы с постами"""
 
+    @staticmethod
+    def _created_post_columns(author_id: int, category_ids: List[int]):
+        """Колонки нового поста для ModerationPostView; автор и категории - подзапросами"""
+        return (
+            Post.id,
+            Post.title,
+            Post.content,
+            Post.city,
+            Post.image_id,
+            Post.created_at,
+            select(User.first_name).where(User.id == author_id)
+            .scalar_subquery().label("author_first_name"),
+            select(User.username).where(User.id == author_id)
+            .scalar_subquery().label("author_username"),
+            select(func.aggregate_strings(Category.name, AGGREGATE_SEPARATOR))
+            .where(Category.id.in_(category_ids))
+            .scalar_subquery().label("category_names"),
+        )
+
     @staticmethod
     async def create_post(
         db: AsyncSession, title: str, content: str, author_id: int, category_ids: List[int], city: str = None, image_id: str = None
-    ) -> Post:
-        # Создаем пост
-        post = Post(
-            title=title, content=content, author_id=author_id, city=city, image_id=image_id
-        )
-        db.add(post)
-        await db.commit()
-        
-        # Добавляем категории к посту в отдельной транзакции
-        await db.execute(
-            insert(
-                post_categories
-            ).values(
-                post_id=post.id
-            ),
-            [{'category_id': category} for category in category_ids]
-        )
-        await db.commit()
-        await db.refresh(post)
-        
-        return post
+    ) -> ModerationPostView:
+        """Создать пост с категориями в одной транзакции
+
+        Пост вставляется одним INSERT ... RETURNING, который сразу возвращает
+        и имя автора, и названия категорий, категории - одной пакетной
+        вставкой. Отдельных SELECT после вставки нет.
+        """
+        values = {
+            "title": title, "content": content, "author_id": author_id, "city": city, "image_id": image_id
+        }
+        category_ids = list(dict.fromkeys(category_ids))
+        columns = PostRepository._created_post_columns(author_id, category_ids)
+        if db.get_bind().dialect.insert_returning:
+            result = await db.execute(insert(Post.__table__).values(**values).returning(*columns))
+            row = result.one()
+        else:
+            result = await db.execute(insert(Post.__table__).values(**values))
+            post_id = result.inserted_primary_key[0]
+            row = (await db.execute(select(*columns).where(Post.id == post_id))).one()
+
+        if category_ids:
+            await db.execute(
+                insert(post_categories),
+                [{'post_id': row.id, 'category_id': category} for category in category_ids],
+            )
+        return ModerationPostView.from_row(row)
 
     @staticmethod
     async def get_pending_moderation(db: AsyncSession) -> List[Post]:
         result = await db.execute(
             select(Post)
-            .where(and_(Post.is_approved == False, Post.is_published == False))
-            .options(selectinload(Post.author), selectinload(Post.categories))
+            .where(Post.status == PostStatus.PENDING)
+            .options(_list_view(), _author_names(), _category_names())
         )
         return result.scalars().all()
 
+    @staticmethod
+    def _category_names_subquery():
+        """Коррелированный подзапрос: названия категорий поста одной строкой"""
+        return (
+            select(func.aggregate_strings(Category.name, AGGREGATE_SEPARATOR))
+            .select_from(post_categories.join(Category, Category.id == post_categories.c.category_id))
+            .where(post_categories.c.post_id == Post.id)
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    async def get_moderation_queue_items(
+        db: AsyncSession, limit: int, after_id: int = None, before_id: int = None
+    ) -> List[ModerationQueueItem]:
+        """Страница очереди модерации одним запросом: автор и категории уже собраны
+
+        Курсор - id поста, после (after_id) или до (before_id) которого
+        нужна страница в порядке (created_at, id). Стоимость запроса не
+        зависит от размера очереди: OFFSET не используется.
+        """
+        query = (
+            select(
+                Post.id,
+                Post.title,
+                Post.city,
+                Post.created_at,
+                User.first_name,
+                User.username,
+                PostRepository._category_names_subquery().label("category_names"),
+                case(
+                    (Post.claim_expires_at > _utcnow(), Post.claimed_by_name),
+                    else_=None,
+                ).label("claimed_by_name"),
+            )
+            .join(User, User.id == Post.author_id)
+            .where(Post.status == PostStatus.PENDING)
+        )
+        sort_key = tuple_(Post.created_at, Post.id)
+        cursor_id = after_id if after_id is not None else before_id
+        if cursor_id is not None:
+            cursor_post = aliased(Post)
+            cursor_created_at = (
+                select(cursor_post.created_at)
+                .where(cursor_post.id == cursor_id)
+                .scalar_subquery()
+            )
+            cursor_key = tuple_(cursor_created_at, literal(cursor_id))
+            query = query.where(sort_key > cursor_key if after_id is not None else sort_key < cursor_key)
+
+        if before_id is not None:
+            # Берем ближайшие к курсору посты в обратном порядке и разворачиваем
+            query = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+            rows = list(await db.execute(query))[::-1]
+        else:
+            query = query.order_by(Post.created_at, Post.id).limit(limit)
+            rows = list(await db.execute(query))
+        return [ModerationQueueItem.from_row(row) for row in rows]
+
+    @staticmethod
+    async def count_pending_moderation(db: AsyncSession) -> int:
+        """Количество постов, ожидающих модерации"""
+        result = await db.execute(
+            select(func.count(Post.id))
+            .where(Post.status == PostStatus.PENDING)
+        )
+        return result.scalar() or 0
+
     @staticmethod
     async def get_approved_posts(db: AsyncSession) -> List[Post]:
         result = await db.execute(
             select(Post)
             .where(Post.is_approved == True)
-            .options(selectinload(Post.author), selectinload(Post.categories))
+            .options(_list_view(), _author_names(), _category_names())
         )
         return result.scalars().all()
 
@@ -60,78 +189,324 @@ class PostRepository:
             select(Post)
             .join(Post.categories)
             .where(and_(Post.categories.any(Category.id.in_(category_ids)), Post.is_approved == True))
-            .options(selectinload(Post.author), selectinload(Post.categories))
+            .options(_list_view(), _author_names(), _category_names())
         )
         return result.scalars().all()
 
     @staticmethod
-    async def approve_post(
-        db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
-    ) -> Post:
-        result = await db.execute(select(Post).where(Post.id == post_id))
-        post = result.scalar_one_or_none()
-        if post:
-            post.is_approved = True
-            post.is_published = True
-            post.published_at = func.now()
-            moderation_record = ModerationRecord(
+    def _status_values(status: PostStatus) -> dict:
+        """Значения колонок поста для состояния (флаги синхронизируются с ним)"""
+        # Переход завершает работу над постом, аренда модератора снимается
+        values = {"claimed_by": None, "claimed_by_name": None, "claim_expires_at": None}
+        if status == PostStatus.PUBLISHED:
+            return {
+                **values,
+                "status": status,
+                "is_approved": True,
+                "is_published": True,
+                "published_at": func.now(),
+            }
+        return {**values, "status": status, "is_approved": False, "is_published": False}
+
+    @staticmethod
+    def _available_to(moderator_id: int, now: datetime):
+        """Условие: пост не арендован другим модератором (или аренда истекла)"""
+        return or_(
+            Post.claimed_by.is_(None),
+            Post.claimed_by == moderator_id,
+            Post.claim_expires_at <= now,
+        )
+
+    @staticmethod
+    async def claim_posts(
+        db: AsyncSession, moderator_id: int, moderator_name: str, limit: int, lease: timedelta
+    ) -> List[int]:
+        """Арендовать следующие свободные посты очереди для модератора
+
+        Строки выбираются с SKIP LOCKED, поэтому модераторы, которые берут
+        работу одновременно, получают разные посты и не ждут друг друга.
+        Условие повторяется в UPDATE на случай баз без SKIP LOCKED.
+        """
+        now = _utcnow()
+        available = and_(
+            Post.status == PostStatus.PENDING,
+            or_(Post.claimed_by.is_(None), Post.claim_expires_at <= now),
+        )
+        result = await db.execute(
+            select(Post.id)
+            .where(available)
+            .order_by(Post.created_at, Post.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        candidate_ids = list(result.scalars().all())
+        if not candidate_ids:
+            return []
+
+        values = {
+            "claimed_by": moderator_id,
+            "claimed_by_name": moderator_name,
+            "claim_expires_at": now + lease,
+        }
+        condition = and_(Post.id.in_(candidate_ids), available)
+        if db.get_bind().dialect.update_returning:
+            result = await db.execute(
+                update(Post)
+                .where(condition)
+                .values(**values)
+                .returning(Post.id)
+                .execution_options(synchronize_session=False)
+            )
+            claimed_ids = sorted(result.scalars().all())
+        else:
+            # Строки уже заблокированы FOR UPDATE выше
+            await db.execute(
+                update(Post)
+                .where(condition)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            claimed_ids = candidate_ids
+        return claimed_ids
+
+    @staticmethod
+    async def release_claims(db: AsyncSession, moderator_id: int) -> int:
+        """Снять все аренды модератора"""
+        result = await db.execute(
+            update(Post)
+            .where(Post.claimed_by == moderator_id)
+            .values(claimed_by=None, claimed_by_name=None, claim_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    async def get_claim_holder(db: AsyncSession, post_id: int, moderator_id: int) -> Optional[str]:
+        """Имя другого модератора, у которого пост сейчас в аренде"""
+        result = await db.execute(
+            select(Post.claimed_by_name).where(
+                and_(
+                    Post.id == post_id,
+                    Post.claimed_by.is_not(None),
+                    Post.claimed_by != moderator_id,
+                    Post.claim_expires_at > _utcnow(),
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def transition(
+        db: AsyncSession,
+        post_id: int,
+        moderator_id: int,
+        action: ModerationAction,
+        comment: str = None,
+    ) -> Optional[Post]:
+        """Атомарно перевести пост в новое состояние действием модерации
+
+        Переход выполняется одним условным UPDATE: он срабатывает, только если
+        пост находится в допустимом исходном состоянии. Если два модератора
+        нажали кнопку одновременно, пост вернется только победителю, второй
+        получит None. Пост в действующей аренде другого модератора тоже не
+        переводится.
+        """
+        from_statuses, to_status = MODERATION_TRANSITIONS[action]
+        condition = and_(
+            Post.id == post_id,
+            Post.status.in_(from_statuses),
+            PostRepository._available_to(moderator_id, _utcnow()),
+        )
+        values = PostRepository._status_values(to_status)
+        # Колонки, которые вычисляет база (published_at = now()): без RETURNING
+        # их нужно перечитать после flush
+        computed = []
+
+        if db.get_bind().dialect.update_returning:
+            result = await db.execute(
+                update(Post)
+                .where(condition)
+                .values(**values)
+                .returning(Post)
+                .execution_options(populate_existing=True, synchronize_session=False)
+            )
+            post = result.scalar_one_or_none()
+        else:
+            # Без RETURNING блокируем строку до конца транзакции
+            result = await db.execute(select(Post).where(condition).with_for_update())
+            post = result.scalar_one_or_none()
+            if post:
+                for key, value in values.items():
+                    setattr(post, key, value)
+                computed = [key for key, value in values.items() if isinstance(value, ClauseElement)]
+
+        if post is None:
+            return None
+
+        db.add(
+            ModerationRecord(
                 post_id=post_id,
                 moderator_id=moderator_id,
-                action=ModerationAction.APPROVE,
+                action=action,
                 comment=comment,
             )
-            db.add(moderation_record)
-            await db.commit()
-            await db.refresh(post)
+        )
+        await db.flush()
+        if computed:
+            await db.refresh(post, computed)
         return post
 
+    @staticmethod
+    async def approve_post(
+        db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
+    ) -> Optional[Post]:
+        return await PostRepository.transition(
+            db, post_id, moderator_id, ModerationAction.APPROVE, comment
+        )
+
     @staticmethod
     async def reject_post(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
-    ) -> Post:
-        result = await db.execute(select(Post).where(Post.id == post_id))
-        post = result.scalar_one_or_none()
-        if post:
-            post.is_approved = False
-            post.is_published = False
-            moderation_record = ModerationRecord(
-                post_id=post_id,
-                moderator_id=moderator_id,
-                action=ModerationAction.REJECT,
-                comment=comment,
-            )
-            db.add(moderation_record)
-            await db.commit()
-            await db.refresh(post)
-        return post
+    ) -> Optional[Post]:
+        return await PostRepository.transition(
+            db, post_id, moderator_id, ModerationAction.REJECT, comment
+        )
 
     @staticmethod
     async def request_changes(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
-    ) -> Post:
-        result = await db.execute(select(Post).where(Post.id == post_id))
-        post = result.scalar_one_or_none()
-        if post:
-            moderation_record = ModerationRecord(
-                post_id=post_id,
-                moderator_id=moderator_id,
-                action=ModerationAction.REQUEST_CHANGES,
-                comment=comment,
+    ) -> Optional[Post]:
+        return await PostRepository.transition(
+            db, post_id, moderator_id, ModerationAction.REQUEST_CHANGES, comment
+        )
+
+    @staticmethod
+    async def bulk_moderate(
+        db: AsyncSession,
+        post_ids: List[int],
+        moderator_id: int,
+        action: ModerationAction,
+        comment: str = None,
+    ) -> List[int]:
+        """Применить действие модерации к нескольким постам в одной транзакции
+
+        Возвращает id постов, для которых переход был допустим и выполнен.
+        """
+        if not post_ids:
+            return []
+        from_statuses, to_status = MODERATION_TRANSITIONS[action]
+        pending = and_(
+            Post.id.in_(post_ids),
+            Post.status.in_(from_statuses),
+            PostRepository._available_to(moderator_id, _utcnow()),
+        )
+        values = PostRepository._status_values(to_status)
+        # Колонки, которые вычисляет база (published_at = now()): без RETURNING
+        # их нужно перечитать после flush
+        computed = []
+
+        if db.get_bind().dialect.update_returning:
+            result = await db.execute(
+                update(Post)
+                .where(pending)
+                .values(**values)
+                .returning(Post.id)
+                .execution_options(synchronize_session=False)
             )
-            db.add(moderation_record)
-            await db.commit()
-            await db.refresh(post)
-        return post
+            moderated_ids = list(result.scalars().all())
+        else:
+            # Без RETURNING блокируем строки, чтобы параллельная модерация их не изменила
+            result = await db.execute(select(Post.id).where(pending).with_for_update())
+            moderated_ids = list(result.scalars().all())
+            if moderated_ids:
+                await db.execute(
+                    update(Post)
+                    .where(Post.id.in_(moderated_ids))
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+
+        if moderated_ids:
+            await db.execute(
+                insert(ModerationRecord),
+                [
+                    {
+                        "post_id": post_id,
+                        "moderator_id": moderator_id,
+                        "action": action,
+                        "comment": comment,
+                    }
+                    for post_id in moderated_ids
+                ],
+            )
+        return moderated_ids
+
+    @staticmethod
+    async def get_posts_by_ids(db: AsyncSession, post_ids: List[int]) -> List[Post]:
+        """Посты по списку id вместе с автором и категориями"""
+        if not post_ids:
+            return []
+        result = await db.execute(
+            select(Post)
+            .where(Post.id.in_(post_ids))
+            .options(selectinload(Post.author), selectinload(Post.categories))
+            .order_by(Post.id)
+        )
+        return result.scalars().all()
 
     @staticmethod
     async def get_user_posts(db: AsyncSession, user_id: int) -> List[Post]:
         result = await db.execute(
             select(Post)
             .where(Post.author_id == user_id)
-            .options(selectinload(Post.categories))
+            .options(_list_view(), _category_names())
         )
         return result.scalars().all()
 
+    @staticmethod
+    async def get_user_post_items(
+        db: AsyncSession, user_id: int, limit: int, after_id: int = None, before_id: int = None
+    ) -> List[UserPostItem]:
+        """Страница постов автора одним запросом: состояние, категории и сердечки
+
+        Посты идут от новых к старым; after_id - курсор для более старых
+        постов, before_id - для более новых. Стоимость запроса не зависит от
+        количества постов автора: выборка идет по индексу
+        (author_id, created_at, id) без OFFSET.
+        """
+        likes_count = (
+            select(func.count(Like.id)).where(Like.post_id == Post.id).scalar_subquery()
+        )
+        query = select(
+            Post.id,
+            Post.title,
+            Post.city,
+            Post.status,
+            Post.created_at,
+            PostRepository._category_names_subquery().label("category_names"),
+            likes_count.label("likes_count"),
+        ).where(Post.author_id == user_id)
+        sort_key = tuple_(Post.created_at, Post.id)
+        cursor_id = after_id if after_id is not None else before_id
+        if cursor_id is not None:
+            cursor_post = aliased(Post)
+            cursor_created_at = (
+                select(cursor_post.created_at)
+                .where(cursor_post.id == cursor_id)
+                .scalar_subquery()
+            )
+            cursor_key = tuple_(cursor_created_at, literal(cursor_id))
+            query = query.where(sort_key < cursor_key if after_id is not None else sort_key > cursor_key)
+
+        if before_id is not None:
+            # Берем ближайшие к курсору посты в обратном порядке и разворачиваем
+            query = query.order_by(Post.created_at, Post.id).limit(limit)
+            rows = list(await db.execute(query))[::-1]
+        else:
+            query = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+            rows = list(await db.execute(query))
+        return [UserPostItem.from_row(row) for row in rows]
+
     @staticmethod
     async def get_post_by_id(db: AsyncSession, post_id: int) -> Optional[Post]:
         result = await db.execute(
@@ -142,76 +517,92 @@ class PostRepository:
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def publish_post(db: AsyncSession, post_id: int) -> Post:
-        result = await db.execute(select(Post).where(Post.id == post_id))
-        post = result.scalar_one_or_none()
-        if post:
-            post.is_published = True
-            post.published_at = func.now()
-            await db.commit()
-            await db.refresh(post)
-        return post
+    async def get_referenced_image_ids(db: AsyncSession) -> Set[str]:
+        """Id файлов, на которые ссылаются посты (кроме отклоненных)"""
+        result = await db.execute(
+            select(Post.image_id)
+            .where(
+                and_(
+                    Post.image_id.is_not(None),
+                    Post.status != PostStatus.REJECTED,
+                )
+            )
+            .distinct()
+        )
+        return set(result.scalars().all())
+
+    @staticmethod
+    async def backfill_statuses(db: AsyncSession) -> None:
+        """Заполнить состояние постов, созданных до появления колонки status"""
+        rejected = (
+            select(ModerationRecord.id)
+            .where(
+                and_(
+                    ModerationRecord.post_id == Post.id,
+                    ModerationRecord.action == ModerationAction.REJECT,
+                )
+            )
+            .exists()
+        )
+        await db.execute(
+            update(Post).where(Post.is_published == True).values(status=PostStatus.PUBLISHED)
+        )
+        await db.execute(
+            update(Post)
+            .where(and_(Post.is_published == False, rejected))
+            .values(status=PostStatus.REJECTED)
+        )
+
+    @staticmethod
+    async def publish_post(db: AsyncSession, post_id: int) -> Optional[Post]:
+        """Вернуть опубликованный пост (публикация выполняется при одобрении)"""
+        result = await db.execute(
+            select(Post).where(and_(Post.id == post_id, Post.status == PostStatus.PUBLISHED))
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def _in_categories(category_ids: List[int]):
+        """EXISTS по post_categories: пост с несколькими подходящими категориями
+        учитывается один раз"""
+        return (
+            select(post_categories.c.post_id)
+            .where(
+                post_categories.c.post_id == Post.id,
+                post_categories.c.category_id.in_(category_ids),
+            )
+            .exists()
+        )
 
     @staticmethod
     async def get_feed_posts(
-        db: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
+        db: AsyncSession, category_ids: List[int], limit: int = 10, offset: int = 0
     ) -> List[Post]:
-        """Получить посты для ленты пользователя (по его категориям, исключая его посты)"""
-        # Получаем категории пользователя
-        user_categories_result = await db.execute(
-            select(User)
-            .where(User.id == user_id)
-            .options(selectinload(User.categories))
-        )
-        user = user_categories_result.scalar_one_or_none()
-        if not user or not user.categories:
+        """Получить опубликованные посты для ленты по категориям пользователя"""
+        if not category_ids:
             return []
-        
-        category_ids = [cat.id for cat in user.categories]
-        
-        # Получаем посты по категориям пользователя, исключая его собственные
         result = await db.execute(
             select(Post)
-            .join(Post.categories)
             .where(
-                and_(
-                    Post.categories.any(Category.id.in_(category_ids)),
-                    Post.is_approved == True,
-                    Post.is_published == True,
-                )
+                Post.status == PostStatus.PUBLISHED,
+                PostRepository._in_categories(category_ids),
             )
-            .options(selectinload(Post.author), selectinload(Post.categories))
-            .order_by(Post.published_at.desc())
+            .options(_author_names(), _category_names())
+            .order_by(Post.published_at.desc(), Post.id.desc())
             .limit(limit)
             .offset(offset)
         )
         return result.scalars().all()
 
     @staticmethod
-    async def get_feed_posts_count(db: AsyncSession, user_id: int) -> int:
-        """Получить общее количество постов для ленты пользователя"""
-        # Получаем категории пользователя
-        user_categories_result = await db.execute(
-            select(User)
-            .where(User.id == user_id)
-            .options(selectinload(User.categories))
-        )
-        user = user_categories_result.scalar_one_or_none()
-        if not user or not user.categories:
+    async def get_feed_posts_count(db: AsyncSession, category_ids: List[int]) -> int:
+        """Получить общее количество постов для ленты по категориям пользователя"""
+        if not category_ids:
             return 0
-        
-        category_ids = [cat.id for cat in user.categories]
-        
-        # Подсчитываем количество постов
         result = await db.execute(
-            select(func.count(Post.id))
-            .join(Post.categories)
-            .where(
-                and_(
-                    Post.categories.any(Category.id.in_(category_ids)),
-                    Post.is_approved == True,
-                    Post.is_published == True,
-                )
+            select(func.count(Post.id)).where(
+                Post.status == PostStatus.PUBLISHED,
+                PostRepository._in_categories(category_ids),
             )
         )
         return result.scalar() or 0
@@ -2,7 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, delete, insert, distinct
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
-from ..models import User, Category, user_categories
+from ..models import User, user_categories
 
 
 class UserRepository:
@@ -10,8 +10,8 @@ class UserRepository:
 
     @staticmethod
     async def get_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[User]:
-        result = await db.execute(select(User).where(User.id == telegram_id))
-        return result.scalar_one_or_none()
+        # Поиск по первичному ключу сначала смотрит в identity map сессии
+        return await db.get(User, telegram_id)
 
     @staticmethod
     async def create_user(
@@ -28,7 +28,7 @@ class UserRepository:
             last_name=last_name,
         )
         db.add(user)
-        await db.commit()
+        await db.flush()
         await db.refresh(user)
         return user
 
@@ -64,8 +64,6 @@ class UserRepository:
             ]
             await db.execute(insert(user_categories).values(values))
 
-        await db.commit()
-
         # Возвращаем обновленного пользователя
         result = await db.execute(
             select(User)
@@ -75,27 +73,26 @@ class UserRepository:
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def get_users_by_categories(
+    async def get_user_ids_by_categories(
         db: AsyncSession, category_ids: List[int]
-    ) -> List[User]:
+    ) -> List[int]:
+        """ID пользователей, подписанных на любую из категорий"""
         result = await db.execute(
-            select(User)
-            .join(User.categories)
-            .where(Category.id.in_(category_ids))
-            .options(selectinload(User.categories))
+            select(user_categories.c.user_id)
+            .where(user_categories.c.category_id.in_(category_ids))
+            .distinct()
         )
         return result.scalars().all()
 
     @staticmethod
-    async def get_users_by_city_and_categories(
+    async def get_user_ids_by_city_and_categories(
         db: AsyncSession, city: str, category_ids: List[int]
-    ) -> List[User]:
-        """Получить пользователей по городу и категориям (с DISTINCT)"""
+    ) -> List[int]:
+        """ID пользователей города, подписанных на любую из категорий"""
         result = await db.execute(
-            select(User)
-            .join(User.categories)
-            .where(and_(User.city == city, Category.id.in_(category_ids)))
-            .options(selectinload(User.categories))
-            .distinct(User.id)  # Добавляем DISTINCT для уникальности
+            select(User.id)
+            .join(user_categories, user_categories.c.user_id == User.id)
+            .where(and_(User.city == city, user_categories.c.category_id.in_(category_ids)))
+            .distinct()
         )
         return result.scalars().all()
@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+from typing import List, Optional
+import logfire
+from sqlalchemy import Delete, Insert, Select, Update, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+
+# Ключ в session.info: все запросы сессии идут в основную базу
+USE_PRIMARY_KEY = "use_primary"
+# Ключ в session.info: реплика, закрепленная за сессией
+REPLICA_KEY = "replica"
+
+routed_queries_counter = logfire.metric_counter(
+    "db_routed_queries", description="Запросы, распределенные между основной базой и репликами"
+)
+
+
+def use_primary(db) -> None:
+    """Направлять все запросы сессии в основную базу (чтение своих записей)
+
+    Нужно для сценариев, которые сначала читают, а потом пишут на основе
+    прочитанного: реплика может отставать от основной базы.
+    """
+    db.info[USE_PRIMARY_KEY] = True
+
+
+class ReplicaSet:
+    """Реплики для чтения с выбором по кругу и проверкой доступности"""
+
+    def __init__(self, engines: List[AsyncEngine]):
+        self.engines = engines
+        self.healthy = [True] * len(engines)
+        self._counter = itertools.count()
+
+    def next_engine(self) -> Optional[AsyncEngine]:
+        """Следующая доступная реплика или None, если доступных нет"""
+        healthy = [engine for engine, ok in zip(self.engines, self.healthy, strict=True) if ok]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def is_healthy(self, engine: AsyncEngine) -> bool:
+        """Доступна ли реплика по результатам последней проверки"""
+        return self.healthy[self.engines.index(engine)]
+
+    async def check_health(self) -> None:
+        """Проверить доступность всех реплик запросом SELECT 1"""
+        for index, engine in enumerate(self.engines):
+            try:
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+                ok = True
+            except Exception as e:
+                ok = False
+                logfire.warning(f"Реплика {engine.url.render_as_string()} недоступна: {e}")
+            if ok != self.healthy[index]:
+                logfire.info(
+                    f"Реплика {engine.url.render_as_string()} "
+                    f"{'снова доступна' if ok else 'исключена из чтения'}"
+                )
+            self.healthy[index] = ok
+
+    async def run_health_checks(self, interval: float) -> None:
+        """Проверять реплики в фоне с заданным интервалом (в секундах)"""
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RoutingSession(Session):
+    """Сессия, отправляющая чтение на реплики, а запись - в основную базу
+
+    На реплику уходят только обычные SELECT. Запись, SELECT ... FOR UPDATE
+    и все запросы после первой записи в сессии идут в основную базу, чтобы
+    обработчик видел собственные изменения. Все чтения сессии идут в одну
+    реплику: реплики отстают по-разному, и при переходе между ними данные
+    могли бы "откатиться" назад. Отдельный запрос можно отправить в основную
+    базу опцией выполнения use_primary=True, не закрепляя за ней всю сессию.
+    """
+
+    def __init__(self, *args, replica_set: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if not self.replica_set or not self.replica_set.engines:
+            return primary
+
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            # После записи сессия закрепляется за основной базой
+            self.info[USE_PRIMARY_KEY] = True
+            routed_queries_counter.add(1, {"target": "primary"})
+            return primary
+
+        is_plain_read = (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not clause.get_execution_options().get(USE_PRIMARY_KEY)
+        )
+        if not is_plain_read or self.info.get(USE_PRIMARY_KEY):
+            routed_queries_counter.add(1, {"target": "primary"})
+            return primary
+
+        replica = self.info.get(REPLICA_KEY)
+        if replica is None or not self.replica_set.is_healthy(replica):
+            # Реплика выбирается при первом чтении и меняется, только если стала недоступна
+            replica = self.replica_set.next_engine()
+            if replica is None:
+                routed_queries_counter.add(1, {"target": "primary"})
+                return primary
+            self.info[REPLICA_KEY] = replica
+        routed_queries_counter.add(1, {"target": "replica"})
+        return replica.sync_engine
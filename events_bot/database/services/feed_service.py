@@ -0,0 +1,69 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ..connection import get_session_maker
+from ..repositories import FeedRepository
+import logfire
+import os
+
+
+# Режим ленты: "query" - лента собирается запросом по категориям при чтении,
+# "materialized" - посты раскладываются по лентам подписчиков при публикации
+# (таблица feed_entries), а чтение ленты идет по одному индексу
+FEED_MODE = os.getenv("FEED_MODE", "query")
+
+
+class FeedService:
+    """Сервис материализованной ленты"""
+
+    @staticmethod
+    def is_materialized() -> bool:
+        """Включен ли режим материализованной ленты"""
+        return FEED_MODE == "materialized"
+
+    @staticmethod
+    async def fan_out_posts(post_ids: List[int]) -> None:
+        """Разложить опубликованные посты по лентам подписчиков
+
+        Работает в своей сессии, поэтому запускается фоновой задачей после
+        коммита публикации.
+        """
+        async with get_session_maker()() as db:
+            added = await FeedRepository.fan_out_posts(db, post_ids)
+            await db.commit()
+        logfire.info(f"Посты {post_ids} добавлены в ленты: {added} записей")
+
+    @staticmethod
+    async def sync_all(db: AsyncSession) -> int:
+        """Досоздать недостающие записи лент (при запуске бота)
+
+        Просматриваются только посты, опубликованные после прошлой
+        синхронизации, а не все посты со всеми подписчиками.
+        """
+        return await FeedRepository.fan_out_since_sync(db)
+
+    @staticmethod
+    async def reset_sync(db: AsyncSession) -> None:
+        """Сбросить отметку синхронизации (при запуске в режиме query)
+
+        Пока режим выключен, ленты не обновляются при смене категорий,
+        поэтому после его включения ленты строятся заново (см.
+        FeedRepository.fan_out_since_sync).
+        """
+        await FeedRepository.reset_sync(db)
+
+    @staticmethod
+    async def on_categories_changed(
+        db: AsyncSession, user_id: int, old_category_ids: List[int], new_category_ids: List[int]
+    ) -> None:
+        """Дополнить или сократить ленту пользователя после смены категорий
+
+        Затрагиваются только посты добавленных или убранных категорий.
+        """
+        added = set(new_category_ids) - set(old_category_ids)
+        removed = set(old_category_ids) - set(new_category_ids)
+        if added:
+            count = await FeedRepository.backfill_user(db, user_id, list(added))
+            logfire.info(f"В ленту пользователя {user_id} добавлено {count} постов")
+        if removed:
+            count = await FeedRepository.prune_user(db, user_id, list(new_category_ids))
+            logfire.info(f"Из ленты пользователя {user_id} убрано {count} постов")
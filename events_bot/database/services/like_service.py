@@ -2,6 +2,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from ..repositories import LikeRepository
 from ..models import Like
+from ..routing import use_primary
+from ..hot_queries import HotQueries
 
 
 class LikeService:
@@ -44,7 +46,10 @@ class LikeService:
         db: AsyncSession, user_id: int, post_id: int
     ) -> Dict[str, Any]:
         """Переключить лайк пользователя на пост"""
-        return await LikeRepository.toggle_like(db, user_id, post_id)
+        # Состояние лайка читаем из основной базы: реплика может отставать
+        use_primary(db)
+        action, likes_count = await HotQueries.toggle_like(db, user_id, post_id)
+        return {"action": action, "likes_count": likes_count}
 
     @staticmethod
     async def is_post_liked_by_user(
@@ -1,7 +1,24 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from datetime import timedelta
+import os
 from ..repositories import PostRepository, ModerationRepository
-from ..models import Post, ModerationAction
+from ..models import Post, ModerationAction, PostStatus
+from ..read_models import ModerationPostView, ModerationQueuePage
+from ..cache import TTLCache
+
+
+# Размер страницы очереди модерации
+MODERATION_PAGE_SIZE = int(os.getenv("MODERATION_PAGE_SIZE", "10"))
+
+# Сколько постов модератор берет в работу за раз и на сколько секунд
+MODERATION_CLAIM_BATCH = int(os.getenv("MODERATION_CLAIM_BATCH", "5"))
+MODERATION_CLAIM_TTL = int(os.getenv("MODERATION_CLAIM_TTL", "900"))
+
+# Количество постов на модерации кэшируется: COUNT по всей очереди
+# не выполняется на каждое листание страниц
+PENDING_COUNT_KEY = "pending"
+_pending_count_cache = TTLCache(ttl=float(os.getenv("MODERATION_COUNT_CACHE_TTL", "30")))
 
 
 class ModerationService:
@@ -12,6 +29,84 @@ class ModerationService:
         """Получить очередь модерации"""
         return await PostRepository.get_pending_moderation(db)
 
+    @staticmethod
+    async def get_pending_count(db: AsyncSession) -> int:
+        """Количество постов на модерации (из кэша, если он свежий)"""
+        total = _pending_count_cache.get(PENDING_COUNT_KEY)
+        if total is None:
+            total = await PostRepository.count_pending_moderation(db)
+            _pending_count_cache.set(PENDING_COUNT_KEY, total)
+        return total
+
+    @staticmethod
+    def invalidate_pending_count() -> None:
+        """Сбросить кэш количества постов на модерации"""
+        _pending_count_cache.invalidate(PENDING_COUNT_KEY)
+
+    @staticmethod
+    async def get_moderation_queue_page(
+        db: AsyncSession, after_id: int = None, before_id: int = None, page_size: int = None
+    ) -> ModerationQueuePage:
+        """Получить страницу очереди модерации по курсору"""
+        page_size = page_size or MODERATION_PAGE_SIZE
+        # Лишняя строка показывает, есть ли еще страница в направлении выборки
+        items = await PostRepository.get_moderation_queue_items(
+            db, page_size + 1, after_id=after_id, before_id=before_id
+        )
+        has_more = len(items) > page_size
+        if before_id is not None:
+            items = items[-page_size:]
+            has_prev, has_next = has_more, bool(items)
+        else:
+            items = items[:page_size]
+            has_prev, has_next = after_id is not None and bool(items), has_more
+
+        total = await ModerationService.get_pending_count(db)
+        return ModerationQueuePage(
+            items=tuple(items),
+            total=max(total, len(items)),
+            prev_cursor=items[0].id if has_prev else None,
+            next_cursor=items[-1].id if has_next else None,
+        )
+
+    @staticmethod
+    def format_moderation_queue(page: ModerationQueuePage) -> str:
+        """Форматировать страницу очереди модерации одним сообщением"""
+        response = f"Посты на модерации (всего: {page.total}):\n\n"
+        for item in page.items:
+            category_str = ', '.join(item.category_names) if item.category_names else 'Неизвестно'
+            response += f"{item.title}\n"
+            response += f"Город: {item.city or 'Не указан'}\n"
+            response += f"{item.author_name}\n"
+            response += f"{category_str}\n"
+            if item.claimed_by_name:
+                response += f"🔒 В работе у {item.claimed_by_name}\n"
+            response += f"ID: {item.id}\n\n"
+        return response
+
+    @staticmethod
+    async def claim_posts(
+        db: AsyncSession, moderator_id: int, moderator_name: str, limit: int = None
+    ) -> List[int]:
+        """Взять в работу следующие свободные посты очереди"""
+        return await PostRepository.claim_posts(
+            db,
+            moderator_id,
+            moderator_name,
+            limit or MODERATION_CLAIM_BATCH,
+            timedelta(seconds=MODERATION_CLAIM_TTL),
+        )
+
+    @staticmethod
+    async def release_claims(db: AsyncSession, moderator_id: int) -> int:
+        """Вернуть в очередь все посты, взятые модератором"""
+        return await PostRepository.release_claims(db, moderator_id)
+
+    @staticmethod
+    async def get_claim_holder(db: AsyncSession, post_id: int, moderator_id: int):
+        """Имя другого модератора, у которого пост сейчас в работе"""
+        return await PostRepository.get_claim_holder(db, post_id, moderator_id)
+
     @staticmethod
     async def get_moderation_history(db: AsyncSession, post_id: int) -> List:
         """Получить историю модерации поста"""
@@ -23,32 +118,18 @@ class ModerationService:
         return await ModerationRepository.get_actions_by_type(db, action)
 
     @staticmethod
-    def format_post_for_moderation(post: Post) -> str:
+    def format_post_for_moderation(post: ModerationPostView) -> str:
         """Форматировать пост для модерации"""
-        # Безопасно получаем данные, избегая ленивой загрузки
-        category_names = []
-        if hasattr(post, 'categories') and post.categories is not None:
-            category_names = [getattr(cat, 'name', 'Неизвестно') for cat in post.categories]
-        
-        category_str = ', '.join(category_names) if category_names else 'Неизвестно'
-        
-        author_name = 'Аноним'
-        if hasattr(post, 'author') and post.author is not None:
-            author = post.author
-            author_name = (getattr(author, 'first_name', None) or 
-                         getattr(author, 'username', None) or 'Аноним')
-        
-        post_city = getattr(post, 'city', 'Не указан')
-        
-        created_at = getattr(post, 'created_at', None)
-        created_str = created_at.strftime('%d.%m.%Y %H:%M') if created_at else ''
+        category_str = ', '.join(post.category_names) if post.category_names else 'Неизвестно'
+        post_city = post.city or 'Не указан'
+        created_str = post.created_at.strftime('%d.%m.%Y %H:%M') if post.created_at else ''
         
         return (
             f"Пост на модерацию\n\n"
             f"Заголовок: {post.title}\n"
             f"Город: {post_city}\n"
             f"Категории: {category_str}\n"
-            f"Автор: {author_name}\n"
+            f"Автор: {post.author_name}\n"
             f"Создан: {created_str}\n\n"
             f"Содержание:\n{post.content}\n\n"
             f"ID поста: {post.id}"
@@ -63,3 +144,14 @@ class ModerationService:
             ModerationAction.REQUEST_CHANGES: "Требуются изменения",
         }
         return action_names.get(action, "Неизвестно")
+
+    @staticmethod
+    def get_status_display_name(status: PostStatus) -> str:
+        """Получить отображаемое имя состояния поста"""
+        status_names = {
+            PostStatus.PENDING: "⏳ На модерации",
+            PostStatus.PUBLISHED: "✅ Одобрен",
+            PostStatus.REJECTED: "❌ Отклонен",
+            PostStatus.CHANGES_REQUESTED: "📝 Требуются изменения",
+        }
+        return status_names.get(status, "Неизвестно")
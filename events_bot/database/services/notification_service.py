@@ -1,55 +1,37 @@
 from typing import List
 import logfire
 from ..repositories import UserRepository
-from ..models import User, Post, CategoryNames
+from ..models import CategoryNames
+from ..read_models import FeedPostView
 
 
 class NotificationService:
     """Асинхронный сервис для работы с уведомлениями"""
 
     @staticmethod
-    async def get_users_to_notify(db, post: Post) -> List[User]:
-        """Получить пользователей для уведомления о новом посте"""
-        # Загружаем связанные объекты
-        await db.refresh(post, attribute_names=["author", "categories"])
-        
+    async def get_user_ids_to_notify(db, post: FeedPostView) -> List[int]:
+        """Получить id пользователей для уведомления о новом посте"""
         # Получаем пользователей по городу поста и категориям поста
-        post_city = getattr(post, 'city', None)
-        category_ids = [cat.id for cat in post.categories]
-        logfire.info(f"Ищем пользователей для уведомления: город={post_city}, категории={category_ids}")
+        category_ids = list(post.category_ids)
+        logfire.info(f"Ищем пользователей для уведомления: город={post.city}, категории={category_ids}")
         
-        users = await UserRepository.get_users_by_city_and_categories(
-            db, post_city, category_ids
+        user_ids = await UserRepository.get_user_ids_by_city_and_categories(
+            db, post.city, category_ids
         )
 
         # Исключаем автора поста
-        filtered_users = [user for user in users if user.id != post.author_id]
+        filtered_users = [user_id for user_id in user_ids if user_id != post.author_id]
         logfire.info(f"Найдено {len(filtered_users)} пользователей для уведомления (исключая автора)")
         
         return filtered_users
 
     @staticmethod
-    def format_post_notification(post: Post) -> str:
+    def format_post_notification(post: FeedPostView) -> str:
         """Форматировать уведомление о посте"""
         # Получаем текстовые названия категорий через CategoryNames
-        category_names = []
-        if hasattr(post, 'categories') and post.categories is not None:
-            category_names = [
-                CategoryNames.get_text_name(cat.id) 
-                for cat in post.categories
-                if getattr(cat, 'id', None) is not None
-            ]
-        
+        category_names = [CategoryNames.get_text_name(category_id) for category_id in post.category_ids]
         category_str = ', '.join(category_names) if category_names else 'Неизвестно'
-        
-        author_name = 'Аноним'
-        if hasattr(post, 'author') and post.author is not None:
-            author = post.author
-            author_name = (getattr(author, 'first_name', None) or 
-                         getattr(author, 'username', None) or 'Аноним')
-        
-        published_at = getattr(post, 'published_at', None)
-        published_str = published_at.strftime('%d.%m.%Y %H:%M') if published_at else ''
+        published_str = post.published_at.strftime('%d.%m.%Y %H:%M') if post.published_at else ''
         
         return (
             f"{category_str}\n\n"
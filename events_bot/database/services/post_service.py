@@ -1,13 +1,38 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from ..repositories import PostRepository
-from ..models import Post
+from array import array
+from typing import List, Optional, Tuple
+from ..repositories import PostRepository, CategoryRepository
+from ..models import Post, ModerationAction
 import os
 import logfire
-from events_bot.bot.keyboards.moderation_keyboard import get_moderation_keyboard
 from events_bot.storage import file_storage
 from aiogram.types import FSInputFile, InputMediaPhoto
 from .moderation_service import ModerationService
+from .user_service import UserService
+from .feed_service import FeedService
+from ..unit_of_work import after_commit
+from ..routing import use_primary
+from ..hot_queries import HotQueries
+from ..read_models import FeedPostView, ModerationPostView, UserPostsPage
+from ..cache import TTLCache
+
+
+# Размер страницы списка постов автора (/my_posts)
+MY_POSTS_PAGE_SIZE = int(os.getenv("MY_POSTS_PAGE_SIZE", "10"))
+
+# Итоги ленты кэшируются по набору категорий и сбрасываются при публикации,
+# поэтому листание ленты не пересчитывает COUNT на каждое нажатие
+_feed_totals_cache = TTLCache(ttl=float(os.getenv("FEED_TOTALS_CACHE_TTL", "600")))
+
+# Снимок ленты: упорядоченные id постов, зафиксированные при открытии ленты.
+# Листание - это индекс в массиве и выборка поста по первичному ключу, а новые
+# публикации не сдвигают страницы. Ключ - (пользователь, набор категорий),
+# поэтому после смены категорий строится новый снимок.
+FEED_SNAPSHOT_MAX_POSTS = int(os.getenv("FEED_SNAPSHOT_MAX_POSTS", "1000"))
+_feed_snapshots = TTLCache(
+    ttl=float(os.getenv("FEED_SNAPSHOT_TTL", "1800")),
+    max_entries=int(os.getenv("FEED_SNAPSHOT_MAX_USERS", "10000")),
+)
 
 
 class PostService:
@@ -16,30 +41,36 @@ class PostService:
     @staticmethod
     async def create_post(
         db: AsyncSession, title: str, content: str, author_id: int, category_ids: List[int], city: str = None, image_id: str = None
-    ) -> Post:
+    ) -> ModerationPostView:
         """Создать новый пост"""
-        return await PostRepository.create_post(
+        use_primary(db)
+        post = await PostRepository.create_post(
             db, title, content, author_id, category_ids, city, image_id
         )
+        after_commit(db, ModerationService.invalidate_pending_count)
+        return post
 
     @staticmethod
     async def create_post_and_send_to_moderation(
         db: AsyncSession, title: str, content: str, author_id: int, category_ids: List[int], city: str = None, image_id: str = None, bot=None
-    ) -> Post:
+    ) -> ModerationPostView:
         """Создать пост и отправить на модерацию"""
-        # Создаем пост
+        # Создаем пост; запись и чтение созданной строки идут в основную базу
+        use_primary(db)
         post = await PostRepository.create_post(
             db, title, content, author_id, category_ids, city, image_id
         )
+        after_commit(db, ModerationService.invalidate_pending_count)
         
-        # Отправляем на модерацию
+        # Отправляем на модерацию после коммита, чтобы модератор не увидел
+        # пост, которого еще нет в базе
         if post and bot:
-            await PostService.send_post_to_moderation(bot, post, db)
+            after_commit(db, lambda: PostService.send_post_to_moderation(bot, post))
         
         return post
 
     @staticmethod
-    async def send_post_to_moderation(bot, post: Post, db=None):
+    async def send_post_to_moderation(bot, post: ModerationPostView):
         """Отправить пост на модерацию"""
         moderation_group_id = os.getenv("MODERATION_GROUP_ID")
         logfire.info(f"MODERATION_GROUP_ID: {moderation_group_id}")
@@ -48,12 +79,12 @@ class PostService:
             logfire.error("MODERATION_GROUP_ID не установлен")
             return
         
-        # Загружаем связанные объекты если передан db
-        if db:
-            await db.refresh(post, attribute_names=["author", "categories"])
-        
         # Форматируем пост для модерации
         moderation_text = ModerationService.format_post_for_moderation(post)
+        # Клавиатуры бота импортируются здесь: пакет events_bot.bot при импорте
+        # загружает обработчики, которые сами зависят от сервисов
+        from events_bot.bot.keyboards.moderation_keyboard import get_moderation_keyboard
+
         moderation_keyboard = get_moderation_keyboard(post.id)
         
         logfire.info(f"Отправляем пост {post.id} на модерацию в группу {moderation_group_id}")
@@ -66,12 +97,13 @@ class PostService:
                 media_photo = await file_storage.get_media_photo(post.image_id)
                 if media_photo:
                     logfire.info("Изображение найдено")
-                    await bot.send_photo(
+                    sent = await bot.send_photo(
                         chat_id=moderation_group_id,
                         photo=media_photo.media,
                         caption=moderation_text,
                         reply_markup=moderation_keyboard
                     )
+                    file_storage.media_cache.remember_sent_photo(post.image_id, sent)
                     logfire.info("Пост с изображением отправлен на модерацию")
                     return
                 else:
@@ -95,6 +127,44 @@ class PostService:
         """Получить посты пользователя"""
         return await PostRepository.get_user_posts(db, user_id)
 
+    @staticmethod
+    async def get_user_posts_page(
+        db: AsyncSession, user_id: int, after_id: int = None, before_id: int = None, page_size: int = None
+    ) -> UserPostsPage:
+        """Получить страницу постов автора по курсору (от новых к старым)"""
+        page_size = page_size or MY_POSTS_PAGE_SIZE
+        # Лишняя строка показывает, есть ли еще страница в направлении выборки
+        items = await PostRepository.get_user_post_items(
+            db, user_id, page_size + 1, after_id=after_id, before_id=before_id
+        )
+        has_more = len(items) > page_size
+        if before_id is not None:
+            items = items[-page_size:]
+            has_prev, has_next = has_more, bool(items)
+        else:
+            items = items[:page_size]
+            has_prev, has_next = after_id is not None and bool(items), has_more
+
+        return UserPostsPage(
+            items=tuple(items),
+            prev_cursor=items[0].id if has_prev else None,
+            next_cursor=items[-1].id if has_next else None,
+        )
+
+    @staticmethod
+    def format_user_posts_page(page: UserPostsPage) -> str:
+        """Форматировать страницу постов автора одним сообщением"""
+        response = "📊 Ваши посты:\n\n"
+        for item in page.items:
+            category_str = ', '.join(item.category_names) if item.category_names else 'Неизвестно'
+            response += f"📝 {item.title}\n"
+            response += f"🎓 {item.city or 'Не указан'}\n"
+            response += f"🌟 {category_str}\n"
+            response += f"📅 {item.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+            response += f"💖 {item.likes_count}\n"
+            response += f"📊 {ModerationService.get_status_display_name(item.status)}\n\n"
+        return response
+
     @staticmethod
     async def get_post_by_id(db: AsyncSession, post_id: int) -> Optional[Post]:
         """Получить пост по ID"""
@@ -115,39 +185,197 @@ class PostService:
     @staticmethod
     async def approve_post(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
-    ) -> Post:
+    ) -> Optional[Post]:
         """Одобрить пост"""
-        return await PostRepository.approve_post(db, post_id, moderator_id, comment)
+        post = await PostRepository.approve_post(db, post_id, moderator_id, comment)
+        after_commit(db, ModerationService.invalidate_pending_count)
+        if post:
+            await PostService._on_published(db, [post.id])
+        return post
 
     @staticmethod
     async def publish_post(
         db: AsyncSession, post_id: int
-    ) -> Post:
+    ) -> Optional[Post]:
         """Опубликовать одобренный пост"""
-        return await PostRepository.publish_post(db, post_id)
+        post = await PostRepository.publish_post(db, post_id)
+        after_commit(db, ModerationService.invalidate_pending_count)
+        return post
 
     @staticmethod
     async def reject_post(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
-    ) -> Post:
+    ) -> Optional[Post]:
         """Отклонить пост"""
-        return await PostRepository.reject_post(db, post_id, moderator_id, comment)
+        post = await PostRepository.reject_post(db, post_id, moderator_id, comment)
+        after_commit(db, ModerationService.invalidate_pending_count)
+        return post
 
     @staticmethod
     async def request_changes(
         db: AsyncSession, post_id: int, moderator_id: int, comment: str = None
-    ) -> Post:
+    ) -> Optional[Post]:
         """Запросить изменения в посте"""
-        return await PostRepository.request_changes(db, post_id, moderator_id, comment)
+        post = await PostRepository.request_changes(db, post_id, moderator_id, comment)
+        after_commit(db, ModerationService.invalidate_pending_count)
+        return post
+
+    @staticmethod
+    async def bulk_moderate(
+        db: AsyncSession, post_ids: List[int], moderator_id: int, action: ModerationAction, comment: str = None
+    ) -> List[int]:
+        """Применить действие модерации к нескольким постам сразу"""
+        moderated_ids = await PostRepository.bulk_moderate(
+            db, post_ids, moderator_id, action, comment
+        )
+        after_commit(db, ModerationService.invalidate_pending_count)
+        if action == ModerationAction.APPROVE and moderated_ids:
+            await PostService._on_published(db, moderated_ids)
+        return moderated_ids
+
+    @staticmethod
+    async def _on_published(db: AsyncSession, post_ids: List[int]) -> None:
+        """Обновить счетчики категорий и сбросить итоги ленты после публикации"""
+        await CategoryRepository.increment_published_counts(db, post_ids)
+        after_commit(db, PostService.invalidate_feed_totals)
+
+    @staticmethod
+    def invalidate_feed_totals() -> None:
+        """Сбросить кэш итогов ленты"""
+        _feed_totals_cache.invalidate()
+
+    @staticmethod
+    async def get_feed_total(db: AsyncSession, category_ids: List[int]) -> int:
+        """Количество опубликованных постов в наборе категорий
+
+        Для одной категории итог берется из счетчика категории. Для
+        нескольких категорий сумма счетчиков завысила бы итог на посты из
+        нескольких категорий сразу, поэтому считается точный COUNT - один
+        раз до следующей публикации.
+        """
+        key = frozenset(category_ids)
+        total = _feed_totals_cache.get(key)
+        if total is None:
+            if len(key) == 1:
+                total = await CategoryRepository.get_published_count(db, next(iter(key)))
+            else:
+                total = await HotQueries.count_feed_posts(db, list(key))
+            _feed_totals_cache.set(key, total)
+        return total
+
+    @staticmethod
+    async def get_posts_by_ids(db: AsyncSession, post_ids: List[int]) -> List[Post]:
+        """Получить посты по списку id"""
+        return await PostRepository.get_posts_by_ids(db, post_ids)
 
     @staticmethod
     async def get_feed_posts(
         db: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
     ) -> List[Post]:
         """Получить посты для ленты пользователя"""
-        return await PostRepository.get_feed_posts(db, user_id, limit, offset)
+        context = await UserService.get_feed_context(db, user_id)
+        return await PostRepository.get_feed_posts(db, list(context.category_ids), limit, offset)
 
     @staticmethod
     async def get_feed_posts_count(db: AsyncSession, user_id: int) -> int:
         """Получить общее количество постов для ленты пользователя"""
-        return await PostRepository.get_feed_posts_count(db, user_id)
+        context = await UserService.get_feed_context(db, user_id)
+        if not context.category_ids:
+            return 0
+        return await PostService.get_feed_total(db, list(context.category_ids))
+
+    @staticmethod
+    async def get_feed_page(
+        db: AsyncSession, user_id: int, limit: int, offset: int
+    ) -> Tuple[List[FeedPostView], int]:
+        """Страница ленты и общее количество постов в ленте
+
+        Категории пользователя берутся из кэша контекста ленты, количество -
+        из кэша итогов (только для непустой страницы).
+        """
+        category_ids = list((await UserService.get_feed_context(db, user_id)).category_ids)
+        if not category_ids:
+            return [], 0
+        if FeedService.is_materialized():
+            rows = await HotQueries.get_materialized_feed_page(db, user_id, limit, offset)
+        else:
+            rows = await HotQueries.get_feed_page(db, user_id, category_ids, limit, offset)
+        if not rows:
+            return [], 0
+        total = await PostService.get_feed_total(db, category_ids)
+        # Кэш мог отстать от ленты, но итог не может быть меньше увиденного
+        return [FeedPostView.from_row(row) for row in rows], max(total, offset + len(rows))
+
+    @staticmethod
+    async def open_feed_snapshot(db: AsyncSession, user_id: int) -> array:
+        """Зафиксировать порядок постов ленты пользователя (при открытии ленты)"""
+        context = await UserService.get_feed_context(db, user_id)
+        post_ids = []
+        if context.category_ids and FeedService.is_materialized():
+            post_ids = await HotQueries.get_materialized_feed_post_ids(
+                db, user_id, FEED_SNAPSHOT_MAX_POSTS
+            )
+        elif context.category_ids:
+            post_ids = await HotQueries.get_feed_post_ids(
+                db, list(context.category_ids), FEED_SNAPSHOT_MAX_POSTS
+            )
+        # array('q') хранит id по 8 байт без объектов int на каждый элемент
+        snapshot = array("q", post_ids)
+        _feed_snapshots.set((user_id, context.category_ids), snapshot)
+        return snapshot
+
+    @staticmethod
+    async def get_feed_post(
+        db: AsyncSession, user_id: int, index: int
+    ) -> Tuple[Optional[FeedPostView], int]:
+        """Пост ленты по позиции в снимке и длина снимка
+
+        Снимок строится заново, если он истек или пост из него больше
+        недоступен.
+        """
+        context = await UserService.get_feed_context(db, user_id)
+        snapshot = _feed_snapshots.get((user_id, context.category_ids))
+        fresh = snapshot is None
+        if fresh:
+            snapshot = await PostService.open_feed_snapshot(db, user_id)
+        while True:
+            if index >= len(snapshot):
+                return None, len(snapshot)
+            row = await HotQueries.get_feed_post_row(db, user_id, snapshot[index])
+            if row is not None or fresh:
+                return (FeedPostView.from_row(row) if row else None), len(snapshot)
+            snapshot = await PostService.open_feed_snapshot(db, user_id)
+            fresh = True
+
+    @staticmethod
+    async def get_feed_window(
+        db: AsyncSession, user_id: int, start: int, count: int, rebuild: bool = False
+    ) -> Tuple[List[Tuple[int, FeedPostView]], int]:
+        """Посты ленты с позиции start одним запросом
+
+        Возвращает пары (позиция, пост) и длину снимка. Истекший снимок
+        перестраивается только при rebuild (страница из нескольких постов);
+        предзагрузка его не перестраивает: позиции должны совпадать с теми,
+        что видит пользователь, поэтому без снимка возвращается пустой список.
+        """
+        context = await UserService.get_feed_context(db, user_id)
+        snapshot = _feed_snapshots.get((user_id, context.category_ids))
+        if snapshot is None and rebuild:
+            snapshot = await PostService.open_feed_snapshot(db, user_id)
+        elif snapshot is None:
+            return [], 0
+        post_ids = snapshot[start:start + count].tolist()
+        rows = await HotQueries.get_feed_post_rows(db, user_id, post_ids)
+        views = {row.id: FeedPostView.from_row(row) for row in rows}
+        window = [
+            (start + offset, views[post_id])
+            for offset, post_id in enumerate(post_ids)
+            if post_id in views
+        ]
+        return window, len(snapshot)
+
+    @staticmethod
+    async def get_post_views(db: AsyncSession, post_ids: List[int]) -> List[FeedPostView]:
+        """Посты по списку id для уведомлений (автор, категории, сердечки)"""
+        rows = await HotQueries.get_post_rows(db, post_ids)
+        return [FeedPostView.from_row(row) for row in rows]
@@ -1,9 +1,26 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
+from sqlalchemy import Row
 from ..repositories import UserRepository
 from ..models import User, Category
+from ..routing import use_primary
+from ..hot_queries import HotQueries
+from ..read_models import FeedContext
+from ..cache import TTLCache
+from ..unit_of_work import after_commit
+from .feed_service import FeedService
+import os
+
+
+# Контекст ленты (город и категории) кэшируется на пользователя: лента не
+# читает пользователя на каждое листание. Запись сбрасывается при смене
+# категорий или города, а в других процессах устаревает по TTL.
+_feed_context_cache = TTLCache(
+    ttl=float(os.getenv("FEED_CONTEXT_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("FEED_CONTEXT_CACHE_SIZE", "10000")),
+)
 
 
 class UserService:
@@ -18,16 +35,61 @@ class UserService:
         last_name: str = None,
     ) -> User:
         """Регистрация нового пользователя"""
+        # Проверка существования перед вставкой должна видеть основную базу
+        use_primary(db)
         return await UserRepository.get_or_create_user(
             db, telegram_id, username, first_name, last_name
         )
 
+    @staticmethod
+    async def get_user_row(db: AsyncSession, telegram_id: int) -> Optional[Row]:
+        """Данные пользователя строкой без загрузки объекта ORM (только для чтения)"""
+        return await HotQueries.get_user_row(db, telegram_id)
+
     @staticmethod
     async def select_categories(
         db: AsyncSession, user_id: int, category_ids: List[int]
     ) -> User:
         """Выбор категорий пользователем"""
-        return await UserRepository.add_categories_to_user(db, user_id, category_ids)
+        materialized = FeedService.is_materialized()
+        old_category_ids: List[int] = []
+        if materialized:
+            old_category_ids = await HotQueries.get_user_category_ids(db, user_id)
+        user = await UserRepository.add_categories_to_user(db, user_id, category_ids)
+        if materialized:
+            await FeedService.on_categories_changed(db, user_id, old_category_ids, category_ids)
+        UserService.invalidate_feed_context(db, user_id)
+        return user
+
+    @staticmethod
+    def set_city(db: AsyncSession, user: User, city: str) -> None:
+        """Сменить город пользователя"""
+        user.city = city
+        UserService.invalidate_feed_context(db, user.id)
+
+    @staticmethod
+    async def get_feed_context(db: AsyncSession, user_id: int) -> FeedContext:
+        """Город и категории пользователя для ленты (из кэша, если он свежий)
+
+        Промах кэша читается из основной базы: запись сбрасывается при смене
+        категорий, и заполнение с отстающей реплики вернуло бы старые данные
+        на все время TTL.
+        """
+        context = _feed_context_cache.get(user_id)
+        if context is None:
+            context = FeedContext.from_row(await HotQueries.get_feed_context_row(db, user_id))
+            _feed_context_cache.set(user_id, context)
+        return context
+
+    @staticmethod
+    def invalidate_feed_context(db: AsyncSession, user_id: int) -> None:
+        """Сбросить кэш контекста ленты пользователя
+
+        Запись сбрасывается сразу и еще раз после коммита: иначе параллельное
+        обновление успело бы закэшировать данные, которые вот-вот изменятся.
+        """
+        _feed_context_cache.invalidate(user_id)
+        after_commit(db, lambda: _feed_context_cache.invalidate(user_id))
 
     @staticmethod
     async def get_user_categories(db: AsyncSession, user_id: int) -> List[Category]:
@@ -41,8 +103,8 @@ class UserService:
         return user.categories if user else []
 
     @staticmethod
-    async def get_users_for_notification(
+    async def get_user_ids_for_notification(
         db: AsyncSession, category_ids: List[int]
-    ) -> List[User]:
-        """Получить пользователей для уведомления по категориям"""
-        return await UserRepository.get_users_by_categories(db, category_ids)
+    ) -> List[int]:
+        """Получить id пользователей для уведомления по категориям"""
+        return await UserRepository.get_user_ids_by_categories(db, category_ids)
@@ -0,0 +1,57 @@
+import inspect
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+import logfire
+
+
+# Ключ в session.info со списком действий, ожидающих коммита
+AFTER_COMMIT_KEY = "after_commit_hooks"
+
+AfterCommitHook = Callable[[], Union[None, Awaitable[None]]]
+
+
+def after_commit(db: AsyncSession, hook: AfterCommitHook) -> None:
+    """Выполнить действие после успешного коммита единицы работы
+
+    Подходит для побочных эффектов, которые нельзя откатить: рассылки,
+    сброса кэшей, фоновых задач, читающих данные из других сессий.
+    При откате транзакции действие не выполняется.
+    """
+    db.info.setdefault(AFTER_COMMIT_KEY, []).append(hook)
+
+
+async def run_after_commit_hooks(db: AsyncSession) -> None:
+    """Выполнить накопленные действия после коммита"""
+    hooks = db.info.pop(AFTER_COMMIT_KEY, [])
+    for hook in hooks:
+        try:
+            result = hook()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            # Коммит уже выполнен: ошибка действия не должна ломать обработку
+            logfire.exception("Ошибка действия после коммита {e}", e=e)
+
+
+async def commit(db: AsyncSession) -> None:
+    """Закоммитить сессию и выполнить действия после коммита"""
+    await db.commit()
+    await run_after_commit_hooks(db)
+
+
+@asynccontextmanager
+async def unit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Единица работы: один коммит в конце или откат при ошибке
+
+    Репозитории внутри только делают flush. Для частичного отката внутри
+    единицы работы используйте точку сохранения: `async with db.begin_nested()`.
+    """
+    try:
+        yield db
+    except BaseException:
+        db.info.pop(AFTER_COMMIT_KEY, None)
+        await db.rollback()
+        raise
+    else:
+        await commit(db)
@@ -1,8 +1,11 @@
 import os
+from datetime import timedelta
 import logfire
-from .interfaces import FileStorageInterface
+from .interfaces import FileStorageInterface, StoredFile
 from .file_storage import LocalFileStorage
 from .s3_storage import S3FileStorage
+from .media_cache import MediaCache
+from .disk_cache import DiskCachedFileStorage
 
 def has_s3_credentials() -> bool:
     """Проверить наличие данных для авторизации в S3"""
@@ -21,7 +24,15 @@ def get_file_storage() -> FileStorageInterface:
     if has_s3_credentials():
         try:
             logfire.info("Initializing S3 storage with provided credentials")
-            return S3FileStorage()
+            s3_storage = S3FileStorage()
+            if os.getenv("S3_DISK_CACHE_ENABLED", "false").lower() == "true":
+                logfire.info("Enabling local disk cache for S3 storage")
+                return DiskCachedFileStorage(
+                    s3_storage,
+                    cache_path=os.getenv("S3_DISK_CACHE_DIR", "media_cache"),
+                    max_bytes=int(os.getenv("S3_DISK_CACHE_MAX_MB", "512")) * 1024 * 1024,
+                )
+            return s3_storage
         except ValueError as e:
             logfire.warning(f"Failed to initialize S3 storage: {e}, falling back to local storage")
             return LocalFileStorage()
@@ -32,4 +43,29 @@ def get_file_storage() -> FileStorageInterface:
 # Инициализируем файловое хранилище для использования во всем приложении
 file_storage = get_file_storage()
 
-__all__ = ["FileStorageInterface", "LocalFileStorage", "S3FileStorage", "file_storage", "get_file_storage"] 
\ No newline at end of file
+
+def get_garbage_collector(session_maker):
+    """Создать сборщик мусора для хранилища приложения по переменным окружения"""
+    # Сборщик читает посты через репозитории базы, а сервисы базы импортируют
+    # это хранилище, поэтому модуль сборщика загружается только при вызове
+    from .garbage_collector import ImageGarbageCollector
+
+    return ImageGarbageCollector(
+        storage=file_storage,
+        session_maker=session_maker,
+        grace_period=timedelta(seconds=int(os.getenv("STORAGE_GC_GRACE_PERIOD", "86400"))),
+        batch_size=int(os.getenv("STORAGE_GC_BATCH_SIZE", "100")),
+        concurrency=int(os.getenv("STORAGE_GC_CONCURRENCY", "4")),
+    )
+
+__all__ = [
+    "FileStorageInterface",
+    "StoredFile",
+    "LocalFileStorage",
+    "S3FileStorage",
+    "MediaCache",
+    "DiskCachedFileStorage",
+    "file_storage",
+    "get_file_storage",
+    "get_garbage_collector",
+] 
\ No newline at end of file
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import aiofiles
+import logfire
+from aiogram.types import BufferedInputFile, InputMediaPhoto
+from .interfaces import FileStorageInterface, StoredFile
+from .s3_storage import S3FileStorage
+
+
+# Метрики дискового кэша
+cache_hits_counter = logfire.metric_counter(
+    "media_disk_cache_hits", description="Попадания в локальный кэш картинок"
+)
+cache_misses_counter = logfire.metric_counter(
+    "media_disk_cache_misses", description="Промахи локального кэша картинок"
+)
+cache_evictions_counter = logfire.metric_counter(
+    "media_disk_cache_evictions", description="Файлы, вытесненные из локального кэша"
+)
+
+
+class DiskCachedFileStorage(FileStorageInterface):
+    """Локальный дисковый кэш с вытеснением LRU поверх S3 хранилища
+
+    Чтение идет сначала с диска, при промахе файл скачивается из S3
+    и сохраняется в кэш. Запись и удаление выполняются в S3.
+    """
+
+    def __init__(self, backend: S3FileStorage, cache_path: str = "media_cache", max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            backend: S3 хранилище, для которого кэшируются файлы
+            cache_path: Путь к папке кэша
+            max_bytes: Максимальный суммарный размер файлов в кэше
+        """
+        self.backend = backend
+        self.media_cache = backend.media_cache
+        self.max_bytes = max_bytes
+        self.cache_path = Path(os.getcwd()) / Path(cache_path)
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+
+        # file_id -> (путь, размер); порядок - от давно использованных к недавним
+        self._entries: "OrderedDict[str, Tuple[Path, int]]" = OrderedDict()
+        self._size = 0
+        self._fetch_locks: Dict[str, asyncio.Lock] = {}
+        # Сколько читателей держат или ждут блокировку файла: пока они есть,
+        # блокировка не удаляется, иначе новый читатель скачал бы файл повторно
+        self._fetch_waiters: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    @property
+    def content_addressed(self) -> bool:
+        return self.backend.content_addressed
+
+    def _load_index(self) -> None:
+        """Восстановить индекс кэша по файлам на диске"""
+        files = []
+        for file_path in self.cache_path.iterdir():
+            if file_path.name.startswith("."):
+                # Недописанный файл от прошлого запуска
+                file_path.unlink(missing_ok=True)
+                continue
+            stat = file_path.stat()
+            files.append((stat.st_atime, file_path, stat.st_size))
+        for _, file_path, size in sorted(files):
+            self._entries[file_path.stem] = (file_path, size)
+            self._size += size
+        self._evict()
+
+    def stats(self) -> Dict[str, float]:
+        """Статистика кэша для подбора его размера"""
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+    async def _write_to_cache(self, file_id: str, file_data: bytes, file_extension: str) -> None:
+        """Атомарно записать файл в кэш и вытеснить старые файлы"""
+        if len(file_data) > self.max_bytes:
+            return
+        file_path = self.cache_path / f"{file_id}.{file_extension}"
+        tmp_path = self.cache_path / f".{file_id}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(file_data)
+        os.replace(tmp_path, file_path)
+
+        previous = self._entries.pop(file_id, None)
+        if previous:
+            self._size -= previous[1]
+        self._entries[file_id] = (file_path, len(file_data))
+        self._size += len(file_data)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Удалять давно использованные файлы, пока кэш больше лимита"""
+        while self._size > self.max_bytes and self._entries:
+            _, (file_path, size) = self._entries.popitem(last=False)
+            file_path.unlink(missing_ok=True)
+            self._size -= size
+            cache_evictions_counter.add(1)
+
+    def _drop(self, file_id: str) -> None:
+        """Удалить файл из кэша"""
+        entry = self._entries.pop(file_id, None)
+        if entry:
+            entry[0].unlink(missing_ok=True)
+            self._size -= entry[1]
+
+    async def _read_cached(self, file_id: str) -> Optional[Tuple[bytes, str]]:
+        """Прочитать файл из кэша, если он там есть"""
+        entry = self._entries.get(file_id)
+        if entry is None:
+            return None
+        file_path = entry[0]
+        try:
+            async with aiofiles.open(file_path, 'rb') as f:
+                file_data = await f.read()
+        except FileNotFoundError:
+            # Пока шло чтение, файл могли вытеснить или удалить - тогда запись
+            # уже убрана и ее размер вычтен
+            if self._entries.get(file_id) is entry:
+                del self._entries[file_id]
+                self._size -= entry[1]
+            return None
+        if file_id in self._entries:
+            self._entries.move_to_end(file_id)
+        return file_data, file_path.suffix.lstrip(".")
+
+    async def _get_file_data(self, file_id: str) -> Optional[Tuple[bytes, str]]:
+        """Получить данные файла из кэша, при промахе - из S3"""
+        cached = await self._read_cached(file_id)
+        if cached:
+            self.hits += 1
+            cache_hits_counter.add(1)
+            return cached
+
+        # Один запрос к S3 на файл, даже если его одновременно ждут несколько читателей
+        lock = self._fetch_locks.setdefault(file_id, asyncio.Lock())
+        self._fetch_waiters[file_id] = self._fetch_waiters.get(file_id, 0) + 1
+        try:
+            async with lock:
+                cached = await self._read_cached(file_id)
+                if cached:
+                    self.hits += 1
+                    cache_hits_counter.add(1)
+                    return cached
+                self.misses += 1
+                cache_misses_counter.add(1)
+                downloaded = await self.backend.read_file(file_id)
+                if downloaded:
+                    await self._write_to_cache(file_id, *downloaded)
+                return downloaded
+        finally:
+            self._fetch_waiters[file_id] -= 1
+            if not self._fetch_waiters[file_id]:
+                del self._fetch_waiters[file_id]
+                del self._fetch_locks[file_id]
+
+    async def save_file(self, file_data: bytes, file_extension: str) -> str:
+        """Сохранить файл в S3 и сразу положить его в кэш"""
+        file_id = await self.backend.save_file(file_data, file_extension)
+        await self._write_to_cache(file_id, file_data, file_extension)
+        return file_id
+
+    async def save_many(
+        self, files: List[Tuple[bytes, str]], concurrency: int = 10
+    ) -> List[str]:
+        """Сохранить несколько файлов в S3 и положить их в кэш"""
+        file_ids = await self.backend.save_many(files, concurrency)
+        for file_id, (file_data, file_extension) in zip(file_ids, files, strict=True):
+            await self._write_to_cache(file_id, file_data, file_extension)
+        return file_ids
+
+    async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
+        """Получить файл как InputMediaPhoto, читая его из локального кэша"""
+        # Если файл уже отправлялся в Telegram, переиспользуем его file_id
+        telegram_file_id = self.media_cache.get_telegram_file_id(file_id)
+        if telegram_file_id:
+            return InputMediaPhoto(media=telegram_file_id)
+        file_data = await self._get_file_data(file_id)
+        if file_data is None:
+            # Не удалось скачать файл - отдаем временную ссылку S3
+            return await self.backend.get_media_photo(file_id)
+        data, extension = file_data
+        # Данные передаются в памяти, поэтому вытеснение файла из кэша
+        # не ломает отправку, которая еще не завершилась
+        return InputMediaPhoto(media=BufferedInputFile(data, filename=f"{file_id}.{extension}"))
+
+    async def resolve_many(
+        self, file_ids: List[str], concurrency: int = 10
+    ) -> Dict[str, Optional[InputMediaPhoto]]:
+        """Получить InputMediaPhoto для нескольких файлов через кэш"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve_one(file_id: str) -> Tuple[str, Optional[InputMediaPhoto]]:
+            async with semaphore:
+                return file_id, await self.get_media_photo(file_id)
+
+        return dict(await asyncio.gather(
+            *(resolve_one(file_id) for file_id in dict.fromkeys(file_ids))
+        ))
+
+    async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
+        """Получить временную ссылку S3"""
+        return await self.backend.get_file_url(file_id, expires_in)
+
+    async def delete_file(self, file_id: str) -> bool:
+        """Удалить файл из S3 и из кэша"""
+        self._drop(file_id)
+        return await self.backend.delete_file(file_id)
+
+    async def delete_many(self, file_ids: List[str]) -> List[str]:
+        """Удалить несколько файлов из S3 и из кэша"""
+        for file_id in file_ids:
+            self._drop(file_id)
+        return await self.backend.delete_many(file_ids)
+
+    def list_files(self) -> AsyncIterator[StoredFile]:
+        """Перебрать файлы S3 (кэш не является источником истины)"""
+        return self.backend.list_files()
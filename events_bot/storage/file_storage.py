@@ -1,59 +1,125 @@
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import aiofiles
+import hashlib
 import os
 import uuid
+from datetime import datetime, timezone
 from pathlib import Path
 from aiogram.types import InputMediaPhoto, FSInputFile
-from .interfaces import FileStorageInterface
+from .interfaces import FileStorageInterface, StoredFile
+from .media_cache import MediaCache
+import logfire
 
 
 class LocalFileStorage(FileStorageInterface):
     """Локальное файловое хранилище через aiofiles"""
-    
-    def __init__(self, storage_path: str = "uploads"):
+
+    def __init__(self, storage_path: str = "uploads", content_addressed: bool = None):
         """
         Args:
             storage_path: Путь к папке для хранения файлов
+            content_addressed: Хранить файлы по хэшу содержимого (дедупликация)
         """
         self.storage_path = Path(os.getcwd()) / Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
-    
+        if content_addressed is None:
+            content_addressed = os.getenv("STORAGE_CONTENT_ADDRESSED", "false").lower() == "true"
+        self.content_addressed = content_addressed
+        self.media_cache = MediaCache()
+
+    def _find_file(self, file_id: str) -> Optional[Path]:
+        """Найти файл по id (с любым расширением)"""
+        for file_path in self.storage_path.glob(f"{file_id}.*"):
+            if file_path.exists():
+                return file_path
+        return None
+
     async def save_file(self, file_data: bytes, file_extension: str) -> str:
         """Сохранить файл локально"""
-        # Генерируем уникальный id
-        file_id = str(uuid.uuid4())
+        if self.content_addressed:
+            # Id файла - хэш содержимого, повторная загрузка не создает копию
+            file_id = hashlib.sha256(file_data).hexdigest()
+            existing_path = self._find_file(file_id)
+            if existing_path:
+                # Обновляем время изменения, чтобы сборщик мусора
+                # не удалил файл, на который сейчас ссылается новый черновик
+                os.utime(existing_path)
+                logfire.info(f"File already stored locally: {file_id}")
+                return file_id
+        else:
+            # Генерируем уникальный id
+            file_id = str(uuid.uuid4())
         file_path = self.storage_path / f"{file_id}.{file_extension}"
-        
-        # Сохраняем файл асинхронно
-        async with aiofiles.open(file_path, 'wb') as f:
+
+        # Сохраняем файл асинхронно через временный файл, чтобы
+        # параллельные загрузки одинакового содержимого не видели недописанный файл
+        tmp_path = self.storage_path / f".{file_id}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
             await f.write(file_data)
-        
+        os.replace(tmp_path, file_path)
+
         return file_id
-    
+
+    async def save_many(
+        self, files: List[Tuple[bytes, str]], concurrency: int = 10
+    ) -> List[str]:
+        """Сохранить несколько файлов локально"""
+        return await self._save_files(files, concurrency, self.save_file)
+
     async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
         """Получить файл как InputMediaPhoto для отправки в Telegram"""
-        # Ищем файл по id (проверяем все возможные расширения)
-        for file_path in self.storage_path.glob(f"{file_id}.*"):
-            if file_path.exists():
-                return InputMediaPhoto(media=FSInputFile(str(file_path)))
+        # Если файл уже отправлялся в Telegram, переиспользуем его file_id
+        telegram_file_id = self.media_cache.get_telegram_file_id(file_id)
+        if telegram_file_id:
+            return InputMediaPhoto(media=telegram_file_id)
+        file_path = self._find_file(file_id)
+        if file_path:
+            return InputMediaPhoto(media=FSInputFile(str(file_path)))
         return None
-    
+
+    async def resolve_many(
+        self, file_ids: List[str], concurrency: int = 10
+    ) -> Dict[str, Optional[InputMediaPhoto]]:
+        """Получить InputMediaPhoto для нескольких файлов"""
+        # Поиск на локальном диске не требует сетевых запросов
+        return {
+            file_id: await self.get_media_photo(file_id)
+            for file_id in dict.fromkeys(file_ids)
+        }
+
     async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
         """Получить URL файла для прямого доступа (локальный путь)"""
-        # Ищем файл по id (проверяем все возможные расширения)
-        for file_path in self.storage_path.glob(f"{file_id}.*"):
-            if file_path.exists():
-                # Возвращаем абсолютный путь к файлу
-                return str(file_path.absolute())
+        file_path = self._find_file(file_id)
+        if file_path:
+            # Возвращаем абсолютный путь к файлу
+            return str(file_path.absolute())
         return None
-    
+
     async def delete_file(self, file_id: str) -> bool:
         """Удалить файл по id"""
-        # Ищем файл по id
-        for file_path in self.storage_path.glob(f"{file_id}.*"):
-            if file_path.exists():
-                file_path.unlink()
-                return True
+        self.media_cache.forget(file_id)
+        file_path = self._find_file(file_id)
+        if file_path:
+            file_path.unlink()
+            return True
         return False
-    
- 
\ No newline at end of file
+
+    async def delete_many(self, file_ids: List[str]) -> List[str]:
+        """Удалить несколько файлов"""
+        return [
+            file_id for file_id in dict.fromkeys(file_ids)
+            if await self.delete_file(file_id)
+        ]
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        """Перебрать все файлы в папке хранилища"""
+        for file_path in self.storage_path.iterdir():
+            # Пропускаем временные файлы незавершенных загрузок
+            if file_path.name.startswith(".") or not file_path.is_file():
+                continue
+            stat = file_path.stat()
+            yield StoredFile(
+                file_id=file_path.stem,
+                size=stat.st_size,
+                modified_at=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            )
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import logfire
+from events_bot.database.repositories import PostRepository
+from .interfaces import FileStorageInterface
+
+
+# Метрики сборщика мусора
+gc_runs_counter = logfire.metric_counter(
+    "storage_gc_runs", description="Количество запусков сборщика мусора хранилища"
+)
+gc_orphaned_counter = logfire.metric_counter(
+    "storage_gc_orphaned_files", description="Найдено файлов без ссылок из постов"
+)
+gc_deleted_counter = logfire.metric_counter(
+    "storage_gc_deleted_files", description="Удалено файлов без ссылок из постов"
+)
+gc_freed_bytes_counter = logfire.metric_counter(
+    "storage_gc_freed_bytes", unit="By", description="Освобождено байт в хранилище"
+)
+gc_duration_histogram = logfire.metric_histogram(
+    "storage_gc_duration", unit="s", description="Длительность прохода сборщика мусора"
+)
+
+
+@dataclass
+class GarbageCollectionReport:
+    """Отчет о проходе сборщика мусора"""
+
+    dry_run: bool
+    scanned: int = 0
+    referenced: int = 0
+    in_grace_period: int = 0
+    orphaned: List[str] = field(default_factory=list)
+    orphaned_bytes: int = 0
+    deleted: int = 0
+    deleted_bytes: int = 0
+    failed: int = 0
+    duration: float = 0.0
+
+    def format(self) -> str:
+        """Текстовое представление отчета"""
+        mode = "пробный запуск, ничего не удалено" if self.dry_run else "удаление"
+        return (
+            f"Сборка мусора хранилища ({mode})\n"
+            f"Просмотрено файлов: {self.scanned}\n"
+            f"Используются постами: {self.referenced}\n"
+            f"Моложе льготного периода: {self.in_grace_period}\n"
+            f"Без ссылок: {len(self.orphaned)} ({self.orphaned_bytes} байт)\n"
+            f"Удалено: {self.deleted} ({self.deleted_bytes} байт), ошибок: {self.failed}\n"
+            f"Длительность: {self.duration:.2f} с"
+        )
+
+
+class ImageGarbageCollector:
+    """Сборщик файлов, на которые не ссылается ни один пост
+
+    Файлы сохраняются до создания поста, поэтому отмененные черновики
+    и отклоненные посты оставляют их в хранилище. Сборщик сравнивает
+    файлы хранилища с Post.image_id и удаляет лишние пачками.
+    """
+
+    def __init__(
+        self,
+        storage: FileStorageInterface,
+        session_maker,
+        grace_period: timedelta = timedelta(hours=24),
+        batch_size: int = 100,
+        concurrency: int = 4,
+    ):
+        """
+        Args:
+            storage: Файловое хранилище
+            session_maker: Фабрика асинхронных сессий базы данных
+            grace_period: Файлы моложе этого периода не удаляются (черновики в процессе создания)
+            batch_size: Количество файлов в одной пачке удаления
+            concurrency: Максимальное количество одновременно удаляемых пачек
+        """
+        self.storage = storage
+        self.session_maker = session_maker
+        self.grace_period = grace_period
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def collect(self, dry_run: bool = False) -> GarbageCollectionReport:
+        """Выполнить один проход сборки мусора"""
+        started = time.monotonic()
+        report = GarbageCollectionReport(dry_run=dry_run)
+
+        async with self.session_maker() as db:
+            referenced_ids = await PostRepository.get_referenced_image_ids(db)
+
+        threshold = datetime.now(timezone.utc) - self.grace_period
+        sizes: Dict[str, int] = {}
+        async for stored_file in self.storage.list_files():
+            report.scanned += 1
+            if stored_file.file_id in referenced_ids:
+                report.referenced += 1
+            elif stored_file.modified_at > threshold:
+                report.in_grace_period += 1
+            else:
+                report.orphaned.append(stored_file.file_id)
+                report.orphaned_bytes += stored_file.size
+                sizes[stored_file.file_id] = stored_file.size
+
+        if not dry_run and report.orphaned:
+            await self._delete_orphaned(report, sizes)
+
+        report.duration = time.monotonic() - started
+        gc_runs_counter.add(1)
+        gc_orphaned_counter.add(len(report.orphaned))
+        gc_duration_histogram.record(report.duration)
+        logfire.info(report.format())
+        return report
+
+    async def _delete_orphaned(self, report: GarbageCollectionReport, sizes: Dict[str, int]) -> None:
+        """Удалить найденные файлы пачками с ограничением параллельности
+
+        Освобожденные байты считаются только по файлам, удаление которых
+        подтвердило хранилище.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def delete_batch(batch: List[str]) -> None:
+            async with semaphore:
+                deleted = await self.storage.delete_many(batch)
+            report.deleted += len(deleted)
+            report.deleted_bytes += sum(sizes[file_id] for file_id in deleted)
+            report.failed += len(batch) - len(deleted)
+
+        batches = [
+            report.orphaned[start:start + self.batch_size]
+            for start in range(0, len(report.orphaned), self.batch_size)
+        ]
+        await asyncio.gather(*(delete_batch(batch) for batch in batches))
+
+        gc_deleted_counter.add(report.deleted)
+        gc_freed_bytes_counter.add(report.deleted_bytes)
+
+    async def run_periodically(self, interval: float, dry_run: bool = False) -> None:
+        """Запускать сборку мусора в фоне с заданным интервалом (в секундах)"""
+        while True:
+            try:
+                await self.collect(dry_run=dry_run)
+            except Exception as e:
+                logfire.exception("Ошибка сборки мусора хранилища {e}", e=e)
+            await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+    from events_bot.database import create_async_engine_and_session
+    from events_bot.storage import get_garbage_collector
+
+    parser = argparse.ArgumentParser(description="Сборка мусора файлового хранилища")
+    parser.add_argument(
+        "--delete", action="store_true", help="Удалить файлы (по умолчанию только отчет)"
+    )
+    args = parser.parse_args()
+
+    async def main():
+        engine, session_maker = create_async_engine_and_session()
+        try:
+            report = await get_garbage_collector(session_maker).collect(dry_run=not args.delete)
+            print(report.format())
+            for file_id in report.orphaned:
+                print(file_id)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
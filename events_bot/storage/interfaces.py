@@ -1,16 +1,37 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from aiogram.types import InputMediaPhoto
+from .media_cache import MediaCache
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    """Файл, лежащий в хранилище"""
+
+    file_id: str
+    size: int
+    modified_at: datetime  # Время последнего изменения (UTC)
 
 
 class FileStorageInterface(ABC):
     """Абстрактный интерфейс для файлового хранилища"""
+
+    # Кэш file_id Telegram и временных URL, общий для всех постов с этим файлом
+    media_cache: MediaCache
+    # Хранить файлы по хэшу содержимого (дедупликация)
+    content_addressed: bool
     
     @abstractmethod
     async def save_file(self, file_data: bytes, file_extension: str) -> str:
         """
         Сохранить файл и вернуть его id
         
+        В режиме хранения по содержимому id - хэш данных файла,
+        повторная загрузка тех же данных возвращает id существующего файла
+        
         Args:
             file_data: Данные файла в bytes
             file_extension: Расширение файла (например, 'jpg')
@@ -58,4 +79,93 @@ class FileStorageInterface(ABC):
         Returns:
             bool: True если файл удален, False если файл не найден
         """
-        pass 
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def save_many(
+        self, files: List[Tuple[bytes, str]], concurrency: int = 10
+    ) -> List[str]:
+        """
+        Сохранить несколько файлов
+        
+        Args:
+            files: Список пар (данные файла, расширение)
+            concurrency: Максимальное количество одновременных загрузок
+            
+        Returns:
+            List[str]: Id файлов в порядке входного списка
+        """
+        pass
+
+    async def _save_files(
+        self,
+        files: List[Tuple[bytes, str]],
+        concurrency: int,
+        save_one: Callable[[bytes, str], Awaitable[str]],
+    ) -> List[str]:
+        """Сохранить пачку файлов параллельно функцией записи одного файла
+
+        Общая часть save_many для всех хранилищ: хранилище передает только
+        запись одного файла.
+        """
+        if self.content_addressed:
+            # Одинаковые данные в пачке сохраняем один раз: параллельные
+            # записи не видят друг друга и создали бы копии с разными расширениями
+            unique: Dict[bytes, str] = {}
+            for file_data, file_extension in files:
+                unique.setdefault(file_data, file_extension)
+            files_to_save = list(unique.items())
+        else:
+            files_to_save = files
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def save_limited(file_data: bytes, file_extension: str) -> str:
+            async with semaphore:
+                return await save_one(file_data, file_extension)
+
+        file_ids = list(await asyncio.gather(
+            *(save_limited(file_data, extension) for file_data, extension in files_to_save)
+        ))
+        if not self.content_addressed:
+            return file_ids
+        saved = dict(zip(unique, file_ids, strict=True))
+        return [saved[file_data] for file_data, _ in files]
+
+    @abstractmethod
+    async def resolve_many(
+        self, file_ids: List[str], concurrency: int = 10
+    ) -> Dict[str, Optional[InputMediaPhoto]]:
+        """
+        Получить InputMediaPhoto для нескольких файлов
+        
+        Args:
+            file_ids: Id файлов
+            concurrency: Максимальное количество одновременных запросов
+            
+        Returns:
+            Dict[str, Optional[InputMediaPhoto]]: InputMediaPhoto по id файла, None если файл не найден
+        """
+        pass
+
+    @abstractmethod
+    async def delete_many(self, file_ids: List[str]) -> List[str]:
+        """
+        Удалить несколько файлов
+        
+        Args:
+            file_ids: Id файлов
+            
+        Returns:
+            List[str]: Id файлов, удаленных без ошибок
+        """
+        pass
+
+    @abstractmethod
+    def list_files(self) -> AsyncIterator[StoredFile]:
+        """
+        Перебрать все файлы хранилища
+        
+        Returns:
+            AsyncIterator[StoredFile]: Файлы с размером и временем изменения
+        """
+        pass
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from aiogram.types import Message
+
+
+class MediaCache:
+    """Кэш Telegram file_id и временных URL для сохраненных файлов"""
+
+    def __init__(self, max_entries: int = 10000, url_expiry_margin: int = 60):
+        """
+        Args:
+            max_entries: Максимальное количество записей в каждом из кэшей
+            url_expiry_margin: Запас в секундах до истечения временного URL
+        """
+        self.max_entries = max_entries
+        self.url_expiry_margin = url_expiry_margin
+        self._telegram_file_ids: "OrderedDict[str, str]" = OrderedDict()
+        self._urls: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get_telegram_file_id(self, file_id: str) -> Optional[str]:
+        """Получить file_id Telegram, под которым файл уже был отправлен"""
+        telegram_file_id = self._telegram_file_ids.get(file_id)
+        if telegram_file_id is not None:
+            self._telegram_file_ids.move_to_end(file_id)
+        return telegram_file_id
+
+    def remember_telegram_file_id(self, file_id: str, telegram_file_id: str) -> None:
+        """Запомнить file_id Telegram для файла хранилища"""
+        self._telegram_file_ids[file_id] = telegram_file_id
+        self._telegram_file_ids.move_to_end(file_id)
+        while len(self._telegram_file_ids) > self.max_entries:
+            self._telegram_file_ids.popitem(last=False)
+
+    def remember_sent_photo(self, file_id: str, message: Message) -> None:
+        """Запомнить file_id Telegram из отправленного сообщения с фото"""
+        if isinstance(message, Message) and message.photo:
+            self.remember_telegram_file_id(file_id, message.photo[-1].file_id)
+
+    def get_url(self, file_id: str) -> Optional[str]:
+        """Получить закэшированный URL, если он еще не истек"""
+        cached = self._urls.get(file_id)
+        if cached is None:
+            return None
+        url, expires_at = cached
+        if expires_at <= time.monotonic():
+            del self._urls[file_id]
+            return None
+        return url
+
+    def remember_url(self, file_id: str, url: str, expires_in: int) -> None:
+        """Запомнить временный URL файла"""
+        ttl = expires_in - self.url_expiry_margin
+        if ttl <= 0:
+            return
+        self._urls[file_id] = (url, time.monotonic() + ttl)
+        self._urls.move_to_end(file_id)
+        while len(self._urls) > self.max_entries:
+            self._urls.popitem(last=False)
+
+    def forget(self, file_id: str) -> None:
+        """Удалить все записи о файле"""
+        self._telegram_file_ids.pop(file_id, None)
+        self._urls.pop(file_id, None)
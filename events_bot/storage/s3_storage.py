@@ -1,14 +1,30 @@
+import asyncio
 import os
 import uuid
-from typing import Optional
+import hashlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from pathlib import Path
 from aioboto3 import Session
 from aiogram.types import InputMediaPhoto, URLInputFile
 from botocore.exceptions import ClientError, NoCredentialsError
-from .interfaces import FileStorageInterface
+from .interfaces import FileStorageInterface, StoredFile
+from .media_cache import MediaCache
 import logfire
 from types_aiobotocore_s3 import Client
 
+# Расширения, под которыми может храниться файл
+SUPPORTED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
+
+# Максимальное количество ключей в одном запросе DeleteObjects
+DELETE_OBJECTS_CHUNK_SIZE = 1000
+
+# Сколько ключей файлов ищется одновременно
+KEY_LOOKUP_CONCURRENCY = 10
+
+# Начиная с такого числа id ключи ищутся одним постраничным листингом bucket,
+# а не отдельным запросом на каждый файл
+KEY_LISTING_THRESHOLD = 200
+
 
 class S3FileStorage(FileStorageInterface):
     """S3 файловое хранилище для продакшена"""
@@ -19,7 +35,8 @@ class S3FileStorage(FileStorageInterface):
         aws_access_key_id: str = None,
         aws_secret_access_key: str = None,
         region_name: str = None,
-        endpoint_url: str = None
+        endpoint_url: str = None,
+        content_addressed: bool = None
     ):
         """
             bucket_name: Имя S3 bucket
@@ -27,12 +44,17 @@ class S3FileStorage(FileStorageInterface):
             aws_secret_access_key: AWS Secret Access Key
             region_name: AWS регион
             endpoint_url: URL эндпоинта (для совместимости с другими S3-совместимыми сервисами)
+            content_addressed: Хранить файлы по хэшу содержимого (дедупликация)
         """
         self.bucket_name = bucket_name or os.getenv("S3_BUCKET_NAME")
         self.aws_access_key_id = aws_access_key_id or os.getenv("AWS_ACCESS_KEY_ID")
         self.aws_secret_access_key = aws_secret_access_key or os.getenv("AWS_SECRET_ACCESS_KEY")
         self.region_name = region_name or os.getenv("AWS_REGION", "us-east-1")
         self.endpoint_url = endpoint_url or os.getenv("S3_ENDPOINT_URL")
+        if content_addressed is None:
+            content_addressed = os.getenv("STORAGE_CONTENT_ADDRESSED", "false").lower() == "true"
+        self.content_addressed = content_addressed
+        self.media_cache = MediaCache()
         
         if not self.bucket_name:
             raise ValueError("S3_BUCKET_NAME environment variable is required")
@@ -47,120 +69,299 @@ class S3FileStorage(FileStorageInterface):
             region_name=self.region_name
         )
     
+    def _client(self):
+        """Открыть клиент S3 (используется как async context manager)"""
+        return self.session.client(
+            's3',
+            endpoint_url=self.endpoint_url,
+            use_ssl=False
+        )
+
     async def save_file(self, file_data: bytes, file_extension: str) -> str:
         """Сохранить файл в S3"""
-        # Генерируем уникальный id
-        file_id = str(uuid.uuid4())
-        key = f"{file_id}.{file_extension}"
-        
         try:
-            async with self.session.client(
-                's3',
-                endpoint_url=self.endpoint_url,
-                use_ssl=False
-            ) as s3_client:
-                await s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=key,
-                    Body=file_data,
-                    ContentType=self._get_content_type(file_extension)
-                )
-                
-            logfire.info(f"File saved to S3: {key}")
-            return file_id
-            
+            async with self._client() as s3_client:
+                return await self._put_file(s3_client, file_data, file_extension)
         except Exception as e:
             logfire.error(f"Error saving file to S3: {e}")
             raise
-    
+
+    async def save_many(
+        self, files: List[Tuple[bytes, str]], concurrency: int = 10
+    ) -> List[str]:
+        """Сохранить несколько файлов в S3 через один клиент"""
+        try:
+            async with self._client() as s3_client:
+                return await self._save_files(
+                    files,
+                    concurrency,
+                    lambda file_data, file_extension: self._put_file(s3_client, file_data, file_extension),
+                )
+        except Exception as e:
+            logfire.error(f"Error saving files to S3: {e}")
+            raise
+
+    async def _put_file(self, s3_client: Client, file_data: bytes, file_extension: str) -> str:
+        """Загрузить файл открытым клиентом и вернуть его id"""
+        if self.content_addressed:
+            # Id файла - хэш содержимого, повторная загрузка не создает копию
+            file_id = hashlib.sha256(file_data).hexdigest()
+        else:
+            # Генерируем уникальный id
+            file_id = str(uuid.uuid4())
+        key = f"{file_id}.{file_extension}"
+
+        # Файл ищется только по хэшу: те же данные могли быть сохранены
+        # с другим расширением (например, .jpeg вместо .jpg)
+        existing_key = await self._find_key(s3_client, file_id) if self.content_addressed else None
+        if existing_key:
+            # Копируем объект сам в себя, чтобы обновить LastModified:
+            # сборщик мусора не должен удалить файл, на который ссылается новый черновик
+            await s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=existing_key,
+                CopySource={'Bucket': self.bucket_name, 'Key': existing_key},
+                MetadataDirective='REPLACE',
+                ContentType=self._get_content_type(existing_key.rsplit('.', 1)[1])
+            )
+            logfire.info(f"File already stored in S3: {existing_key}")
+            return file_id
+        await s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=file_data,
+            ContentType=self._get_content_type(file_extension)
+        )
+        logfire.info(f"File saved to S3: {key}")
+        return file_id
+
     async def get_media_photo(self, file_id: str) -> Optional[InputMediaPhoto]:
         """Получить файл как InputMediaPhoto для отправки в Telegram"""
+        # Если файл уже отправлялся в Telegram, переиспользуем его file_id
+        telegram_file_id = self.media_cache.get_telegram_file_id(file_id)
+        if telegram_file_id:
+            return InputMediaPhoto(media=telegram_file_id)
+        # Генерируем временный URL для файла
+        url = await self.get_file_url(file_id, expires_in=3600)
+        if url:
+            return InputMediaPhoto(media=URLInputFile(url))
+        logfire.warning(f"File not found in S3: {file_id}")
+        return None
+
+    async def resolve_many(
+        self, file_ids: List[str], concurrency: int = 10
+    ) -> Dict[str, Optional[InputMediaPhoto]]:
+        """Получить InputMediaPhoto для нескольких файлов через один клиент"""
+        media: Dict[str, Optional[InputMediaPhoto]] = {}
+        to_fetch = []
+        for file_id in dict.fromkeys(file_ids):
+            telegram_file_id = self.media_cache.get_telegram_file_id(file_id)
+            if telegram_file_id:
+                media[file_id] = InputMediaPhoto(media=telegram_file_id)
+            else:
+                to_fetch.append(file_id)
+        if not to_fetch:
+            return media
+
+        semaphore = asyncio.Semaphore(concurrency)
         try:
-            # Пробуем найти файл с разными расширениями
-            for extension in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                key = f"{file_id}.{extension}"
-                try:
-                    # Генерируем временный URL для файла
-                    url = await self.get_file_url(file_id, expires_in=3600)
-                    if url:
-                        logfire.info("File retrieved from S3: {key}, url: {url}", key=key, url=url)
-                        return InputMediaPhoto(media=URLInputFile(url))
-                except Exception:
-                    continue
-                            
-            logfire.warning(f"File not found in S3: {file_id}")
-            return None
-            
+            async with self._client() as s3_client:
+                async def resolve_one(file_id: str) -> None:
+                    async with semaphore:
+                        url = await self._presign_file(s3_client, file_id, 3600)
+                    media[file_id] = InputMediaPhoto(media=URLInputFile(url)) if url else None
+
+                await asyncio.gather(*(resolve_one(file_id) for file_id in to_fetch))
         except Exception as e:
-            logfire.error(f"Error retrieving file from S3: {e}")
-            return None
-    
+            logfire.error(f"Error resolving files from S3: {e}")
+            for file_id in to_fetch:
+                media.setdefault(file_id, None)
+        return media
+
     async def delete_file(self, file_id: str) -> bool:
         """Удалить файл из S3 по id"""
+        self.media_cache.forget(file_id)
         try:
-            async with self.session.client(
-                's3',
-                endpoint_url=self.endpoint_url,
-                use_ssl=False
-            ) as s3_client:
-                s3_client: Client
+            async with self._client() as s3_client:
                 # Пробуем удалить файл с разными расширениями
-                for extension in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
+                for extension in SUPPORTED_EXTENSIONS:
                     key = f"{file_id}.{extension}"
-                    try:
-                        await s3_client.delete_object(Bucket=self.bucket_name, Key=key)
-                        logfire.info(f"File deleted from S3: {key}")
-                        return True
-                    except ClientError as e:
-                        if e.response['Error']['Code'] == 'NoSuchKey':
-                            continue
-                        else:
-                            raise
-                            
+                    if not await self._object_exists(s3_client, key):
+                        continue
+                    await s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+                    logfire.info(f"File deleted from S3: {key}")
+                    return True
+
             logfire.warning(f"File not found for deletion in S3: {file_id}")
             return False
-            
+
         except Exception as e:
             logfire.error(f"Error deleting file from S3: {e}")
             return False
-    
-    async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
-        """Получить URL файла для прямого доступа (с временной ссылкой)"""
+
+    async def delete_many(self, file_ids: List[str]) -> List[str]:
+        """Удалить несколько файлов запросами DeleteObjects
+
+        Возвращает id файлов, удаление которых S3 подтвердил. При ошибке
+        возвращаются файлы, удаленные до нее.
+        """
+        unique_ids = list(dict.fromkeys(file_ids))
+        for file_id in unique_ids:
+            self.media_cache.forget(file_id)
+
+        keys: Dict[str, str] = {}
+        deleted: List[str] = []
+        failed_count = 0
         try:
-            async with self.session.client(
-                's3',
-                endpoint_url=self.endpoint_url,
-                use_ssl=False
-            ) as s3_client:
-                s3_client: Client
-                # Пробуем найти файл с разными расширениями
-                for extension in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
+            async with self._client() as s3_client:
+                # Расширение файла не хранится: находим настоящие ключи,
+                # чтобы удалять только существующие объекты
+                keys = await self._find_keys(s3_client, unique_ids)
+                key_list = list(keys)
+                for start in range(0, len(key_list), DELETE_OBJECTS_CHUNK_SIZE):
+                    chunk = key_list[start:start + DELETE_OBJECTS_CHUNK_SIZE]
+                    response = await s3_client.delete_objects(
+                        Bucket=self.bucket_name,
+                        Delete={
+                            'Objects': [{'Key': key} for key in chunk],
+                            'Quiet': True,
+                        }
+                    )
+                    failed_keys = set()
+                    for error in response.get('Errors', []):
+                        logfire.warning(f"Error deleting {error['Key']} from S3: {error.get('Message')}")
+                        failed_keys.add(error['Key'])
+                    failed_count += len(failed_keys)
+                    deleted.extend(keys[key] for key in chunk if key not in failed_keys)
+        except Exception as e:
+            logfire.error(f"Error deleting files from S3 after {len(deleted)} deleted: {e}")
+            return deleted
+
+        logfire.info(
+            f"Files deleted from S3: {len(deleted)}, not found: {len(unique_ids) - len(keys)}, "
+            f"errors: {failed_count}"
+        )
+        return deleted
+
+    async def read_file(self, file_id: str) -> Optional[Tuple[bytes, str]]:
+        """Скачать файл из S3, вернуть данные и расширение"""
+        try:
+            async with self._client() as s3_client:
+                for extension in SUPPORTED_EXTENSIONS:
                     key = f"{file_id}.{extension}"
                     try:
-                        # Проверяем существование файла
-                        await s3_client.head_object(Bucket=self.bucket_name, Key=key)
-                        
-                        # Генерируем временный URL
-                        url = await s3_client.generate_presigned_url(
-                            'get_object',
-                            Params={'Bucket': self.bucket_name, 'Key': key},
-                            ExpiresIn=expires_in
-                        )
-                        logfire.info("Generated presigned URL for: {key}, {url}", key=key, url=url)
-                        return url
+                        response = await s3_client.get_object(Bucket=self.bucket_name, Key=key)
                     except ClientError as e:
-                        if e.response['Error']['Code'] == 'NoSuchKey':
+                        if self._is_not_found(e):
                             continue
-                        else:
-                            raise
-                            
-            logfire.warning(f"File not found for URL generation: {file_id}")
+                        raise
+                    async with response['Body'] as body:
+                        return await body.read(), extension
+            logfire.warning(f"File not found for download in S3: {file_id}")
             return None
-            
+        except Exception as e:
+            logfire.error(f"Error downloading file from S3: {e}")
+            return None
+
+    async def get_file_url(self, file_id: str, expires_in: int = 3600) -> Optional[str]:
+        """Получить URL файла для прямого доступа (с временной ссылкой)"""
+        cached_url = self.media_cache.get_url(file_id)
+        if cached_url:
+            return cached_url
+        try:
+            async with self._client() as s3_client:
+                return await self._presign_file(s3_client, file_id, expires_in)
         except Exception as e:
             logfire.error(f"Error generating file URL: {e}")
             return None
-    
+
+    async def _presign_file(self, s3_client: Client, file_id: str, expires_in: int) -> Optional[str]:
+        """Найти файл открытым клиентом и сгенерировать временный URL"""
+        cached_url = self.media_cache.get_url(file_id)
+        if cached_url:
+            return cached_url
+        # Пробуем найти файл с разными расширениями
+        for extension in SUPPORTED_EXTENSIONS:
+            key = f"{file_id}.{extension}"
+            # Проверяем существование файла
+            if not await self._object_exists(s3_client, key):
+                continue
+
+            # Генерируем временный URL
+            url = await s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': key},
+                ExpiresIn=expires_in
+            )
+            logfire.info("Generated presigned URL for: {key}, {url}", key=key, url=url)
+            self.media_cache.remember_url(file_id, url, expires_in)
+            return url
+
+        logfire.warning(f"File not found for URL generation: {file_id}")
+        return None
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        """Перебрать все объекты bucket постранично"""
+        async with self._client() as s3_client:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            async for page in paginator.paginate(Bucket=self.bucket_name):
+                for obj in page.get('Contents', []):
+                    yield StoredFile(
+                        file_id=obj['Key'].rsplit('.', 1)[0],
+                        size=obj['Size'],
+                        modified_at=obj['LastModified'],
+                    )
+
+    async def _find_key(self, s3_client: Client, file_id: str) -> Optional[str]:
+        """Найти ключ объекта по id файла (с любым расширением)"""
+        response = await s3_client.list_objects_v2(
+            Bucket=self.bucket_name, Prefix=f"{file_id}.", MaxKeys=1
+        )
+        contents = response.get('Contents', [])
+        return contents[0]['Key'] if contents else None
+
+    async def _find_keys(self, s3_client: Client, file_ids: List[str]) -> Dict[str, str]:
+        """Найти ключи объектов для нескольких id файлов (ключ -> id файла)
+
+        Небольшие пачки ищутся параллельными запросами по префиксу, большие -
+        одним постраничным листингом bucket.
+        """
+        if len(file_ids) >= KEY_LISTING_THRESHOLD:
+            wanted = set(file_ids)
+            keys: Dict[str, str] = {}
+            paginator = s3_client.get_paginator('list_objects_v2')
+            async for page in paginator.paginate(Bucket=self.bucket_name):
+                for obj in page.get('Contents', []):
+                    file_id = obj['Key'].rsplit('.', 1)[0]
+                    if file_id in wanted:
+                        keys.setdefault(obj['Key'], file_id)
+            return keys
+
+        semaphore = asyncio.Semaphore(KEY_LOOKUP_CONCURRENCY)
+
+        async def find_one(file_id: str) -> Optional[str]:
+            async with semaphore:
+                return await self._find_key(s3_client, file_id)
+
+        found = await asyncio.gather(*(find_one(file_id) for file_id in file_ids))
+        return {key: file_id for file_id, key in zip(file_ids, found, strict=True) if key}
+
+    async def _object_exists(self, s3_client: Client, key: str) -> bool:
+        """Проверить существование объекта в bucket"""
+        try:
+            await s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    @staticmethod
+    def _is_not_found(error: ClientError) -> bool:
+        """Проверить, что ошибка означает отсутствие объекта"""
+        # head_object возвращает код 404, а не NoSuchKey
+        return error.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound')
+
     def _get_content_type(self, file_extension: str) -> str:
         """Определить Content-Type по расширению файла"""
         content_types = {
@@ -3,15 +3,12 @@
 Telegram Events Bot - Основной файл приложения
 """
 
-import logfire
-
-logfire.configure(scrubbing=False)
-
 import asyncio
 import os
+import logfire
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from events_bot.database import init_database
+from events_bot.database import init_database, get_session_maker, get_replica_set
 from events_bot.bot.handlers import (
     register_start_handlers,
     register_user_handlers,
@@ -21,8 +18,12 @@ from events_bot.bot.handlers import (
     register_feed_handlers,
 )
 from events_bot.bot.middleware import DatabaseMiddleware
+from events_bot.database.services import FeedService
+from events_bot.bot.utils import render_stats
+from events_bot.storage import DiskCachedFileStorage, file_storage, get_garbage_collector
 from loguru import logger
 
+logfire.configure(scrubbing=False)
 logger.configure(
     handlers=[logfire.loguru_handler()]
 )
@@ -40,15 +41,30 @@ async def main():
 
     await init_database()
     logfire.info("✅ Database initialized")
+    # Хранилище выбирается при импорте, до настройки logfire
+    logfire.info(f"✅ File storage: {type(file_storage).__name__}")
+
+    # Материализованная лента: досоздаем записи для постов, опубликованных
+    # после прошлой синхронизации (их могла не успеть разложить фоновая
+    # задача). В режиме query отметку сбрасываем - после включения режима
+    # ленты синхронизируются полностью
+    async with get_session_maker()() as db:
+        if FeedService.is_materialized():
+            added = await FeedService.sync_all(db)
+            logfire.info(f"✅ Feed entries synchronized: {added} added")
+        else:
+            await FeedService.reset_sync(db)
+        await db.commit()
 
     # Создаем бота и диспетчер
     bot = Bot(token=token)
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
 
-    # Подключаем middleware для базы данных
-    dp.message.middleware(DatabaseMiddleware())
-    dp.callback_query.middleware(DatabaseMiddleware())
+    # Подключаем middleware для базы данных (один экземпляр, чтобы статистика была общей)
+    database_middleware = DatabaseMiddleware()
+    dp.message.middleware(database_middleware)
+    dp.callback_query.middleware(database_middleware)
 
     # Регистрируем обработчики
     register_start_handlers(dp)
@@ -58,6 +74,29 @@ async def main():
     register_moderation_handlers(dp)
     register_feed_handlers(dp)
 
+    # Запускаем сборку мусора файлового хранилища в фоне
+    gc_task = None
+    if os.getenv("STORAGE_GC_ENABLED", "false").lower() == "true":
+        gc_task = asyncio.create_task(
+            get_garbage_collector(get_session_maker()).run_periodically(
+                interval=int(os.getenv("STORAGE_GC_INTERVAL", "3600")),
+                dry_run=os.getenv("STORAGE_GC_DRY_RUN", "false").lower() == "true",
+            )
+        )
+        logfire.info("🧹 Storage garbage collector started")
+
+    # Проверяем доступность реплик для чтения в фоне
+    replica_task = None
+    replica_set = get_replica_set()
+    if replica_set:
+        await replica_set.check_health()
+        replica_task = asyncio.create_task(
+            replica_set.run_health_checks(
+                interval=float(os.getenv("DATABASE_REPLICA_HEALTH_INTERVAL", "10"))
+            )
+        )
+        logfire.info(f"📚 Read replicas enabled: {len(replica_set.engines)}")
+
     logfire.info("🤖 Bot started...")
 
     try:
@@ -66,6 +105,14 @@ async def main():
     except KeyboardInterrupt:
         logfire.info("🛑 Bot stopped")
     finally:
+        if gc_task:
+            gc_task.cancel()
+        if replica_task:
+            replica_task.cancel()
+        logfire.info(f"Database usage by updates: {database_middleware.stats()}")
+        logfire.info(f"Message edits: {render_stats()}")
+        if isinstance(file_storage, DiskCachedFileStorage):
+            logfire.info(f"Media disk cache: {file_storage.stats()}")
         await bot.session.close()
 
 
@@ -0,0 +1,41 @@
+import os
+import uuid
+
+os.environ.setdefault("LOGFIRE_IGNORE_NO_CONFIG", "1")
+
+import pytest  # noqa: E402
+from moto.server import ThreadedMotoServer  # noqa: E402
+
+from events_bot.storage import LocalFileStorage, S3FileStorage  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    """Локальная замена S3 (moto) на время тестов"""
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture(params=["local", "s3"])
+def make_storage(request, tmp_path, s3_endpoint):
+    """Создать хранилище проверяемого типа (пустое, отдельное для теста)"""
+
+    async def make(content_addressed: bool = False):
+        if request.param == "local":
+            return LocalFileStorage(str(tmp_path / "uploads"), content_addressed=content_addressed)
+        storage = S3FileStorage(
+            bucket_name=f"events-bot-{uuid.uuid4().hex[:12]}",
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+            region_name="us-east-1",
+            endpoint_url=s3_endpoint,
+            content_addressed=content_addressed,
+        )
+        async with storage._client() as s3_client:
+            await s3_client.create_bucket(Bucket=storage.bucket_name)
+        return storage
+
+    return make
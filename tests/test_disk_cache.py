@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+
+import pytest
+
+from events_bot.storage import DiskCachedFileStorage, S3FileStorage
+
+
+@pytest.fixture
+async def cached_storage(tmp_path, s3_endpoint):
+    backend = S3FileStorage(
+        bucket_name=f"events-bot-{uuid.uuid4().hex[:12]}",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+        region_name="us-east-1",
+        endpoint_url=s3_endpoint,
+    )
+    async with backend._client() as s3_client:
+        await s3_client.create_bucket(Bucket=backend.bucket_name)
+    return DiskCachedFileStorage(backend, cache_path=str(tmp_path / "cache"), max_bytes=1024)
+
+
+async def test_concurrent_readers_fetch_file_once(cached_storage, monkeypatch):
+    [file_id] = await cached_storage.backend.save_many([(b"image", "jpg")])
+    downloads = []
+    read_file = cached_storage.backend.read_file
+
+    async def slow_read_file(file_id):
+        downloads.append(file_id)
+        await asyncio.sleep(0.05)
+        return await read_file(file_id)
+
+    monkeypatch.setattr(cached_storage.backend, "read_file", slow_read_file)
+
+    media = await asyncio.gather(*(cached_storage.get_media_photo(file_id) for _ in range(5)))
+
+    assert all(item is not None for item in media)
+    assert downloads == [file_id]
+    assert cached_storage.stats()["misses"] == 1
+    assert cached_storage._fetch_locks == {}
+
+
+async def test_uncacheable_file_is_fetched_once_per_wave(cached_storage, monkeypatch):
+    # Файл больше лимита кэша: каждый читатель под блокировкой скачивает его сам,
+    # но блокировка живет, пока есть ожидающие, и новые читатели встают в ту же очередь
+    [file_id] = await cached_storage.backend.save_many([(b"x" * 2048, "jpg")])
+    active = []
+    read_file = cached_storage.backend.read_file
+
+    async def tracking_read_file(file_id):
+        active.append(file_id)
+        assert len(active) == 1
+        await asyncio.sleep(0.01)
+        active.pop()
+        return await read_file(file_id)
+
+    monkeypatch.setattr(cached_storage.backend, "read_file", tracking_read_file)
+
+    first = asyncio.gather(*(cached_storage.get_media_photo(file_id) for _ in range(3)))
+    await asyncio.sleep(0.015)
+    second = asyncio.gather(*(cached_storage.get_media_photo(file_id) for _ in range(3)))
+    await asyncio.gather(first, second)
+
+    assert cached_storage._fetch_locks == {}
+    assert cached_storage._fetch_waiters == {}
+
+
+async def test_missing_cached_file_is_accounted_once(cached_storage):
+    [file_id] = await cached_storage.save_many([(b"image", "jpg")])
+    file_path, size = cached_storage._entries[file_id]
+    assert cached_storage._size == size
+
+    file_path.unlink()
+    assert await cached_storage._read_cached(file_id) is None
+    cached_storage._drop(file_id)
+
+    assert cached_storage._size == 0
+    assert file_id not in cached_storage._entries
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from events_bot.database import create_tables
+from events_bot.database.models import (
+    Category, FeedEntry, Post, PostStatus, User, post_categories, user_categories
+)
+from events_bot.database.services import FeedService, UserService
+from events_bot.database.services import feed_service
+
+
+@pytest.fixture
+async def session_maker(tmp_path):
+    """База с категориями 1 и 2, по посту в каждой и подписчиком на обе"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'feed.db'}")
+    await create_tables(engine)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    published_at = datetime(2026, 1, 1)
+    async with session_maker() as db:
+        await db.execute(insert(Category), [{"id": 1, "name": "first"}, {"id": 2, "name": "second"}])
+        await db.execute(insert(User), [{"id": 1, "first_name": "Reader", "city": "Москва"}])
+        await db.execute(insert(Post), [
+            {
+                "id": post_id,
+                "title": f"Пост {post_id}",
+                "content": "Текст",
+                "author_id": 1,
+                "city": "Москва",
+                "status": PostStatus.PUBLISHED,
+                "is_approved": True,
+                "is_published": True,
+                "published_at": published_at + timedelta(minutes=post_id),
+            }
+            for post_id in (1, 2)
+        ])
+        await db.execute(insert(post_categories), [
+            {"post_id": 1, "category_id": 1}, {"post_id": 2, "category_id": 2}
+        ])
+        await db.execute(insert(user_categories), [
+            {"user_id": 1, "category_id": 1}, {"user_id": 1, "category_id": 2}
+        ])
+        await db.commit()
+    yield session_maker
+    await engine.dispose()
+
+
+async def feed_post_ids(db, user_id: int):
+    result = await db.execute(
+        select(FeedEntry.post_id).where(FeedEntry.user_id == user_id).order_by(FeedEntry.post_id)
+    )
+    return list(result.scalars())
+
+
+async def start_bot(session_maker) -> None:
+    """Синхронизация лент при запуске, как в main.py"""
+    async with session_maker() as db:
+        if FeedService.is_materialized():
+            await FeedService.sync_all(db)
+        else:
+            await FeedService.reset_sync(db)
+        await db.commit()
+
+
+async def test_sync_only_fans_out_new_posts(session_maker, monkeypatch):
+    monkeypatch.setattr(feed_service, "FEED_MODE", "materialized")
+    await start_bot(session_maker)
+
+    async with session_maker() as db:
+        assert await feed_post_ids(db, 1) == [1, 2]
+        # Записи до отметки синхронизации повторно не просматриваются
+        await db.execute(FeedEntry.__table__.delete().where(FeedEntry.post_id == 1))
+        await db.commit()
+    await start_bot(session_maker)
+
+    async with session_maker() as db:
+        assert await feed_post_ids(db, 1) == [2]
+
+
+async def test_switching_back_to_materialized_rebuilds_feeds(session_maker, monkeypatch):
+    monkeypatch.setattr(feed_service, "FEED_MODE", "materialized")
+    await start_bot(session_maker)
+
+    # В режиме query пользователь отписывается от второй категории
+    monkeypatch.setattr(feed_service, "FEED_MODE", "query")
+    await start_bot(session_maker)
+    async with session_maker() as db:
+        await UserService.select_categories(db, 1, [1])
+        await db.commit()
+        assert await feed_post_ids(db, 1) == [1, 2]
+
+    monkeypatch.setattr(feed_service, "FEED_MODE", "materialized")
+    await start_bot(session_maker)
+
+    async with session_maker() as db:
+        assert await feed_post_ids(db, 1) == [1]
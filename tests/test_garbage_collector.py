@@ -0,0 +1,77 @@
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from events_bot.database import create_tables
+from events_bot.database.models import Post, User
+from events_bot.storage import LocalFileStorage
+from events_bot.storage.garbage_collector import ImageGarbageCollector
+
+IMAGES = [(b"referenced", "jpg"), (b"orphan", "jpg"), (b"longer orphan", "png")]
+
+
+@pytest.fixture
+async def session_maker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'gc.db'}")
+    await create_tables(engine)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def collector(tmp_path, session_maker):
+    """Три старых файла, на первый ссылается пост"""
+    storage = LocalFileStorage(str(tmp_path / "uploads"))
+    file_ids = await storage.save_many(IMAGES)
+    old = time.time() - 3600
+    for file_path in storage.storage_path.iterdir():
+        os.utime(file_path, (old, old))
+    async with session_maker() as db:
+        await db.execute(insert(User), [{"id": 1, "first_name": "Author"}])
+        await db.execute(insert(Post), [
+            {"title": "Пост", "content": "Текст", "author_id": 1, "image_id": file_ids[0]}
+        ])
+        await db.commit()
+    collector = ImageGarbageCollector(
+        storage, session_maker, grace_period=timedelta(minutes=1), batch_size=1
+    )
+    return collector, file_ids
+
+
+async def test_collect_deletes_orphaned_files(collector):
+    collector, file_ids = collector
+
+    report = await collector.collect()
+
+    assert sorted(report.orphaned) == sorted(file_ids[1:])
+    assert report.deleted == 2
+    assert report.deleted_bytes == report.orphaned_bytes == len(b"orphan") + len(b"longer orphan")
+    assert [stored.file_id async for stored in collector.storage.list_files()] == [file_ids[0]]
+
+
+async def test_freed_bytes_count_only_confirmed_deletions(collector, monkeypatch):
+    collector, file_ids = collector
+    delete_many = collector.storage.delete_many
+
+    async def delete_all_but_last(batch):
+        return await delete_many([file_id for file_id in batch if file_id != file_ids[2]])
+
+    monkeypatch.setattr(collector.storage, "delete_many", delete_all_but_last)
+
+    report = await collector.collect()
+
+    assert (report.deleted, report.failed) == (1, 1)
+    assert report.deleted_bytes == len(b"orphan")
+
+
+async def test_dry_run_keeps_files(collector):
+    collector, file_ids = collector
+
+    report = await collector.collect(dry_run=True)
+
+    assert (report.deleted, report.deleted_bytes) == (0, 0)
+    assert len([stored async for stored in collector.storage.list_files()]) == len(file_ids)
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from events_bot.database import create_tables, use_primary
+from events_bot.database.models import User
+from events_bot.database.routing import ReplicaSet, RoutingSession
+from events_bot.database.services import UserService
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    """Основная база и две реплики (SQLite); в каждой пользователь с ее именем"""
+    engines = {}
+    for name in ("primary", "replica1", "replica2"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        await create_tables(engine)
+        async with engine.begin() as connection:
+            await connection.execute(User.__table__.insert().values(id=1, first_name=name))
+        engines[name] = engine
+    replica_set = ReplicaSet([engines["replica1"], engines["replica2"]])
+    session_maker = async_sessionmaker(
+        engines["primary"],
+        class_=AsyncSession,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        replica_set=replica_set,
+    )
+    yield session_maker, replica_set
+    for engine in engines.values():
+        await engine.dispose()
+
+
+async def read_name(db) -> str:
+    return (await db.execute(select(User.first_name).where(User.id == 1))).scalar_one()
+
+
+async def test_session_reads_from_one_replica(databases):
+    session_maker, _ = databases
+
+    names = []
+    for _ in range(2):
+        async with session_maker() as db:
+            names.append([await read_name(db) for _ in range(4)])
+
+    # Каждая сессия закреплена за одной репликой, новые сессии чередуют реплики
+    assert [set(session_names) for session_names in names] == [{"replica1"}, {"replica2"}]
+
+
+async def test_unhealthy_pinned_replica_is_replaced(databases):
+    session_maker, replica_set = databases
+
+    async with session_maker() as db:
+        assert await read_name(db) == "replica1"
+        replica_set.healthy[0] = False
+        assert await read_name(db) == "replica2"
+        assert await read_name(db) == "replica2"
+
+
+async def test_no_healthy_replicas_reads_primary(databases):
+    session_maker, replica_set = databases
+    replica_set.healthy = [False, False]
+
+    async with session_maker() as db:
+        assert await read_name(db) == "primary"
+
+
+async def test_writes_and_locking_reads_use_primary(databases):
+    session_maker, _ = databases
+
+    async with session_maker() as db:
+        locked = (await db.execute(select(User.first_name).with_for_update())).scalar_one()
+        assert locked == "primary"
+        assert await read_name(db) == "replica1"
+        db.add(User(id=2, first_name="written"))
+        await db.flush()
+        # После записи сессия читает свои изменения из основной базы
+        assert await read_name(db) == "primary"
+        await db.commit()
+
+    async with session_maker() as db:
+        use_primary(db)
+        assert await read_name(db) == "primary"
+
+
+async def test_primary_execution_option_does_not_pin_session(databases):
+    session_maker, _ = databases
+
+    async with session_maker() as db:
+        statement = select(User.first_name).where(User.id == 1).execution_options(use_primary=True)
+        assert (await db.execute(statement)).scalar_one() == "primary"
+        assert await read_name(db) == "replica1"
+
+
+async def test_feed_context_is_read_from_primary(databases):
+    session_maker, _ = databases
+
+    async with session_maker() as db:
+        user = await db.get(User, 1)
+        UserService.set_city(db, user, "Москва")
+        await db.commit()
+
+    async with session_maker() as db:
+        # Город есть только в основной базе: реплики "отстают"
+        assert (await UserService.get_feed_context(db, 1)).city == "Москва"
+        assert await read_name(db) != "primary"
@@ -0,0 +1,134 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from events_bot.storage import S3FileStorage, s3_storage
+
+IMAGES = [(b"first image", "jpg"), (b"second image", "png"), (b"third image", "webp")]
+
+
+async def stored_ids(storage):
+    return sorted([stored.file_id async for stored in storage.list_files()])
+
+
+async def test_save_many_returns_ids_in_input_order(make_storage):
+    storage = await make_storage()
+
+    file_ids = await storage.save_many(IMAGES)
+
+    assert len(set(file_ids)) == len(IMAGES)
+    assert await stored_ids(storage) == sorted(file_ids)
+    media = await storage.resolve_many(file_ids)
+    assert all(media[file_id] is not None for file_id in file_ids)
+
+
+async def test_save_many_content_addressed_stores_identical_bytes_once(make_storage):
+    storage = await make_storage(content_addressed=True)
+
+    file_ids = await storage.save_many([(b"same", "jpg"), (b"same", "jpg"), (b"other", "png")])
+
+    assert file_ids[0] == file_ids[1] != file_ids[2]
+    assert await stored_ids(storage) == sorted({file_ids[0], file_ids[2]})
+
+
+async def test_save_many_content_addressed_ignores_extension(make_storage):
+    storage = await make_storage(content_addressed=True)
+
+    file_ids = await storage.save_many([(b"same", "jpg"), (b"same", "jpeg")])
+
+    assert file_ids[0] == file_ids[1]
+    assert await stored_ids(storage) == [file_ids[0]]
+
+
+async def test_resolve_many_marks_missing_files(make_storage):
+    storage = await make_storage()
+    file_ids = await storage.save_many(IMAGES[:2])
+
+    media = await storage.resolve_many(file_ids + ["missing", file_ids[0]])
+
+    assert list(media) == file_ids + ["missing"]
+    assert media[file_ids[0]] is not None
+    assert media[file_ids[1]] is not None
+    assert media["missing"] is None
+
+
+async def test_resolve_many_reuses_telegram_file_id(make_storage):
+    storage = await make_storage()
+    [file_id] = await storage.save_many(IMAGES[:1])
+    storage.media_cache.remember_telegram_file_id(file_id, "telegram-file-id")
+
+    media = await storage.resolve_many([file_id])
+
+    assert media[file_id].media == "telegram-file-id"
+
+
+async def test_delete_many_returns_only_removed_files(make_storage):
+    storage = await make_storage()
+    file_ids = await storage.save_many(IMAGES)
+
+    deleted = await storage.delete_many([file_ids[0], "missing", file_ids[2], file_ids[0]])
+
+    assert sorted(deleted) == sorted([file_ids[0], file_ids[2]])
+    assert await stored_ids(storage) == [file_ids[1]]
+    assert await storage.delete_many([file_ids[0]]) == []
+
+
+async def test_delete_many_splits_large_batches(make_storage, monkeypatch):
+    monkeypatch.setattr(s3_storage, "DELETE_OBJECTS_CHUNK_SIZE", 2)
+    storage = await make_storage()
+    file_ids = await storage.save_many([(f"image {index}".encode(), "jpg") for index in range(5)])
+
+    deleted = await storage.delete_many(file_ids)
+
+    assert sorted(deleted) == sorted(file_ids)
+    assert await stored_ids(storage) == []
+
+
+async def test_delete_many_finds_keys_with_bucket_listing(make_storage, monkeypatch):
+    monkeypatch.setattr(s3_storage, "KEY_LISTING_THRESHOLD", 1)
+    storage = await make_storage()
+    file_ids = await storage.save_many(IMAGES)
+
+    deleted = await storage.delete_many([file_ids[0], "missing", file_ids[1]])
+
+    assert sorted(deleted) == sorted(file_ids[:2])
+    assert await stored_ids(storage) == [file_ids[2]]
+
+
+async def test_delete_many_returns_chunks_deleted_before_error(make_storage, monkeypatch):
+    monkeypatch.setattr(s3_storage, "DELETE_OBJECTS_CHUNK_SIZE", 2)
+    storage = await make_storage()
+    if not isinstance(storage, S3FileStorage):
+        pytest.skip("Запросы DeleteObjects есть только у S3")
+    file_ids = await storage.save_many([(f"image {index}".encode(), "jpg") for index in range(5)])
+    open_client = storage._client
+
+    @asynccontextmanager
+    async def failing_client():
+        # Второй запрос DeleteObjects падает
+        async with open_client() as s3_client:
+            delete_objects = s3_client.delete_objects
+            calls = []
+
+            async def delete_objects_once(**kwargs):
+                calls.append(kwargs)
+                if len(calls) > 1:
+                    raise ConnectionError("connection lost")
+                return await delete_objects(**kwargs)
+
+            s3_client.delete_objects = delete_objects_once
+            yield s3_client
+
+    monkeypatch.setattr(storage, "_client", failing_client)
+
+    deleted = await storage.delete_many(file_ids)
+
+    assert len(deleted) == 2
+    assert await stored_ids(storage) == sorted(set(file_ids) - set(deleted))
+
+
+@pytest.mark.parametrize("file_ids", [[], ["missing"]])
+async def test_delete_many_without_existing_files(make_storage, file_ids):
+    storage = await make_storage()
+
+    assert await storage.delete_many(file_ids) == []